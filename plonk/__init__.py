@@ -59,15 +59,35 @@ import importlib_metadata as _importlib_metadata
 from ._config import read_config, write_config
 from ._logging import logger_init as _logger_init
 from ._units import Quantity, add_units, array_units, units
-from .analysis.profile import Profile, load_profile
-from .simulation.simulation import Simulation, load_sim, load_simulation
-from .simulation.time_series import load_ev, load_time_series
 from .snap import load_snap
 from .snap.snap import Sinks, Snap, SnapLike, SubSnap
-from .visualize.animation import animate
-from .visualize.interpolation import interpolate
-from .visualize.simulation import visualize_sim
-from .visualize.visualization import image, plot, vector
+from .utils.lazy import lazy_getattr as _lazy_getattr
+
+# Attributes that depend on matplotlib, numba, pandas, or scipy are
+# imported on first access to keep "import plonk" fast
+__getattr__, __dir__ = _lazy_getattr(
+    __name__,
+    {
+        'Profile': 'analysis.profile',
+        'Simulation': 'simulation.simulation',
+        'analysis': '',
+        'animate': 'visualize.animation',
+        'image': 'visualize.visualization',
+        'interpolate': 'visualize.interpolation',
+        'load_ev': 'simulation.time_series',
+        'load_profile': 'analysis.profile',
+        'load_sim': 'simulation.simulation',
+        'load_simulation': 'simulation.simulation',
+        'load_time_series': 'simulation.time_series',
+        'plot': 'visualize.visualization',
+        'simulation': '',
+        'utils': '',
+        'vector': 'visualize.visualization',
+        'visualize': '',
+        'visualize_sim': 'visualize.simulation',
+    },
+    globals(),
+)
 
 __version__ = _importlib_metadata.version('plonk')
 
@@ -0,0 +1,47 @@
+"""Plonk command line interface.
+
+Usage: plonk <command>, or python -m plonk <command>.
+
+Commands
+--------
+warmup
+    Compile the Numba functions and write them to the cache on disk.
+"""
+
+import argparse
+from typing import List
+
+
+def main(argv: List[str] = None) -> None:
+    """Run the Plonk command line interface.
+
+    Parameters
+    ----------
+    argv : optional
+        The command line arguments. Default is sys.argv[1:].
+    """
+    parser = argparse.ArgumentParser(
+        prog='plonk',
+        description='Smoothed particle hydrodynamics analysis and visualization.',
+    )
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+    subparsers.add_parser(
+        'warmup', help='compile the Numba functions and write them to the cache'
+    )
+    args = parser.parse_args(argv)
+
+    if args.command == 'warmup':
+        from .utils.jit import warmup
+
+        stats = warmup()
+        loaded = sum(stat['loaded'] for stat in stats.values())
+        compiled = sum(stat['compiled'] for stat in stats.values())
+        print(
+            f'{len(stats)} functions: {loaded} signatures loaded, '
+            f'{compiled} compiled'
+        )
+
+
+if __name__ == '__main__':
+    main()
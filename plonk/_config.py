@@ -1,12 +1,15 @@
 """Config."""
 
+from copy import deepcopy
 from pathlib import Path
-from typing import Any, MutableMapping, Union
+from typing import Any, Dict, MutableMapping, Tuple, Union
 
 import toml
 
 CONFIG_FILE = Path(__file__).parent / 'config.toml'
 
+_config_memo: Dict[Tuple[str, int], MutableMapping[str, Any]] = {}
+
 
 def read_config(filename: Union[str, Path] = None) -> MutableMapping[str, Any]:
     """Read config file.
@@ -22,9 +25,38 @@ def read_config(filename: Union[str, Path] = None) -> MutableMapping[str, Any]:
     Dict
         The config as a nested dictionary.
     """
+    return deepcopy(_read_config(filename))
+
+
+def config_key(filename: Union[str, Path] = None) -> Tuple[str, int]:
+    """Return a key identifying the contents of a config file.
+
+    Parameters
+    ----------
+    filename
+        The name of the config file (must be TOML) as a string or
+        pathlib.Path.
+
+    Returns
+    -------
+    Tuple
+        The resolved path and modification time of the file.
+    """
     if filename is None:
         filename = CONFIG_FILE
-    return toml.load(filename)
+    path = Path(filename).expanduser().resolve()
+    return str(path), path.stat().st_mtime_ns
+
+
+def _read_config(filename: Union[str, Path] = None) -> MutableMapping[str, Any]:
+    """Read config file, memoized by path and modification time.
+
+    The returned config must not be modified.
+    """
+    key = config_key(filename)
+    if key not in _config_memo:
+        _config_memo[key] = toml.load(key[0])
+    return _config_memo[key]
 
 
 def write_config(filename: Union[str, Path]):
@@ -5,12 +5,44 @@ from typing import Any, Dict, Union
 
 import pint
 
-from ._config import read_config
+from ._config import config_key, read_config
 
 units = pint.UnitRegistry()
 Quantity = units.Quantity
 
 
+# The names of units defined for code units by definition, see code_unit
+_code_units: Dict[str, str] = {}
+
+
+def _reduce_quantity(quantity):
+    if any(name in _code_units.values() for name in quantity._units):
+        # Other processes may not have the code unit defined
+        quantity = quantity.to_root_units()
+    return _unpickle_quantity, (quantity.magnitude, quantity._units)
+
+
+def _unpickle_quantity(magnitude, units_container):
+    return Quantity(magnitude, units_container)
+
+
+def _reduce_unit(unit):
+    return _unpickle_unit, (unit._units,)
+
+
+def _unpickle_unit(units_container):
+    return units.Unit(units_container)
+
+
+# Unpickle in the Plonk unit registry rather than the pint application
+# registry, so quantities returned from other processes can be combined
+Quantity.__reduce__ = _reduce_quantity
+units.Unit.__reduce__ = _reduce_unit
+
+_array_units_memo: Dict[Any, Dict[str, str]] = {}
+_array_code_units_memo: Dict[str, Dict[str, Any]] = {}
+
+
 def add_units(config: Union[str, Path] = None):
     """Add units to the unit registry from a config file.
 
@@ -25,6 +57,33 @@ def add_units(config: Union[str, Path] = None):
         units.define(f'{unit} = {definition}')
 
 
+def code_unit(quantity: Any) -> Any:
+    """Return a unit equal to a quantity, e.g. a code unit.
+
+    Units with a magnitude other than 1 are defined in the unit
+    registry, so that units can be attached to arrays in code units
+    without scaling, i.e. copying, them.
+
+    Parameters
+    ----------
+    quantity
+        The quantity, e.g. 1.496e11 meter.
+
+    Returns
+    -------
+    Unit
+        The unit.
+    """
+    if quantity.magnitude == 1:
+        return quantity.units
+    definition = f'{quantity.magnitude!r} * {quantity.units}'
+    if definition not in _code_units:
+        name = f'code_unit_{len(_code_units)}'
+        units.define(f'{name} = {definition}')
+        _code_units[definition] = name
+    return units.Unit(_code_units[definition])
+
+
 def array_units(config: Union[str, Path] = None) -> Dict[str, str]:
     """Return a dictionary of arrays with unit strings.
 
@@ -42,6 +101,13 @@ def array_units(config: Union[str, Path] = None) -> Dict[str, str]:
     -------
     Dict
     """
+    key = config_key(config)
+    if key not in _array_units_memo:
+        _array_units_memo[key] = _array_units(config)
+    return dict(_array_units_memo[key])
+
+
+def _array_units(config: Union[str, Path] = None) -> Dict[str, str]:
     conf = read_config(filename=config)
     d = dict()
     for key, val in conf['arrays']['dimensions'].items():
@@ -109,6 +175,14 @@ def generate_array_code_units(code_units: Dict[str, Any]) -> Dict[str, Any]:
     Dict
         A dictionary of units as Pint quantities.
     """
+    # Snaps from the same simulation share code units
+    key = repr(sorted(code_units.items()))
+    if key not in _array_code_units_memo:
+        _array_code_units_memo[key] = _generate_array_code_units(code_units)
+    return dict(_array_code_units_memo[key])
+
+
+def _generate_array_code_units(code_units: Dict[str, Any]) -> Dict[str, Any]:
     _units = dict()
     _array_quantities = array_quantities()
     for arr, unit in _array_quantities.items():
@@ -26,8 +26,22 @@ Calculate the Roche sphere radius given two sink particles.
 >>> Roche = sinks.Roche_sphere(s1['mass'], s2['mass'], separation)
 """
 
-from . import discs, filters, particles, sinks, sph, total
-from .profile import Profile, load_profile
+from ..utils.lazy import lazy_getattr as _lazy_getattr
+
+__getattr__, __dir__ = _lazy_getattr(
+    __name__,
+    {
+        'Profile': 'profile',
+        'discs': '',
+        'filters': '',
+        'load_profile': 'profile',
+        'particles': '',
+        'sinks': '',
+        'sph': '',
+        'total': '',
+    },
+    globals(),
+)
 
 __all__ = [
     'Profile',
@@ -27,6 +27,15 @@ array_requires = {
     'stokes_number': ['position', 'stopping_time'],
 }
 
+# Snap properties which arrays depend on
+property_requires = {
+    'eccentricity': ['central_body'],
+    'inclination': ['central_body'],
+    'keplerian_frequency': ['central_body'],
+    'semi_major_axis': ['central_body'],
+    'stokes_number': ['central_body'],
+}
+
 # Arrays which represent quantities with x-, y-, z-components in space
 vector_arrays: List[str] = []
 
@@ -40,6 +40,9 @@ array_requires = {
     'velocity_radial_spherical': ['position', 'velocity'],
 }
 
+# Snap properties which arrays depend on
+property_requires = {'temperature': ['molecular_weight']}
+
 # Arrays which represent quantities with x-, y-, z-components in space
 vector_arrays = ['angular_momentum', 'momentum', 'specific_angular_momentum']
 
@@ -9,6 +9,7 @@ import numpy as np
 
 from .._units import Quantity
 from .._units import units as plonk_units
+from ..utils.jit import njit
 
 if TYPE_CHECKING:
     from ..snap.snap import Sinks
@@ -254,7 +255,10 @@ def _norm(x):
     return np.sqrt(x[..., 0] ** 2 + x[..., 1] ** 2 + x[..., 2] ** 2)
 
 
-@numba.njit
+@njit(
+    (numba.float32[:, ::1], numba.float32[::1]),
+    (numba.float64[:, ::1], numba.float64[::1]),
+)
 def _potential(position, mass):
     """Get gravitational potential on particles.
 
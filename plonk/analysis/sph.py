@@ -7,6 +7,7 @@ from typing import TYPE_CHECKING, Any, Callable, Dict, Tuple
 import numba
 import numpy as np
 from numba.typed import List
+from numba.types import ListType
 
 from .._logging import logger
 from .._units import Quantity
@@ -18,10 +19,37 @@ from ..utils.kernels import (
     kernel_quintic,
     kernel_wendland_c4,
 )
+from ..utils.jit import njit
 
 if TYPE_CHECKING:
     from ..snap import Snap
 
+DERIVATIVES = ('grad', 'div', 'curl')
+KERNEL_GRADIENTS = (
+    kernel_gradient_cubic,
+    kernel_gradient_quintic,
+    kernel_gradient_wendland_c4,
+)
+FLOATS = (numba.float32, numba.float64)
+
+
+def _derivative_signatures():
+    """Signatures of _compute_derivative_over_particles.
+
+    The particle arrays are float32 or float64, and the quantity is a
+    scalar, for grad, or a vector, for div and curl.
+    """
+    signatures = list()
+    for f in FLOATS:
+        for quantity in (f[::1], f[:, ::1]):
+            signatures.append(
+                (numba.int64[::1], ListType(numba.int64[::1]), numba.int64[::1])
+                + (f[:, ::1], f[::1], f[::1], f[::1], quantity)
+                + (numba.int64,) * 3
+                + (numba.boolean,)
+            )
+    return signatures
+
 
 def derivative(
     snap: Snap,
@@ -82,26 +110,18 @@ def derivative(
         if quantity_array.ndim > 1:
             raise ValueError('Quantity must be scalar for grad')
         result_shape = (len(snap), 3)
-        compute_function_kwargs[
-            'compute_derivative_over_neighbours'
-        ] = _compute_grad_over_neighbours
 
     elif derivative == 'div':
         if quantity_array.ndim != 2:
             raise ValueError('Quantity must be vector for div')
         result_shape = (len(snap), 1)
-        compute_function_kwargs[
-            'compute_derivative_over_neighbours'
-        ] = _compute_div_over_neighbours
 
     elif derivative == 'curl':
         if quantity_array.ndim != 2:
             raise ValueError('Quantity must be vector for curl')
         result_shape = (len(snap), 3)
-        compute_function_kwargs[
-            'compute_derivative_over_neighbours'
-        ] = _compute_curl_over_neighbours
 
+    compute_function_kwargs['derivative'] = derivative
     compute_function_kwargs['result_axis_1_size'] = result_shape[1]
 
     result = summation(
@@ -242,7 +262,6 @@ def summation(
     return result
 
 
-@numba.njit
 def _compute_derivative(
     indices,
     neighbours,
@@ -254,7 +273,40 @@ def _compute_derivative(
     kernel_gradient_function,
     density,
     quantity_array,
-    compute_derivative_over_neighbours,
+    derivative,
+    result_axis_1_size,
+    verbose,
+):
+    # Numba cannot cache functions taking jitted functions as arguments,
+    # so the kernel and derivative are passed as integer codes
+    return _compute_derivative_over_particles(
+        indices,
+        neighbours,
+        type_indices,
+        position,
+        smoothing_length,
+        mass,
+        density,
+        quantity_array,
+        KERNEL_GRADIENTS.index(kernel_gradient_function),
+        DERIVATIVES.index(derivative),
+        result_axis_1_size,
+        verbose,
+    )
+
+
+@njit(*_derivative_signatures())
+def _compute_derivative_over_particles(
+    indices,
+    neighbours,
+    type_indices,
+    position,
+    smoothing_length,
+    mass,
+    density,
+    quantity_array,
+    kernel,
+    derivative,
     result_axis_1_size,
     verbose,
 ):
@@ -278,25 +330,39 @@ def _compute_derivative(
 
         posi = position[index]
         quani = quantity_array[index]
-
-        result[idxi] = compute_derivative_over_neighbours(
-            posi=posi,
-            hi=hi,
-            quani=quani,
-            quanj=quantity_array[neigh],
-            posj=position[neigh],
-            mj=mass[neigh],
-            rhoj=density[neigh],
-            kernel_gradient_function=kernel_gradient_function,
-        )
+        quanj = quantity_array[neigh]
+        posj = position[neigh]
+        mj = mass[neigh]
+        rhoj = density[neigh]
+
+        # Branches on ndim are pruned at compile time
+        if quantity_array.ndim == 1:
+            result[idxi] = _compute_grad_over_neighbours(
+                posi, hi, quani, quanj, posj, mj, rhoj, kernel
+            )
+        elif derivative == 1:
+            result[idxi] = _compute_div_over_neighbours(
+                posi, hi, quani, quanj, posj, mj, rhoj, kernel
+            )
+        else:
+            result[idxi] = _compute_curl_over_neighbours(
+                posi, hi, quani, quanj, posj, mj, rhoj, kernel
+            )
 
     return result
 
 
-@numba.njit
-def _compute_grad_over_neighbours(
-    posi, hi, quani, quanj, posj, mj, rhoj, kernel_gradient_function,
-):
+@njit(*[(f, numba.int64) for f in FLOATS])
+def _kernel_gradient(q, kernel):
+    if kernel == 0:
+        return kernel_gradient_cubic(q)
+    if kernel == 1:
+        return kernel_gradient_quintic(q)
+    return kernel_gradient_wendland_c4(q)
+
+
+@njit()
+def _compute_grad_over_neighbours(posi, hi, quani, quanj, posj, mj, rhoj, kernel):
     result = np.zeros(3)
 
     for idxj in range(len(quanj)):
@@ -304,7 +370,7 @@ def _compute_grad_over_neighbours(
         rij = np.sqrt(dr[0] ** 2 + dr[1] ** 2 + dr[2] ** 2)
         dr = dr / rij
         qi = rij / hi
-        grad_kern = kernel_gradient_function(qi)
+        grad_kern = _kernel_gradient(qi, kernel)
         result += (
             mj[idxj] / rhoj[idxj] * (quanj[idxj] - quani) * dr * grad_kern / hi ** 4
         )
@@ -312,10 +378,8 @@ def _compute_grad_over_neighbours(
     return result
 
 
-@numba.njit
-def _compute_div_over_neighbours(
-    posi, hi, quani, quanj, posj, mj, rhoj, kernel_gradient_function,
-):
+@njit()
+def _compute_div_over_neighbours(posi, hi, quani, quanj, posj, mj, rhoj, kernel):
     result = 0.0
 
     for idxj in range(len(quanj)):
@@ -324,17 +388,15 @@ def _compute_div_over_neighbours(
         rij = np.sqrt(dr[0] ** 2 + dr[1] ** 2 + dr[2] ** 2)
         dr = dr / rij
         qi = rij / hi
-        grad_kern = kernel_gradient_function(qi)
+        grad_kern = _kernel_gradient(qi, kernel)
         dot = dq[0] * dr[0] + dq[1] * dr[1] + dq[2] * dr[2]
         result += mj[idxj] / rhoj[idxj] * dot * grad_kern / hi ** 4
 
     return result
 
 
-@numba.njit
-def _compute_curl_over_neighbours(
-    posi, hi, quani, quanj, posj, mj, rhoj, kernel_gradient_function,
-):
+@njit()
+def _compute_curl_over_neighbours(posi, hi, quani, quanj, posj, mj, rhoj, kernel):
     result = np.zeros(3)
     cross = np.zeros(3)
 
@@ -344,7 +406,7 @@ def _compute_curl_over_neighbours(
         rij = np.sqrt(dr[0] ** 2 + dr[1] ** 2 + dr[2] ** 2)
         dr = dr / rij
         qi = rij / hi
-        grad_kern = kernel_gradient_function(qi)
+        grad_kern = _kernel_gradient(qi, kernel)
         cross[0] = dq[1] * dr[2] - dq[2] * dr[1]
         cross[1] = dq[2] * dr[0] - dq[0] * dr[2]
         cross[2] = dq[0] * dr[1] - dq[1] * dr[0]
@@ -2,15 +2,19 @@
 
 from __future__ import annotations
 
+import io
 from pathlib import Path
-from typing import TYPE_CHECKING, Dict, List, Tuple, Union
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union
 
 import numpy as np
 import pandas as pd
 from pandas import DataFrame
 
 from .._config import read_config
+from .._logging import logger
 from .._units import _convert_dim_string, _get_code_unit
+from ..snap.disk_cache import DIRECTORY_NAME, plonk_version, write_atomic
+from ..utils.processes import process_pool
 
 if TYPE_CHECKING:
     from .simulation import Simulation
@@ -19,6 +23,8 @@ if TYPE_CHECKING:
 def load_data_from_file(
     filenames: Union[str, Path, Tuple[str], Tuple[Path], List[str], List[Path]],
     config: Union[str, Path] = None,
+    cache: bool = True,
+    num_workers: int = None,
 ):
     """Load data from Phantom time series (.ev) files.
 
@@ -28,32 +34,194 @@ def load_data_from_file(
         The filename or filenames (as a list).
     config : optional
         The path to a Plonk config.toml file.
+    cache : optional
+        If True, store the parsed data from each file in the
+        .plonk_cache directory next to it, and read it from there if
+        the file has not changed. Default is True.
+    num_workers : optional
+        If greater than 1, read the files in parallel with this many
+        processes. Default is None.
 
     Returns
     -------
     DataFrame
     """
-    if isinstance(filenames, (str, Path)):
-        _filenames = [filenames]
-    elif isinstance(filenames, (list, tuple)):
-        _filenames = list(filenames)
-    else:
-        raise ValueError('filenames is not a known type')
+    reader = TimeSeriesReader(config=config, cache=cache)
+    reader.update(filenames=filenames, num_workers=num_workers)
+    return reader.dataframe()
 
-    conf = read_config(filename=config)
-    name_map = conf['phantom']['time_series']['namemap']
 
-    _file_paths = list()
-    for filename in _filenames:
-        path = Path(filename)
-        _file_paths.append(path.resolve())
-    file_paths = tuple(_file_paths)
+class TimeSeriesReader:
+    """Incremental reader of Phantom time series (.ev) files.
+
+    The reader keeps the data parsed from each file and the byte offset
+    it has been read up to. On update, only lines appended to a file
+    since it was last read are parsed, and files not read before, such
+    as those written when a simulation is restarted, are read in full.
+    A file that is shorter than, or no longer ends with, what was read
+    is read again from the start. An incomplete last line, e.g. while
+    the file is being written, is left for a later update.
+
+    Parameters
+    ----------
+    config : optional
+        The path to a Plonk config.toml file.
+    cache : optional
+        If True, store the parsed data from each file in the
+        .plonk_cache directory next to it. The cache is used if the
+        file has not changed, and lines appended since it was written
+        are parsed. Default is True.
+    """
+
+    def __init__(self, config: Union[str, Path] = None, cache: bool = True):
+        conf = read_config(filename=config)
+        self.name_map = conf['phantom']['time_series']['namemap']
+        self.cache = cache
+        self.file_paths: Tuple[Path, ...] = ()
+        self.columns: Tuple[str, ...] = ()
+        self._files: Dict[Path, _FileData] = dict()
+
+    def update(
+        self,
+        filenames: Union[str, Path, Tuple[str], Tuple[Path], List[str], List[Path]],
+        num_workers: int = None,
+    ) -> bool:
+        """Read data appended to files, and files not read before.
+
+        Parameters
+        ----------
+        filenames
+            The filename or filenames (as a list) in chronological
+            order.
+        num_workers : optional
+            If greater than 1, read the files in parallel with this many
+            processes. Default is None, i.e. read files one after
+            another.
+
+        Returns
+        -------
+        bool
+            True if the data changed.
+        """
+        return update_readers(
+            readers=[self], filenames=[filenames], num_workers=num_workers
+        )[0]
+
+    def dataframe(self) -> DataFrame:
+        """Return the data read so far.
 
-    _check_file_consistency(filenames=file_paths, name_map=name_map)
-    columns = _get_columns(filename=file_paths[0], name_map=name_map)
-    dataframe = _get_data(columns=columns, file_paths=file_paths)
+        Rows in each file up to the last time before the end of the
+        previous file are dropped, as a simulation restarted from an
+        earlier dump writes a file overlapping the previous one.
+
+        Returns
+        -------
+        DataFrame
+            A new DataFrame with the data.
+        """
+        arrays = list()
+        last_time = None
+        for path in self.file_paths:
+            data = self._files[path].data
+            if len(data) == 0:
+                continue
+            time = data[:, 0]
+            if last_time is not None:
+                overlap = np.flatnonzero(time < last_time)
+                if overlap.size > 0:
+                    data = data[overlap[-1] + 1 :]
+            last_time = time[-1]
+            arrays.append(data)
+
+        if not arrays:
+            return DataFrame(np.empty((0, len(self.columns))), columns=self.columns)
+        return DataFrame(np.concatenate(arrays), columns=self.columns)
+
+    def _set_files(
+        self,
+        filenames: Union[str, Path, Tuple[str], Tuple[Path], List[str], List[Path]],
+    ) -> bool:
+        """Set the files to read, returning True if they changed."""
+        if isinstance(filenames, (str, Path)):
+            _filenames = [filenames]
+        elif isinstance(filenames, (list, tuple)):
+            _filenames = list(filenames)
+        else:
+            raise ValueError('filenames is not a known type')
+        if not _filenames:
+            raise ValueError('no time series files')
+
+        file_paths = tuple(Path(filename).resolve() for filename in _filenames)
+        new_paths = tuple(path for path in file_paths if path not in self._files)
+        _check_file_consistency(
+            filenames=file_paths[:1] + new_paths, name_map=self.name_map
+        )
+        columns = _get_columns(filename=file_paths[0], name_map=self.name_map)
+        if columns != self.columns:
+            self._files = dict()
+            self.columns = columns
+
+        changed = file_paths != self.file_paths
+        self._files = {
+            path: self._files.get(path) or _FileData(path, len(columns))
+            for path in file_paths
+        }
+        self.file_paths = file_paths
+        return changed
+
+    def __repr__(self) -> str:
+        return f'<plonk.TimeSeriesReader files={len(self.file_paths)}>'
+
+
+def update_readers(
+    readers: List[TimeSeriesReader],
+    filenames: List[Union[str, Path, List[str], List[Path]]],
+    num_workers: int = None,
+) -> List[bool]:
+    """Update time series readers, reading files in parallel.
+
+    Files from all readers, such as one per sink particle, are read in
+    one pool of processes. Files that have not changed since they were
+    last read are skipped.
+
+    Parameters
+    ----------
+    readers
+        The readers.
+    filenames
+        The filename or filenames for each reader.
+    num_workers : optional
+        If greater than 1, read the files in parallel with this many
+        processes. Default is None, i.e. read files one after another.
 
-    return dataframe
+    Returns
+    -------
+    List[bool]
+        True for each reader whose data changed.
+    """
+    changed = [
+        reader._set_files(filenames=_filenames)
+        for reader, _filenames in zip(readers, filenames)
+    ]
+    files = [
+        (idx, file_data)
+        for idx, reader in enumerate(readers)
+        for file_data in reader._files.values()
+        if not file_data.is_current()
+    ]
+    args = [file_data.read_args(cache=readers[idx].cache) for idx, file_data in files]
+    if num_workers is not None and num_workers > 1 and len(args) > 1:
+        logger.debug(
+            f'Reading {len(args)} time series files with {num_workers} processes'
+        )
+        with process_pool(min(num_workers, len(args))) as executor:
+            results = list(executor.map(_read_appended, *zip(*args)))
+    else:
+        results = [_read_appended(*_args) for _args in args]
+    for (idx, file_data), result in zip(files, results):
+        if file_data.apply(result, cache=readers[idx].cache):
+            changed[idx] = True
+    return changed
 
 
 def time_series_units(sim: Simulation, config: Union[str, Path] = None):
@@ -75,39 +243,180 @@ def time_series_units(sim: Simulation, config: Union[str, Path] = None):
     dim = dict()
     for key, val in arrays.items():
         dim[key] = _convert_dim_string(val)
+    # Use the first snap rather than sim.code_units which checks every snap
+    code_units = sim._snap_code_units(0)
     _units = dict()
     for arr, unit in dim.items():
-        _units[arr] = _get_code_unit(unit, sim.code_units)
+        _units[arr] = _get_code_unit(unit, code_units)
     return _units
 
 
-def _get_data(columns: Tuple[str, ...], file_paths: Tuple[Path, ...]) -> DataFrame:
+class _FileData:
+    """Data parsed from a time series file up to a byte offset."""
 
-    times = list()
-    for filename in file_paths:
-        times.append(np.loadtxt(filename, usecols=0))
+    def __init__(self, path: Path, num_columns: int):
+        self.path = path
+        self.num_columns = num_columns
+        self.data = np.empty((0, num_columns))
+        self.offset = 0
+        self.tail = b''
+        self.stat: Optional[Tuple[int, int]] = None
+        self.cache_path = path.parent / DIRECTORY_NAME / f'{path.name}.npz'
 
-    _skiprows = [0]
-    if len(times) > 1:
-        for t1, t2 in zip(times, times[1:]):
-            _skiprows.append(np.where(t2 < t1[-1])[0][-1] + 2)
+    def is_current(self) -> bool:
+        """Check if the file is unchanged since it was last read."""
+        stat = self.path.stat()
+        return self.stat == (stat.st_mtime_ns, stat.st_size)
 
-    df = pd.concat(
-        (
-            pd.read_csv(
-                f,
-                names=columns,
-                skiprows=skiprows,
-                skipinitialspace=True,
-                delim_whitespace=True,
-                comment='#',
-            )
-            for f, skiprows in zip(file_paths, _skiprows)
+    def read_args(self, cache: bool = True) -> Tuple[Any, ...]:
+        """Arguments to _read_appended to read the file."""
+        return (
+            self.path,
+            self.num_columns,
+            self.offset,
+            self.tail,
+            self.cache_path if cache else None,
         )
+
+    def apply(self, result: Dict[str, Any], cache: bool = True) -> bool:
+        """Update from the result of _read_appended.
+
+        Returns True if the data changed.
+        """
+        self.stat = result['stat']
+        if result['data'] is None:
+            return False
+        if result['reset'] or len(self.data) == 0:
+            self.data = result['data']
+        else:
+            self.data = np.concatenate((self.data, result['data']))
+        self.offset, self.tail = result['offset'], result['tail']
+        if cache and result['write_cache']:
+            _write_cache(self.cache_path, self.stat, self)
+        return True
+
+
+def _read_appended(
+    path: Path,
+    num_columns: int,
+    offset: int,
+    tail: bytes,
+    cache_path: Optional[Path],
+) -> Dict[str, Any]:
+    """Read complete lines appended to a file after an offset.
+
+    The file is read from the start if it no longer has the tail, i.e.
+    the last line read, before the offset. The cache is used if nothing
+    has been read yet. The returned data is all the data in the file if
+    reset is True, otherwise the data appended, or None if there is no
+    new data.
+    """
+    stat = path.stat()
+    result: Dict[str, Any] = {
+        'data': None,
+        'reset': False,
+        'offset': offset,
+        'tail': tail,
+        'stat': (stat.st_mtime_ns, stat.st_size),
+        'write_cache': False,
+    }
+    if offset == 0 and cache_path is not None:
+        cached = _read_cache(cache_path)
+        if cached is not None and cached['data'].shape[1] == num_columns:
+            result.update(
+                data=cached['data'],
+                reset=True,
+                offset=cached['offset'],
+                tail=cached['tail'],
+            )
+            if cached['stat'] == result['stat']:
+                return result
+
+    with open(path, mode='rb') as fp:
+        offset, tail = result['offset'], result['tail']
+        if offset > 0 and not _has_tail(fp, stat.st_size, offset, tail):
+            logger.debug(f'Time series file changed, reading again: {path}')
+            offset = 0
+            result.update(
+                data=np.empty((0, num_columns)), reset=True, offset=offset, tail=b''
+            )
+        fp.seek(offset)
+        buffer = fp.read()
+    end = buffer.rfind(b'\n') + 1
+    if end == 0:
+        return result
+
+    buffer = buffer[:end]
+    data = _parse(buffer, num_columns)
+    if result['reset'] and len(result['data']) > 0:
+        data = np.concatenate((result['data'], data))
+    # The offset is at the start of a line, so the buffer has whole lines
+    result.update(
+        data=data,
+        offset=offset + end,
+        tail=buffer[buffer.rfind(b'\n', 0, end - 1) + 1 :],
+        write_cache=True,
     )
+    return result
+
+
+def _has_tail(fp, size: int, offset: int, tail: bytes) -> bool:
+    """Check the file has the tail before the offset."""
+    if size < offset:
+        return False
+    fp.seek(offset - len(tail))
+    return fp.read(len(tail)) == tail
+
+
+def _parse(buffer: bytes, num_columns: int) -> np.ndarray:
+    """Parse lines of a time series file as a 2d array."""
+    df = pd.read_csv(
+        io.BytesIO(buffer),
+        names=range(num_columns),
+        skipinitialspace=True,
+        delim_whitespace=True,
+        comment='#',
+    )
+    # Phantom writes values that overflow the format as asterisks
+    for col in df.columns[df.dtypes == object]:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    return df.to_numpy(dtype=np.float64)
+
+
+def _read_cache(path: Path) -> Optional[Dict[str, Any]]:
+    if not path.is_file():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as f:
+            if str(f['version']) != plonk_version():
+                return None
+            cached = {
+                'data': f['data'],
+                'offset': int(f['offset']),
+                'tail': f['tail'].tobytes(),
+                'stat': (int(f['mtime_ns']), int(f['size'])),
+            }
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f'Cannot read time series cache: {e}')
+        return None
+    logger.debug(f'Read time series from cache: {path}')
+    return cached
+
+
+def _write_cache(path: Path, stat: Tuple[int, int], file_data: _FileData) -> None:
+    def write(tmp_path: Path):
+        with open(tmp_path, mode='wb') as fp:
+            np.savez(
+                fp,
+                data=file_data.data,
+                offset=file_data.offset,
+                tail=np.frombuffer(file_data.tail, dtype=np.uint8),
+                mtime_ns=stat[0],
+                size=stat[1],
+                version=plonk_version(),
+            )
 
-    df.reset_index(inplace=True, drop=True)
-    return df
+    write_atomic(path, write, 'time series cache')
 
 
 def _get_columns(filename: Path, name_map: Dict[str, str]) -> Tuple[str, ...]:
@@ -0,0 +1,335 @@
+"""Persistent catalog of simulation snapshots."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from .._logging import logger
+from .._units import Quantity
+from .._units import units as plonk_units
+from ..snap import load_snap
+from ..snap.disk_cache import DIRECTORY_NAME, plonk_version, write_atomic
+
+CATALOG_VERSION = 1
+
+FIELDS = [
+    'mtime_ns',
+    'size',
+    'properties',
+    'varying_properties',
+    'code_units',
+    'arrays',
+    'num_particles',
+    'num_particles_of_type',
+    'num_sinks',
+    'num_dust_species',
+]
+# Entries are stored as lists of values, in the order of FIELDS, to keep
+# the catalog file compact and fast to read
+_index = {field: idx for idx, field in enumerate(FIELDS)}
+
+# Snap properties that vary per snap are stored per entry, others are
+# stored once in a table and referenced by index
+_properties_vary_per_snap = ('time',)
+
+# Parsed units by string, as parsing units is slow relative to decoding
+_units: Dict[str, Any] = dict()
+
+
+class Catalog:
+    """Catalog of snapshot file metadata.
+
+    The catalog stores, for each snapshot file, the header properties,
+    code units, number of particles and sinks, and the arrays available
+    on file, along with the file modification time and size. It is
+    written as JSON so a Simulation can be re-opened without opening
+    every snapshot file. Files that are new or have changed since the
+    catalog was written are re-scanned.
+
+    Values shared between snapshots, such as code units, are stored once
+    in tables and referenced by index from each entry.
+
+    Parameters
+    ----------
+    path
+        The path to the catalog file.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._entries: Dict[str, List[Any]] = dict()
+        self._tables: Dict[str, List[Any]] = {
+            'properties': list(),
+            'code_units': list(),
+            'arrays': list(),
+        }
+        self._table_index: Dict[str, Dict[str, int]] = {
+            name: dict() for name in self._tables
+        }
+        self._decoded: Dict[str, Dict[int, Any]] = {
+            name: dict() for name in self._tables
+        }
+        self._read()
+
+    @classmethod
+    def for_simulation(cls, directory: Path, prefix: str) -> Catalog:
+        """Return the catalog for a simulation.
+
+        Parameters
+        ----------
+        directory
+            The simulation directory.
+        prefix
+            The simulation prefix.
+
+        Returns
+        -------
+        Catalog
+            The catalog, stored in the .plonk_cache directory.
+        """
+        return cls(directory / DIRECTORY_NAME / f'{prefix}_catalog.json')
+
+    def update(self, paths: List[Path]) -> Tuple[int, List[Path]]:
+        """Scan new or changed files, and remove missing files.
+
+        The catalog is written to disk if it changed. Files that cannot
+        be read, e.g. partially written, are not in the catalog.
+
+        Parameters
+        ----------
+        paths
+            The paths to the snapshot files.
+
+        Returns
+        -------
+        scanned
+            The number of files scanned.
+        unreadable
+            The paths to the files that cannot be read.
+        """
+        names = {path.name for path in paths}
+        removed = [name for name in self._entries if name not in names]
+        for name in removed:
+            del self._entries[name]
+        scanned = 0
+        unreadable = list()
+        for path in paths:
+            stat = path.stat()
+            entry = self._entries.get(path.name)
+            if (
+                entry is not None
+                and entry[_index['mtime_ns']] == stat.st_mtime_ns
+                and entry[_index['size']] == stat.st_size
+            ):
+                continue
+            try:
+                self._entries[path.name] = self._scan(path, stat)
+            except (OSError, RuntimeError, KeyError) as e:
+                logger.warning(f'Cannot add {path.name} to catalog: {e}')
+                if self._entries.pop(path.name, None) is not None:
+                    removed.append(path.name)
+                unreadable.append(path)
+                continue
+            scanned += 1
+        if scanned or removed:
+            logger.debug(f'Catalog scanned {scanned} files, removed {len(removed)}')
+            self._write()
+        return scanned, unreadable
+
+    def __contains__(self, path: object) -> bool:
+        return isinstance(path, Path) and path.name in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def entry(self, path: Path) -> Dict[str, Any]:
+        """Return the catalog entry for a snapshot file.
+
+        Parameters
+        ----------
+        path
+            The path to the snapshot file.
+
+        Returns
+        -------
+        Dict
+            The entry with properties and code units decoded.
+        """
+        entry = dict(zip(FIELDS, self._entries[path.name]))
+        entry['properties'] = self.properties(path)
+        entry['code_units'] = self.code_units(path)
+        entry['arrays'] = self._table('arrays', entry['arrays'])
+        del entry['varying_properties']
+        return entry
+
+    def properties(self, path: Path) -> Dict[str, Any]:
+        """Return the properties of a snapshot file.
+
+        Values shared between snapshots are the same objects.
+
+        Parameters
+        ----------
+        path
+            The path to the snapshot file.
+
+        Returns
+        -------
+        Dict
+            The properties.
+        """
+        entry = self._entries[path.name]
+        properties = dict(self._table('properties', entry[_index['properties']]))
+        for key, val in entry[_index['varying_properties']].items():
+            properties[key] = _decode(val)
+        return properties
+
+    def code_units(self, path: Path) -> Dict[str, Any]:
+        """Return the code units of a snapshot file.
+
+        Code units shared between snapshots are the same objects.
+
+        Parameters
+        ----------
+        path
+            The path to the snapshot file.
+
+        Returns
+        -------
+        Dict
+            The code units.
+        """
+        entry = self._entries[path.name]
+        return self._table('code_units', entry[_index['code_units']])
+
+    def _scan(self, path: Path, stat: os.stat_result) -> List[Any]:
+        logger.debug(f'Scanning {path.name} for catalog')
+        snap = load_snap(path)
+        try:
+            properties = snap.properties
+            shared = {
+                key: _encode(val)
+                for key, val in properties.items()
+                if key not in _properties_vary_per_snap
+            }
+            varying = {
+                key: _encode(val)
+                for key, val in properties.items()
+                if key in _properties_vary_per_snap
+            }
+            code_units = {key: _encode(val) for key, val in snap.code_units.items()}
+            arrays = {
+                'particles': sorted(snap._file_arrays['particles']),
+                'sinks': sorted(snap._file_arrays['sinks']),
+            }
+            entry = {
+                'mtime_ns': stat.st_mtime_ns,
+                'size': stat.st_size,
+                'properties': self._intern('properties', shared),
+                'varying_properties': varying,
+                'code_units': self._intern('code_units', code_units),
+                'arrays': self._intern('arrays', arrays),
+                'num_particles': int(snap.num_particles),
+                'num_particles_of_type': _encode(snap.num_particles_of_type),
+                'num_sinks': int(snap.num_sinks),
+                'num_dust_species': int(snap.num_dust_species),
+            }
+            return [entry[field] for field in FIELDS]
+        finally:
+            snap.close_file()
+
+    def _intern(self, table: str, value: Any) -> int:
+        key = json.dumps(value, sort_keys=True)
+        index = self._table_index[table].get(key)
+        if index is None:
+            index = len(self._tables[table])
+            self._tables[table].append(value)
+            self._table_index[table][key] = index
+        return index
+
+    def _table(self, table: str, index: int) -> Any:
+        decoded = self._decoded[table]
+        if index not in decoded:
+            value = self._tables[table][index]
+            if table == 'arrays':
+                decoded[index] = value
+            else:
+                decoded[index] = {key: _decode(val) for key, val in value.items()}
+        return decoded[index]
+
+    def _read(self) -> None:
+        if not self.path.is_file():
+            return
+        try:
+            with open(self.path) as fp:
+                data = json.load(fp)
+        except (OSError, ValueError) as e:
+            logger.warning(f'Cannot read catalog, rebuilding: {e}')
+            return
+        version = (data.get('version'), data.get('plonk_version'))
+        if version != (CATALOG_VERSION, plonk_version()):
+            logger.debug('Catalog out of date, rebuilding')
+            return
+        if data.get('fields') != FIELDS:
+            logger.debug('Catalog fields changed, rebuilding')
+            return
+        self._entries = data['entries']
+        self._tables = data['tables']
+        self._table_index = {
+            name: {json.dumps(val, sort_keys=True): idx for idx, val in enumerate(vals)}
+            for name, vals in self._tables.items()
+        }
+
+    def _write(self) -> None:
+        data = {
+            'version': CATALOG_VERSION,
+            'plonk_version': plonk_version(),
+            'tables': self._tables,
+            'fields': FIELDS,
+            'entries': self._entries,
+        }
+
+        def write(tmp_path: Path):
+            with open(tmp_path, mode='w') as fp:
+                json.dump(data, fp, separators=(',', ':'))
+
+        write_atomic(self.path, write, 'catalog')
+
+    def __repr__(self) -> str:
+        return f'<plonk.Catalog entries={len(self)} path="{self.path}">'
+
+
+def _encode(value: Any) -> Any:
+    """Encode a property value as JSON."""
+    if isinstance(value, Quantity):
+        return {'magnitude': _encode(value.magnitude), 'units': str(value.units)}
+    if isinstance(value, np.ndarray):
+        return {'array': value.tolist(), 'dtype': value.dtype.str}
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {key: _encode(val) for key, val in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode(val) for val in value]
+    return value
+
+
+def _decode(value: Any) -> Any:
+    """Decode a property value from JSON."""
+    if isinstance(value, dict):
+        if 'units' in value and 'magnitude' in value:
+            units = _units.get(value['units'])
+            if units is None:
+                units = _units[value['units']] = plonk_units(value['units']).units
+            return Quantity(_decode(value['magnitude']), units)
+        if 'array' in value and 'dtype' in value:
+            return np.array(value['array'], dtype=value['dtype'])
+        return {key: _decode(val) for key, val in value.items()}
+    if isinstance(value, list):
+        return [_decode(val) for val in value]
+    return value
+
@@ -0,0 +1,201 @@
+"""Index of particle ids for tracking particles between snapshots."""
+
+from __future__ import annotations
+
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+
+from .._logging import logger
+from .._units import Quantity
+from ..snap.disk_cache import DIRECTORY_NAME, plonk_version, write_atomic
+
+if TYPE_CHECKING:
+    from ..snap.snap import Snap
+
+# The array on file with the original particle ids, if particles can be
+# reordered or removed between snapshots
+ID_ARRAY = 'iorig'
+
+# The original id of the first particle, as Phantom ids start at 1
+ID_START = 1
+
+
+class ParticleIndex:
+    """Index from particle id to row in a snapshot file.
+
+    If the snapshot file has an array of original particle ids, e.g.
+    'iorig' in Phantom, the ids are sorted once and stored with the
+    order of the rows, so the rows of any set of ids are found by binary
+    search. Otherwise, the particles are in their original order, and
+    the original id is the row in the file plus ID_START.
+
+    The index is stored in the .plonk_cache directory next to the
+    snapshot file, and rebuilt if the file changes.
+
+    Parameters
+    ----------
+    num_particles
+        The number of particles in the snapshot file.
+    ids : optional
+        The sorted particle ids. If None, the id is the row.
+    rows : optional
+        The rows in the file of the sorted particle ids.
+    """
+
+    def __init__(self, num_particles: int, ids: ndarray = None, rows: ndarray = None):
+        self.num_particles = num_particles
+        self.ids = ids
+        self.rows = rows
+
+    @classmethod
+    def for_snap(cls, snap: Snap, cache: bool = True) -> ParticleIndex:
+        """Return the particle index for a Snap.
+
+        Parameters
+        ----------
+        snap
+            The Snap.
+        cache : optional
+            If True, read the index from, or write it to, the
+            .plonk_cache directory next to the snapshot file. Default is
+            True.
+
+        Returns
+        -------
+        ParticleIndex
+            The index.
+        """
+        num_particles = len(snap)
+        if f'particles/{ID_ARRAY}' not in snap._file_pointer:
+            return cls(num_particles=num_particles)
+
+        path = snap.file_path
+        cache_path = path.parent / DIRECTORY_NAME / f'{path.name}.ids.npz'
+        stat = path.stat()
+        stat_tuple = (stat.st_mtime_ns, stat.st_size)
+        if cache:
+            index = _read_cache(cache_path, stat_tuple)
+            if index is not None:
+                return index
+
+        ids = snap._file_pointer[f'particles/{ID_ARRAY}'][()]
+        rows = np.argsort(ids, kind='stable')
+        index = cls(num_particles=num_particles, ids=ids[rows], rows=rows)
+        if cache:
+            _write_cache(cache_path, stat_tuple, index)
+        return index
+
+    def find(self, ids: ndarray, by: str = 'index') -> Tuple[ndarray, ndarray]:
+        """Find the rows of particles by id.
+
+        Parameters
+        ----------
+        ids
+            The particle ids.
+        by : optional
+            The id space. If 'index', the ids are the indices of the
+            particles in their original order, starting from 0, as
+            snap['id'] of a snapshot with particles in that order. If
+            'iorig', the ids are the original ids stored on file,
+            starting from ID_START. Default is 'index'.
+
+        Returns
+        -------
+        rows
+            The rows in the file of the particles that are found.
+        found
+            A mask of the ids that are found.
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if by == 'index':
+            ids = ids + ID_START
+        elif by != 'iorig':
+            raise ValueError('by must be "index" or "iorig"')
+        if self.ids is None:
+            rows = ids - ID_START
+            found = (rows >= 0) & (rows < self.num_particles)
+            return rows[found], found
+        pos = np.searchsorted(self.ids, ids)
+        pos[pos == len(self.ids)] = 0
+        found = self.ids[pos] == ids
+        return self.rows[pos[found]], found
+
+    def __repr__(self) -> str:
+        kind = 'positional' if self.ids is None else ID_ARRAY
+        return f'<plonk.ParticleIndex particles={self.num_particles} ids="{kind}">'
+
+
+def track_snap(
+    snap: Snap, ids: ndarray, arrays: List[str], by: str = 'index', cache: bool = True
+) -> Tuple[Optional[Dict[str, Quantity]], ndarray]:
+    """Read arrays of particles by id from a Snap.
+
+    Only the rows of the particles are read from file.
+
+    Parameters
+    ----------
+    snap
+        The Snap.
+    ids
+        The particle ids.
+    arrays
+        The arrays to read.
+    by : optional
+        The id space, 'index' or 'iorig', see ParticleIndex.find.
+        Default is 'index'.
+    cache : optional
+        If True, store the particle index in the .plonk_cache directory.
+        Default is True.
+
+    Returns
+    -------
+    values
+        The arrays of the particles that are found, or None if none are
+        found.
+    found
+        A mask of the ids that are found.
+    """
+    index = ParticleIndex.for_snap(snap, cache=cache)
+    rows, found = index.find(ids, by=by)
+    if len(rows) == 0:
+        return None, found
+    subsnap = snap[rows]
+    return {array: subsnap[array] for array in arrays}, found
+
+
+def _read_cache(path: Path, stat: Tuple[int, int]) -> Optional[ParticleIndex]:
+    if not path.is_file():
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as f:
+            if str(f['version']) != plonk_version():
+                return None
+            if (int(f['mtime_ns']), int(f['size'])) != stat:
+                return None
+            index = ParticleIndex(
+                num_particles=int(f['num_particles']), ids=f['ids'], rows=f['rows']
+            )
+    except (OSError, KeyError, ValueError) as e:
+        logger.warning(f'Cannot read particle index: {e}')
+        return None
+    logger.debug(f'Read particle index from cache: {path}')
+    return index
+
+
+def _write_cache(path: Path, stat: Tuple[int, int], index: ParticleIndex) -> None:
+    def write(tmp_path: Path):
+        with open(tmp_path, mode='wb') as fp:
+            np.savez(
+                fp,
+                num_particles=index.num_particles,
+                ids=index.ids,
+                rows=index.rows,
+                mtime_ns=stat[0],
+                size=stat[1],
+                version=plonk_version(),
+            )
+
+    write_atomic(path, write, 'particle index')
@@ -7,19 +7,37 @@ and sink quantity time series files as pandas DataFrames.
 
 from __future__ import annotations
 
+import fnmatch
+import functools
+import os
 import warnings
+from collections import deque
+from collections.abc import Sequence
 from copy import copy
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Dict, List, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Union
 
 import numpy as np
+import pandas as pd
 from pandas import DataFrame
 
+try:
+    from tqdm import tqdm
+except ImportError:
+    tqdm = None
+
 from .._logging import logger
 from .._units import Quantity
 from ..snap import load_snap
+from ..utils.processes import process_pool
 from ..visualize.simulation import visualize_sim
-from .time_series import load_time_series, time_series_units
+from .catalog import Catalog
+from .particle_index import track_snap
+from .time_series import (
+    time_series_reader,
+    time_series_units,
+    update_time_series_readers,
+)
 
 if TYPE_CHECKING:
     from ..snap.snap import Snap
@@ -63,10 +81,15 @@ class Simulation:
         self.prefix: str
         self.paths: Dict[str, Any]
 
-        self._snaps: List[Snap] = None
+        self._snaps: SnapSequence = None
         self._properties: Dict[str, Any] = None
         self._code_units: Dict[str, Any] = None
-        self._time_series: Dict[str, Union[DataFrame, List[DataFrame]]] = None
+        self._time_series: SimulationTimeSeries = None
+        self._time_series_units: Optional[Dict[str, Quantity]] = None
+        self._catalog: Optional[Catalog] = None
+        self._num_workers: Optional[int] = None
+        self._sinks_long_format = False
+        self._directory_listing: Optional[List[str]] = None
 
         self._snap_file_extension = ''
         self._len = -1
@@ -76,6 +99,9 @@ class Simulation:
         prefix: str,
         directory: Union[str, Path] = None,
         data_source: str = 'Phantom',
+        catalog: bool = False,
+        num_workers: int = None,
+        sinks_long_format: bool = False,
     ) -> Simulation:
         """Load Simulation.
 
@@ -90,6 +116,21 @@ class Simulation:
         data_source : optional
             The SPH code used to produce the simulation data. Default
             is 'Phantom'.
+        catalog : optional
+            If True, keep a catalog of snapshot properties and code
+            units in the .plonk_cache directory of the simulation
+            directory, so the Simulation can be re-opened without
+            opening every snapshot file. The first time, every snapshot
+            file is scanned; after that only new or changed snapshot
+            files are scanned. Default is False.
+        num_workers : optional
+            If greater than 1, read the global and sink time series
+            files in parallel with this many processes. Default is None,
+            i.e. read files one after another.
+        sinks_long_format : optional
+            If True, sim.time_series['sinks'] is a single DataFrame
+            with a 'sink' column of the sink index, rather than a list
+            of DataFrames, one per sink. Default is False.
         """
         if data_source not in _data_sources:
             raise ValueError(f'Data source not available: try {_data_sources}')
@@ -104,20 +145,37 @@ class Simulation:
             'directory': Path(directory).expanduser().resolve(),
         }
 
-        if not list(self.paths['directory'].glob(self.prefix + '*')):
-            raise FileNotFoundError(f'No files with prefix: {prefix}')
+        # List the directory once as globbing many files is slow
+        self._directory_listing = os.listdir(self.paths['directory'])
+        try:
+            if not self._match(self.prefix + '*'):
+                raise FileNotFoundError(f'No files with prefix: {prefix}')
+
+            self._snap_file_extension = self._get_snap_file_extension()
 
-        self._snap_file_extension = self._get_snap_file_extension()
+            self.paths['snaps'] = self._get_snap_files()
+            self.paths['time_series_global'] = self._get_global_ts_files()
+            self.paths['time_series_sinks'] = self._get_sink_ts_files()
+        finally:
+            self._directory_listing = None
 
-        self.paths['snaps'] = self._get_snap_files()
-        self.paths['time_series_global'] = self._get_global_ts_files()
-        self.paths['time_series_sinks'] = self._get_sink_ts_files()
+        if catalog:
+            self._catalog = Catalog.for_simulation(self.paths['directory'], prefix)
+            _, unreadable = self._catalog.update(self.paths['snaps'])
+            self._remove_snaps(unreadable)
+
+        self._num_workers = num_workers
+        self._sinks_long_format = sinks_long_format
 
         return self
 
     @property
-    def snaps(self) -> List[Snap]:
-        """List of Snap objects associated with the simulation."""
+    def snaps(self) -> SnapSequence:
+        """Sequence of Snap objects associated with the simulation.
+
+        Each Snap is loaded on first access. Open files are managed by
+        the file pool, see plonk.snap.set_open_file_limit.
+        """
         if self._snaps is None:
             self._generate_snap_objects()
 
@@ -140,8 +198,14 @@ class Simulation:
         return self._code_units
 
     @property
-    def time_series(self) -> DataFrame:
-        """Time series data."""
+    def time_series(self) -> SimulationTimeSeries:
+        """Time series data.
+
+        A dict with the global quantity time series as 'global' and a
+        list of sink time series as 'sinks', as pandas DataFrames. Use
+        sim.time_series.refresh() to read new data while the simulation
+        is running.
+        """
         if self._time_series is None:
             self._generate_time_series()
 
@@ -184,29 +248,324 @@ class Simulation:
         q *= units
         return q
 
+    def map(
+        self,
+        fn: Callable[[Snap], Any],
+        arrays: List[str] = None,
+        indices: List[int] = None,
+        num_workers: int = None,
+        progress: bool = False,
+    ) -> List[Any]:
+        """Apply a function to each snapshot.
+
+        Each snapshot is loaded from file, the arrays are loaded, the
+        function is called, and the snapshot is closed and released, so
+        at most one snapshot per process is in memory. Snapshots are
+        loaded separately from sim.snaps, so changes to those, such as
+        rotations or added arrays, do not apply.
+
+        Parameters
+        ----------
+        fn
+            A function taking a Snap and returning a result. If
+            num_workers is greater than 1, the function and its result
+            must be picklable, e.g. the function is defined at the top
+            level of a module.
+        arrays : optional
+            Arrays to load with Snap.bulk_load before calling the
+            function. Default is None.
+        indices : optional
+            The indices of the snapshots in sim.snaps. Default is all.
+        num_workers : optional
+            If greater than 1, apply the function to snapshots in
+            parallel with this many processes. Default is None, i.e.
+            apply the function in this process.
+        progress : optional
+            If True, show a progress bar, if tqdm is installed. Default
+            is False.
+
+        Returns
+        -------
+        List
+            The results in snapshot order.
+
+        Examples
+        --------
+        Get the total mass of each snapshot using four processes.
+
+        >>> def total_mass(snap):
+        ...     return snap['mass'].sum()
+        >>> sim.map(total_mass, arrays=['mass'], num_workers=4)
+        """
+        return list(
+            self._map(
+                fn=fn,
+                arrays=arrays,
+                indices=indices,
+                num_workers=num_workers,
+                progress=progress,
+            )
+        )
+
+    def reduce(
+        self,
+        fn: Callable[[Snap], Any],
+        combine: Callable[[Any, Any], Any],
+        initial: Any = None,
+        arrays: List[str] = None,
+        indices: List[int] = None,
+        num_workers: int = None,
+        progress: bool = False,
+    ) -> Any:
+        """Apply a function to each snapshot and combine the results.
+
+        Like map, but the results are combined in snapshot order as
+        they are returned, so they are not all kept in memory.
+
+        Parameters
+        ----------
+        fn
+            A function taking a Snap and returning a result.
+        combine
+            A function taking the combined value so far and a result,
+            and returning the new combined value.
+        initial : optional
+            The initial combined value. If None, the result from the
+            first snapshot is used.
+        arrays : optional
+            Arrays to load with Snap.bulk_load before calling the
+            function. Default is None.
+        indices : optional
+            The indices of the snapshots in sim.snaps. Default is all.
+        num_workers : optional
+            If greater than 1, apply the function to snapshots in
+            parallel with this many processes. Default is None.
+        progress : optional
+            If True, show a progress bar, if tqdm is installed. Default
+            is False.
+
+        Returns
+        -------
+        Any
+            The combined value.
+
+        Examples
+        --------
+        Get the maximum density over all snapshots.
+
+        >>> def max_density(snap):
+        ...     return snap['density'].max()
+        >>> sim.reduce(max_density, max, arrays=['density'], num_workers=4)
+        """
+        results = self._map(
+            fn=fn,
+            arrays=arrays,
+            indices=indices,
+            num_workers=num_workers,
+            progress=progress,
+        )
+        if initial is None:
+            return functools.reduce(combine, results)
+        return functools.reduce(combine, results, initial)
+
+    def track(
+        self,
+        ids: Union[List[int], np.ndarray],
+        arrays: Union[str, List[str]],
+        by: str = 'index',
+        indices: List[int] = None,
+        cache: bool = True,
+        num_workers: int = None,
+        progress: bool = False,
+    ) -> Union[Quantity, Dict[str, Quantity]]:
+        """Track particles by id over snapshots.
+
+        Only the rows of the particles are read from each snapshot
+        file. If the snapshot files store original particle ids, e.g.
+        'iorig' in Phantom, particles are found by those ids via an index
+        stored in the .plonk_cache directory, so particles are tracked
+        even if they are reordered, e.g. by accretion or particle
+        splitting. Otherwise, the particles are taken to be in their
+        original order.
+
+        Parameters
+        ----------
+        ids
+            The particle ids.
+        arrays
+            The array, or list of arrays, to read, e.g. 'position'.
+        by : optional
+            The id space. If 'index', the ids are the indices of the
+            particles in their original order, starting from 0, as
+            snap['id'] of a snapshot before particles are reordered. If
+            'iorig', the ids are the original ids stored on file, which
+            start from 1 in Phantom. Default is 'index'.
+        indices : optional
+            The indices of the snapshots in sim.snaps. Default is all.
+        cache : optional
+            If True, store the particle index of each snapshot in the
+            .plonk_cache directory. Default is True.
+        num_workers : optional
+            If greater than 1, read snapshots in parallel with this many
+            processes. Default is None.
+        progress : optional
+            If True, show a progress bar, if tqdm is installed. Default
+            is False.
+
+        Returns
+        -------
+        Quantity or Dict
+            For each array, an array with shape (n_snaps, n_ids, ...)
+            with units. Particles not found in a snapshot have values of
+            NaN. If arrays is a list, a dict of arrays by name.
+
+        Examples
+        --------
+        Get the positions of three particles over the whole simulation.
+
+        >>> pos = sim.track(ids=[10, 20, 30], arrays='position')
+        >>> pos.shape
+            (31, 3, 3)
+        """
+        if by not in ('index', 'iorig'):
+            raise ValueError('by must be "index" or "iorig"')
+        names = [arrays] if isinstance(arrays, str) else list(arrays)
+        ids = np.asarray(ids, dtype=np.int64)
+        results = self.map(
+            functools.partial(track_snap, ids=ids, arrays=names, by=by, cache=cache),
+            indices=indices,
+            num_workers=num_workers,
+            progress=progress,
+        )
+        first = next((values for values, _ in results if values is not None), None)
+        if first is None:
+            raise ValueError('No particles with these ids in any snapshot')
+        all_found = all(found.all() for _, found in results)
+        tracked = dict()
+        for name in names:
+            units = first[name].units
+            shape = (len(results), len(ids)) + first[name].shape[1:]
+            if all_found:
+                array = np.empty(shape, dtype=first[name].magnitude.dtype)
+            else:
+                # Particles not found are NaN, so integer arrays are promoted
+                dtype = np.result_type(first[name].magnitude.dtype, np.float64)
+                array = np.full(shape, np.nan, dtype=dtype)
+            for idx, (values, found) in enumerate(results):
+                if values is not None:
+                    array[idx, found] = values[name].to(units).magnitude
+            tracked[name] = Quantity(array, units)
+        if isinstance(arrays, str):
+            return tracked[arrays]
+        return tracked
+
+    def _map(
+        self,
+        fn: Callable[[Snap], Any],
+        arrays: Optional[List[str]],
+        indices: Optional[List[int]],
+        num_workers: Optional[int],
+        progress: bool,
+    ) -> Iterator[Any]:
+        """Generate results of a function applied to each snapshot."""
+        if indices is None:
+            paths = list(self.paths['snaps'])
+        else:
+            paths = [self.paths['snaps'][idx] for idx in indices]
+
+        pbar = None
+        if progress:
+            if tqdm is not None:
+                pbar = tqdm(total=len(paths))
+            else:
+                logger.info(
+                    'progress bar not available\n'
+                    'try pip install tqdm --or-- conda install tqdm'
+                )
+
+        try:
+            if num_workers is not None and num_workers > 1 and len(paths) > 1:
+                with process_pool(min(num_workers, len(paths))) as executor:
+                    # Keep a few tasks per process queued so results are
+                    # returned in order without all being held in memory
+                    futures: deque = deque()
+                    try:
+                        for path in paths:
+                            futures.append(
+                                executor.submit(_apply_to_snap, path, fn, arrays)
+                            )
+                            if len(futures) > 2 * num_workers:
+                                yield _result(futures.popleft(), pbar)
+                        while futures:
+                            yield _result(futures.popleft(), pbar)
+                    finally:
+                        for future in futures:
+                            future.cancel()
+            else:
+                for path in paths:
+                    result = _apply_to_snap(path, fn, arrays)
+                    if pbar is not None:
+                        pbar.update(n=1)
+                    yield result
+        finally:
+            if pbar is not None:
+                pbar.close()
+
     def _generate_snap_objects(self):
         """Generate Snap objects."""
-        snaps = list()
-        fail = 0
-        for snap in self.paths['snaps']:
+        self._snaps = SnapSequence(self.paths['snaps'])
+
+    def _snap_properties(self, index: int) -> Dict[str, Any]:
+        """Properties of a snap, from the catalog if available."""
+        path = self.paths['snaps'][index]
+        if self._catalog is not None and path in self._catalog:
+            return self._catalog.properties(path)
+        return self.snaps[index].properties
+
+    def _snap_code_units(self, index: int) -> Dict[str, Any]:
+        """Code units of a snap, from the catalog if available."""
+        path = self.paths['snaps'][index]
+        if self._catalog is not None and path in self._catalog:
+            return self._catalog.code_units(path)
+        return self.snaps[index].code_units
+
+    def _readable_snaps(self, get: Callable[[int], Any]) -> List[Any]:
+        """Get a value from each snap, removing snaps that cannot be read."""
+        values, unreadable = list(), list()
+        for index, path in enumerate(self.paths['snaps']):
             try:
-                snaps.append(load_snap(snap))
+                values.append(get(index))
             except (OSError, RuntimeError):
-                fail += 1
-        if fail > 0:
-            logger.warning(f'Cannot read {fail} snap(s)')
-        self._snaps = snaps
+                unreadable.append(path)
+        self._remove_snaps(unreadable)
+        return values
+
+    def _remove_snaps(self, paths: List[Path]):
+        """Remove snaps that cannot be read, e.g. partially written."""
+        if not paths:
+            return
+        logger.warning(f'Cannot read {len(paths)} snap(s)')
+        self.paths['snaps'] = [
+            path for path in self.paths['snaps'] if path not in paths
+        ]
+        if self._snaps is not None:
+            self._snaps._remove(paths)
+        self._len = -1
 
     def _generate_properties(self):
         """Generate sim.properties from snap.properties."""
-        prop = copy(self.snaps[0].properties)
+        snap_properties = self._readable_snaps(self._snap_properties)
+        first = snap_properties[0]
+        prop = copy(first)
         for key in _properties_vary_per_snap:
             prop[key] = list()
-        for snap in self.snaps:
-            for key, val in snap.properties.items():
+        for properties in snap_properties:
+            for key, val in properties.items():
                 if isinstance(prop[key], list):
                     prop[key].append(val)
-                else:
+                elif val is not first[key]:
+                    # Values from the catalog shared between snaps are the
+                    # same object so do not need comparing
                     if np.any(prop[key] != val):
                         prop[key] = '__inconsistent__'
         for key, val in prop.items():
@@ -219,24 +578,22 @@ class Simulation:
 
     def _generate_units(self):
         """Generate sim.code_units from snap.code_units."""
-        u = copy(self.snaps[0].code_units)
-        for snap in self.snaps:
-            for key, val in snap.code_units.items():
-                if u[key] != val:
+        snap_code_units = self._readable_snaps(self._snap_code_units)
+        first = snap_code_units[0]
+        u = copy(first)
+        for code_units in snap_code_units:
+            for key, val in code_units.items():
+                if val is not first[key] and u[key] != val:
                     u[key] = '__inconsistent__'
         self._code_units = u
 
     def _generate_time_series(self):
         """Generate time series data."""
-        self._time_series = dict()
-        if self.paths['time_series_global']:
-            self._time_series['global'] = load_time_series(
-                self.paths['time_series_global']
-            )
-        if self.paths['time_series_sinks']:
-            self._time_series['sinks'] = [
-                load_time_series(files) for files in self.paths['time_series_sinks']
-            ]
+        self._time_series = SimulationTimeSeries(
+            self,
+            num_workers=self._num_workers,
+            sinks_long_format=self._sinks_long_format,
+        )
 
     def _get_global_ts_files(self, glob: str = None) -> List[Path]:
         """Get global time series files."""
@@ -244,7 +601,7 @@ class Simulation:
             # Phantom ev file name format
             glob = self.prefix + '[0-9][0-9].ev'
 
-        return sorted(list(self.paths['directory'].glob(glob)))
+        return sorted(self._glob(glob))
 
     def _get_sink_ts_files(self, glob: str = None) -> List[List[Path]]:
         """Get sink time series files."""
@@ -253,16 +610,12 @@ class Simulation:
             glob = self.prefix + 'Sink[0-9][0-9][0-9][0-9]N[0-9][0-9].ev'
 
         n = len(self.prefix) + len('Sink')
-        n_sinks = len({p.name[n : n + 4] for p in self.paths['directory'].glob(glob)})
+        n_sinks = len({name[n : n + 4] for name in self._match(glob)})
 
         sinks = list()
         for idx in range(1, n_sinks + 1):
             sinks.append(
-                sorted(
-                    self.paths['directory'].glob(
-                        self.prefix + f'Sink{idx:04}N[0-9][0-9].ev'
-                    )
-                )
+                sorted(self._glob(self.prefix + f'Sink{idx:04}N[0-9][0-9].ev'))
             )
 
         return sinks
@@ -275,12 +628,15 @@ class Simulation:
         config : optional
             The path to a Plonk config.toml file.
         """
+        if not self.time_series:
+            return self
         units = time_series_units(sim=self, data_source=self.data_source, config=config)
         if 'global' in self.time_series:
             _apply_units_to_dataframe(self.time_series['global'], units)
         if 'sinks' in self.time_series:
-            for ts in self.time_series['sinks']:
+            for ts in _sink_dataframes(self.time_series['sinks']):
                 _apply_units_to_dataframe(ts, units)
+        self._time_series_units = units
 
         return self
 
@@ -292,12 +648,15 @@ class Simulation:
         config : optional
             The path to a Plonk config.toml file.
         """
+        if not self.time_series:
+            return self
         units = time_series_units(sim=self, data_source=self.data_source, config=config)
         if 'global' in self.time_series:
             _un_apply_units_to_dataframe(self.time_series['global'], units)
         if 'sinks' in self.time_series:
-            for ts in self.time_series['sinks']:
+            for ts in _sink_dataframes(self.time_series['sinks']):
                 _un_apply_units_to_dataframe(ts, units)
+        self._time_series_units = None
 
         return self
 
@@ -309,7 +668,8 @@ class Simulation:
                 self.prefix + '_[0-9][0-9][0-9][0-9][0-9].' + self._snap_file_extension
             )
 
-        return sorted(list(self.paths['directory'].glob(glob)))
+        # Sorting by string is faster than by Path for many files
+        return sorted(self._glob(glob), key=str)
 
     def _get_snap_file_extension(self, glob: str = None):
         """Snapshot file extension.
@@ -321,7 +681,7 @@ class Simulation:
             # Phantom HDF5 snapshot file name format
             glob = self.prefix + '_[0-9][0-9][0-9][0-9][0-9].h5'
 
-        file_types = {f.suffix for f in self.paths['directory'].glob(glob)}
+        file_types = {os.path.splitext(name)[1] for name in self._match(glob)}
 
         if len(file_types) > 1:
             raise ValueError(
@@ -341,6 +701,17 @@ class Simulation:
 
         return file_ext
 
+    def _match(self, glob: str) -> List[str]:
+        """Get names of files in the simulation directory matching a glob."""
+        if self._directory_listing is None:
+            return [path.name for path in self.paths['directory'].glob(glob)]
+        return fnmatch.filter(self._directory_listing, glob)
+
+    def _glob(self, glob: str) -> List[Path]:
+        """Get files in the simulation directory matching a glob pattern."""
+        directory = self.paths['directory']
+        return [directory / name for name in self._match(glob)]
+
     def __len__(self):
         """Length as number of snaps."""
         if self._len == -1:
@@ -361,6 +732,146 @@ class Simulation:
     visualize = visualize_sim
 
 
+class SnapSequence(Sequence):
+    """Sequence of Snap objects loaded on first access.
+
+    Loading a Snap opens the file and reads the header, so for a
+    simulation with many snapshots this is deferred until a Snap is
+    required. Loaded Snaps are kept.
+
+    Parameters
+    ----------
+    paths
+        The paths to the snapshot files.
+    """
+
+    def __init__(self, paths: List[Path]):
+        self.paths = list(paths)
+        self._snaps: List[Optional[Snap]] = [None] * len(self.paths)
+
+    @property
+    def loaded(self) -> List[int]:
+        """Indices of the loaded Snaps."""
+        return [idx for idx, snap in enumerate(self._snaps) if snap is not None]
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[idx] for idx in range(*index.indices(len(self)))]
+        snap = self._snaps[index]
+        if snap is None:
+            snap = load_snap(self.paths[index])
+            self._snaps[index] = snap
+        return snap
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def _remove(self, paths: List[Path]):
+        keep = [idx for idx, path in enumerate(self.paths) if path not in paths]
+        self.paths = [self.paths[idx] for idx in keep]
+        self._snaps = [self._snaps[idx] for idx in keep]
+
+    def __repr__(self) -> str:
+        return f'<plonk.SnapSequence snaps={len(self)} loaded={len(self.loaded)}>'
+
+
+class SimulationTimeSeries(dict):
+    """Time series data of a Simulation.
+
+    A dict with the global quantity time series as 'global' and the sink
+    time series as 'sinks', as pandas DataFrames. The sink time series
+    are a list of DataFrames, one per sink, or a single DataFrame in
+    long format with a 'sink' column of the sink index. While a
+    simulation is running, refresh reads the lines appended to the time
+    series files since they were last read, and new files such as those
+    written on restart, instead of reading every file again.
+
+    Parameters
+    ----------
+    sim
+        The Simulation.
+    num_workers : optional
+        If greater than 1, read the time series files in parallel with
+        this many processes. Default is None.
+    sinks_long_format : optional
+        If True, the sink time series are a single DataFrame in long
+        format. Default is False.
+    """
+
+    def __init__(
+        self, sim: Simulation, num_workers: int = None, sinks_long_format: bool = False
+    ):
+        super().__init__()
+        self._sim = sim
+        self.num_workers = num_workers
+        self.sinks_long_format = sinks_long_format
+        self._global_reader = None
+        self._sink_readers: List[Any] = list()
+        self.refresh()
+
+    def refresh(self) -> SimulationTimeSeries:
+        """Read new data from the time series files.
+
+        The simulation directory is searched for new time series files.
+        The DataFrames of time series with new data are replaced, with
+        units if they were set by Simulation.set_units_on_time_series.
+
+        Returns
+        -------
+        SimulationTimeSeries
+            The time series data.
+        """
+        sim = self._sim
+        sim.paths['time_series_global'] = sim._get_global_ts_files()
+        sim.paths['time_series_sinks'] = sim._get_sink_ts_files()
+
+        readers: List[Any] = list()
+        filenames: List[List[Path]] = list()
+        if sim.paths['time_series_global']:
+            if self._global_reader is None:
+                self._global_reader = time_series_reader(data_source=sim.data_source)
+            readers.append(self._global_reader)
+            filenames.append(sim.paths['time_series_global'])
+        for _ in range(len(self._sink_readers), len(sim.paths['time_series_sinks'])):
+            self._sink_readers.append(time_series_reader(data_source=sim.data_source))
+        readers += self._sink_readers
+        filenames += sim.paths['time_series_sinks']
+        changed = update_time_series_readers(
+            readers=readers,
+            filenames=filenames,
+            data_source=sim.data_source,
+            num_workers=self.num_workers,
+        )
+
+        if sim.paths['time_series_global'] and changed.pop(0):
+            self['global'] = self._dataframe(self._global_reader.dataframe())
+        if not any(changed):
+            return self
+        if self.sinks_long_format:
+            self['sinks'] = self._dataframe(self._sinks_dataframe())
+        else:
+            sinks = self.setdefault('sinks', list())
+            sinks += [None] * (len(self._sink_readers) - len(sinks))
+            for idx, reader in enumerate(self._sink_readers):
+                if changed[idx]:
+                    sinks[idx] = self._dataframe(reader.dataframe())
+
+        return self
+
+    def _sinks_dataframe(self) -> DataFrame:
+        dataframes = list()
+        for idx, reader in enumerate(self._sink_readers):
+            dataframe = reader.dataframe()
+            dataframe.insert(0, 'sink', idx)
+            dataframes.append(dataframe)
+        return pd.concat(dataframes, ignore_index=True)
+
+    def _dataframe(self, dataframe: DataFrame) -> DataFrame:
+        if self._sim._time_series_units is not None:
+            _apply_units_to_dataframe(dataframe, self._sim._time_series_units)
+        return dataframe
+
+
 def load_sim(
     prefix: str, directory: Union[str, Path] = None, data_source: str = 'Phantom',
 ) -> Simulation:
@@ -388,7 +899,12 @@ def load_sim(
 
 
 def load_simulation(
-    prefix: str, directory: Union[str, Path] = None, data_source: str = 'Phantom',
+    prefix: str,
+    directory: Union[str, Path] = None,
+    data_source: str = 'Phantom',
+    catalog: bool = False,
+    num_workers: int = None,
+    sinks_long_format: bool = False,
 ) -> Simulation:
     """Load Simulation.
 
@@ -403,20 +919,67 @@ def load_simulation(
     data_source : optional
         The SPH code used to produce the simulation data. Default
         is 'Phantom'.
+    catalog : optional
+        If True, keep a catalog of snapshot properties and code units
+        in the .plonk_cache directory of the simulation directory, so
+        the Simulation can be re-opened without opening every snapshot
+        file. The first time, every snapshot file is scanned; after
+        that only new or changed snapshot files are scanned. Default is
+        False.
+    num_workers : optional
+        If greater than 1, read the global and sink time series files in
+        parallel with this many processes. Default is None, i.e. read
+        files one after another.
+    sinks_long_format : optional
+        If True, sim.time_series['sinks'] is a single DataFrame with a
+        'sink' column of the sink index, rather than a list of
+        DataFrames, one per sink. Default is False.
     """
     return (
         Simulation()
-        .load_simulation(prefix=prefix, directory=directory, data_source=data_source)
+        .load_simulation(
+            prefix=prefix,
+            directory=directory,
+            data_source=data_source,
+            catalog=catalog,
+            num_workers=num_workers,
+            sinks_long_format=sinks_long_format,
+        )
         .set_units_on_time_series()
     )
 
 
+def _apply_to_snap(path: Path, fn: Callable[[Snap], Any], arrays: List[str]) -> Any:
+    snap = load_snap(path)
+    try:
+        if arrays is not None:
+            snap.bulk_load(arrays)
+        return fn(snap)
+    finally:
+        snap.close_file()
+
+
+def _result(future, pbar) -> Any:
+    result = future.result()
+    if pbar is not None:
+        pbar.update(n=1)
+    return result
+
+
+def _sink_dataframes(sinks: Union[DataFrame, List[DataFrame]]) -> List[DataFrame]:
+    if isinstance(sinks, DataFrame):
+        return [sinks]
+    return sinks
+
+
 def _apply_units_to_dataframe(dataframe, units):
     keys = list()
     for key, val in units.items():
         if key in dataframe:
             keys.append(key)
-            dataframe[key] = (dataframe[key].to_numpy() * units[key]).magnitude
+            # Multiply by the magnitude as pint checks every element of an
+            # array multiplied by a Quantity
+            dataframe[key] = dataframe[key].to_numpy() * units[key].magnitude
     mapper = {key: f'{key} [{units[key].units:~}]' for key in keys}
     dataframe.rename(columns=mapper, inplace=True)
     return dataframe
@@ -428,9 +991,7 @@ def _un_apply_units_to_dataframe(dataframe, units):
         key_unit = f'{key} [{units[key].units:~}]'
         if key_unit in dataframe:
             keys.append(key)
-            dataframe[key_unit] = (
-                dataframe[key_unit].to_numpy() / units[key]
-            ).magnitude
+            dataframe[key_unit] = dataframe[key_unit].to_numpy() / units[key].magnitude
     mapper = {f'{key} [{units[key].units:~}]': key for key in keys}
     dataframe.rename(columns=mapper, inplace=True)
     return dataframe
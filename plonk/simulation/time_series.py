@@ -10,13 +10,15 @@ from __future__ import annotations
 
 import warnings
 from pathlib import Path
-from typing import TYPE_CHECKING, List, Tuple, Union
+from typing import TYPE_CHECKING, Any, List, Tuple, Union
 
 from pandas import DataFrame
 
 from .._logging import logger
+from ._phantom_ev import TimeSeriesReader as TimeSeriesReaderPhantom
 from ._phantom_ev import load_data_from_file as load_data_from_file_phantom
 from ._phantom_ev import time_series_units as time_series_units_phantom
+from ._phantom_ev import update_readers as update_readers_phantom
 
 if TYPE_CHECKING:
     from .simulation import Simulation
@@ -76,6 +78,8 @@ def load_time_series(
     filenames: Union[str, Path, Tuple[str], Tuple[Path], List[str], List[Path]],
     data_source: str = 'Phantom',
     config: Union[str, Path] = None,
+    cache: bool = True,
+    num_workers: int = None,
 ) -> DataFrame:
     """Load time series data from file(s).
 
@@ -95,6 +99,13 @@ def load_time_series(
         The code used to produce the data. Default is 'Phantom'.
     config : optional
         The path to a Plonk config.toml file.
+    cache : optional
+        If True, store the parsed data from each file in the
+        .plonk_cache directory next to it, so later reads of unchanged
+        files do not parse the text again. Default is True.
+    num_workers : optional
+        If greater than 1, read the files in parallel with this many
+        processes. Default is None, i.e. read files one after another.
 
     Returns
     -------
@@ -114,7 +125,73 @@ def load_time_series(
     >>> ts = plonk.load_time_series(file_names)
     """
     if data_source == 'Phantom':
-        return load_data_from_file_phantom(filenames=filenames, config=config)
+        return load_data_from_file_phantom(
+            filenames=filenames, config=config, cache=cache, num_workers=num_workers
+        )
+    raise ValueError('Cannot determine code used to produce time series data')
+
+
+def time_series_reader(
+    data_source: str = 'Phantom', config: Union[str, Path] = None, cache: bool = True
+):
+    """Get an incremental reader of time series files.
+
+    The reader parses only data appended to files since it last read
+    them, for following the time series of a running simulation.
+
+    Parameters
+    ----------
+    data_source : optional
+        The code used to produce the data. Default is 'Phantom'.
+    config : optional
+        The path to a Plonk config.toml file.
+    cache : optional
+        If True, store the parsed data from each file in the
+        .plonk_cache directory next to it. Default is True.
+
+    Returns
+    -------
+    TimeSeriesReader
+        The reader, with an update method to read new data from a list
+        of files and a dataframe method to get the data.
+    """
+    if data_source == 'Phantom':
+        return TimeSeriesReaderPhantom(config=config, cache=cache)
+    raise ValueError('Cannot determine code used to produce time series data')
+
+
+def update_time_series_readers(
+    readers: List[Any],
+    filenames: List[Union[str, Path, List[str], List[Path]]],
+    data_source: str = 'Phantom',
+    num_workers: int = None,
+) -> List[bool]:
+    """Update incremental time series readers together.
+
+    The files of all the readers, e.g. one reader per sink particle,
+    are read in a single pool of processes.
+
+    Parameters
+    ----------
+    readers
+        The readers from time_series_reader.
+    filenames
+        The filename or filenames for each reader.
+    data_source : optional
+        The code used to produce the data. Default is 'Phantom'.
+    num_workers : optional
+        If greater than 1, read the files in parallel with this many
+        processes. Default is None, i.e. read files one after another.
+
+    Returns
+    -------
+    List[bool]
+        True for each reader whose data changed.
+    """
+    if data_source == 'Phantom':
+        return update_readers_phantom(
+            readers=readers, filenames=filenames, num_workers=num_workers
+        )
     raise ValueError('Cannot determine code used to produce time series data')
 
 
@@ -8,6 +8,8 @@ from pathlib import Path
 from typing import Union
 
 from ..utils.strings import is_documented_by
+from .cache import set_default_cache_limit
+from .file_pool import set_open_file_limit
 from .snap import Sinks, Snap, SnapLike, SubSnap
 
 
@@ -16,8 +18,18 @@ def load_snap(
     filename: Union[str, Path],
     data_source: str = 'phantom',
     config: Union[str, Path] = None,
+    memmap: bool = False,
+    precision: str = None,
+    disk_cache: Union[bool, str, Path] = False,
 ):
-    return Snap().load_snap(filename=filename, data_source=data_source, config=config)
+    return Snap().load_snap(
+        filename=filename,
+        data_source=data_source,
+        config=config,
+        memmap=memmap,
+        precision=precision,
+        disk_cache=disk_cache,
+    )
 
 
 __all__ = [
@@ -26,4 +38,6 @@ __all__ = [
     'SnapLike',
     'SubSnap',
     'load_snap',
+    'set_default_cache_limit',
+    'set_open_file_limit',
 ]
@@ -0,0 +1,222 @@
+"""Array cache for Snaps."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, Optional, Union
+
+import numpy as np
+
+from .._units import Quantity
+from .._units import units as plonk_units
+
+_default_max_bytes: Optional[int] = None
+
+
+class ArrayCache:
+    """Least recently used cache of arrays with a memory budget.
+
+    Arrays are evicted in least recently used order when the total size
+    of the cached arrays exceeds the budget. Pinned arrays, e.g. arrays
+    set by the user, are never evicted.
+
+    Parameters
+    ----------
+    max_bytes : optional
+        The memory budget in bytes. If None, there is no limit. Default
+        is the global default set by set_default_cache_limit.
+
+    Attributes
+    ----------
+    hits
+        The number of cache hits.
+    misses
+        The number of cache misses.
+    evictions
+        The number of arrays evicted to stay within the budget.
+    """
+
+    def __init__(self, max_bytes: Optional[int] = -1):
+        self._data: OrderedDict = OrderedDict()
+        self._nbytes: Dict[str, int] = {}
+        self._pinned: set = set()
+        self.max_bytes = _default_max_bytes if max_bytes == -1 else max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the cached arrays in bytes."""
+        return sum(self._nbytes.values())
+
+    def pin(self, name: str) -> None:
+        """Pin an array so that it is never evicted.
+
+        Parameters
+        ----------
+        name
+            The name of the array.
+        """
+        if name not in self._data:
+            raise KeyError(name)
+        self._pinned.add(name)
+
+    def set_limit(self, max_bytes: Optional[int]) -> None:
+        """Set the memory budget, evicting arrays if required.
+
+        Parameters
+        ----------
+        max_bytes
+            The memory budget in bytes. If None, there is no limit.
+        """
+        self.max_bytes = max_bytes
+        self._evict()
+
+    def info(self) -> Dict[str, Any]:
+        """Return cache statistics.
+
+        Returns
+        -------
+        Dict
+            The number of hits, misses, and evictions, the number of
+            cached arrays, the total size in bytes, and the budget in
+            bytes.
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'arrays': len(self._data),
+            'nbytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+        }
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+        total = self.nbytes
+        for name in list(self._data):
+            if total <= self.max_bytes:
+                break
+            if name in self._pinned:
+                continue
+            total -= self._nbytes[name]
+            del self[name]
+            self.evictions += 1
+
+    def __getitem__(self, name: str) -> Quantity:
+        try:
+            array = self._data[name]
+        except KeyError:
+            self.misses += 1
+            raise
+        self.hits += 1
+        self._data.move_to_end(name)
+        return array
+
+    def set(self, name: str, array: Quantity, pin: bool = False) -> None:
+        """Cache an array.
+
+        An unpinned array larger than the budget left by pinned arrays
+        is not cached. A pinned array is always cached, evicting other
+        arrays if required.
+
+        Parameters
+        ----------
+        name
+            The name of the array.
+        array
+            The array.
+        pin : optional
+            If True, pin the array so that it is never evicted. Default
+            is False, unless the array replaces a pinned array.
+        """
+        nbytes = _nbytes(array)
+        pinned = pin or name in self._pinned
+        if name in self._data:
+            del self[name]
+        if pinned:
+            self._pinned.add(name)
+        elif self.max_bytes is not None:
+            pinned_bytes = sum(self._nbytes[key] for key in self._pinned)
+            if nbytes > self.max_bytes - pinned_bytes:
+                # Do not evict everything else for an array that cannot fit
+                return
+        self._data[name] = array
+        self._nbytes[name] = nbytes
+        self._evict()
+
+    def __setitem__(self, name: str, array: Quantity) -> None:
+        self.set(name, array)
+
+    def __delitem__(self, name: str) -> None:
+        del self._data[name]
+        del self._nbytes[name]
+        self._pinned.discard(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._data
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def keys(self):
+        """Return the names of the cached arrays."""
+        return self._data.keys()
+
+    def clear(self) -> None:
+        """Remove all arrays, including pinned arrays."""
+        self._data.clear()
+        self._nbytes.clear()
+        self._pinned.clear()
+
+    def __repr__(self) -> str:
+        return f'<plonk.ArrayCache arrays={len(self)} nbytes={self.nbytes}>'
+
+
+def parse_memory(limit: Union[int, str, None]) -> Optional[int]:
+    """Convert a memory limit to bytes.
+
+    Parameters
+    ----------
+    limit
+        The limit as an integer number of bytes, or a string with
+        units, e.g. '4 GB' or '512 MiB'. If None, there is no limit.
+
+    Returns
+    -------
+    int or None
+        The limit in bytes.
+    """
+    if limit is None:
+        return None
+    if isinstance(limit, str):
+        limit = plonk_units(limit).to('byte').magnitude
+    if limit < 0:
+        raise ValueError('Cache limit must be non-negative')
+    return int(limit)
+
+
+def set_default_cache_limit(limit: Union[int, str, None]) -> None:
+    """Set the default array cache memory budget for new Snaps.
+
+    Parameters
+    ----------
+    limit
+        The limit as an integer number of bytes, or a string with
+        units, e.g. '4 GB'. If None, there is no limit.
+    """
+    global _default_max_bytes
+    _default_max_bytes = parse_memory(limit)
+
+
+def _nbytes(array: Any) -> int:
+    magnitude = getattr(array, 'magnitude', array)
+    if isinstance(magnitude, np.memmap):
+        # Memory-mapped arrays are backed by the file, not by process memory
+        return 0
+    return getattr(magnitude, 'nbytes', 0)
@@ -0,0 +1,216 @@
+"""Persistent on-disk cache of derived arrays."""
+
+from __future__ import annotations
+
+import functools
+import hashlib
+import os
+import shutil
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Optional, Union
+
+import h5py
+import importlib_metadata
+import numpy as np
+
+from .._logging import logger
+from .._units import Quantity
+
+if TYPE_CHECKING:
+    from .snap import Snap
+
+DIRECTORY_NAME = '.plonk_cache'
+
+
+class DiskCache:
+    """On-disk cache of derived arrays.
+
+    Derived arrays are written to one HDF5 file per array, with units,
+    in a directory per snapshot. The snapshot is identified by its path,
+    modification time and size, so a cache entry is not used if the
+    snapshot file changes. Each entry is also keyed by the rotation and
+    translation of the Snap, its config, precision, its properties, and
+    the Plonk version. All the properties are in the key, as the
+    declared requirements of arrays may be incomplete, e.g. the
+    adiabatic index used by temperature.
+
+    Entries are written to a temporary file and renamed, so multiple
+    processes can share a cache directory.
+
+    Parameters
+    ----------
+    directory : optional
+        The cache directory. Default is a directory named .plonk_cache
+        next to the snapshot file.
+    """
+
+    def __init__(self, directory: Union[str, Path] = None):
+        self.directory = None if directory is None else Path(directory).expanduser()
+
+    def snap_directory(self, snap: Snap) -> Path:
+        """Return the cache directory for a Snap.
+
+        Parameters
+        ----------
+        snap
+            The Snap.
+
+        Returns
+        -------
+        Path
+            The directory.
+        """
+        file_path = snap.file_path.resolve()
+        stat = file_path.stat()
+        key = _hash(str(file_path), stat.st_mtime_ns, stat.st_size)
+        directory = self.directory
+        if directory is None:
+            directory = file_path.parent / DIRECTORY_NAME
+        return directory / f'{file_path.stem}_{key}'
+
+    def path(self, snap: Snap, name: str) -> Path:
+        """Return the cache file path for an array.
+
+        Parameters
+        ----------
+        snap
+            The Snap.
+        name
+            The name of the array.
+
+        Returns
+        -------
+        Path
+            The path to the cache file.
+        """
+        if snap.rotation is None:
+            rotation = None
+        else:
+            rotation = np.asarray(snap.rotation.as_quat()).tobytes()
+        if snap.translation is None:
+            translation = None
+        else:
+            translation = np.asarray(
+                snap.translation.to_base_units().magnitude, dtype=float
+            ).tobytes()
+        properties = repr(sorted(snap._properties.items()))
+        key = _hash(
+            rotation,
+            translation,
+            snap._config_key,
+            str(snap._precision),
+            properties,
+            plonk_version(),
+        )
+        return self.snap_directory(snap) / f'{name}_{key}.h5'
+
+    def read(self, snap: Snap, name: str) -> Optional[Quantity]:
+        """Read an array from the cache.
+
+        Parameters
+        ----------
+        snap
+            The Snap.
+        name
+            The name of the array.
+
+        Returns
+        -------
+        Quantity or None
+            The array, or None if it is not in the cache.
+        """
+        path = self.path(snap, name)
+        if not path.is_file():
+            return None
+        try:
+            with h5py.File(path, mode='r') as f:
+                dset = f['data']
+                array = Quantity(dset[()], dset.attrs['units'])
+        except (OSError, KeyError) as e:
+            logger.warning(f'Cannot read {name} from disk cache: {e}')
+            return None
+        logger.debug(f'Read {name} from disk cache: {path}')
+        return array
+
+    def write(self, snap: Snap, name: str, array: Quantity) -> None:
+        """Write an array to the cache.
+
+        Parameters
+        ----------
+        snap
+            The Snap.
+        name
+            The name of the array.
+        array
+            The array.
+        """
+
+        def write(tmp_path: Path):
+            with h5py.File(tmp_path, mode='w') as f:
+                dset = f.create_dataset('data', data=np.asarray(array.magnitude))
+                dset.attrs['units'] = str(array.units)
+
+        write_atomic(self.path(snap, name), write, f'{name} to disk cache')
+
+    def clear(self, snap: Snap) -> None:
+        """Remove all cached arrays for a Snap.
+
+        Parameters
+        ----------
+        snap
+            The Snap.
+        """
+        directory = self.snap_directory(snap)
+        if directory.is_dir():
+            shutil.rmtree(directory)
+
+    def __repr__(self) -> str:
+        return f'<plonk.DiskCache directory="{self.directory}">'
+
+
+def write_atomic(path: Path, write: Callable[[Path], None], description: str) -> bool:
+    """Write a cache file atomically.
+
+    The file is written to a temporary file in the same directory, which
+    is renamed to the path, so other processes never read a partly
+    written file. Errors are logged and the temporary file is removed.
+
+    Parameters
+    ----------
+    path
+        The path to the file.
+    write
+        A function that writes the file to the path it is called with.
+    description
+        A description of the file for log messages.
+
+    Returns
+    -------
+    bool
+        True if the file was written.
+    """
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}')
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        logger.warning(f'Cannot write {description}: {e}')
+        if tmp_path.exists():
+            tmp_path.unlink()
+        return False
+    logger.debug(f'Wrote {description}: {path}')
+    return True
+
+
+@functools.lru_cache(maxsize=None)
+def plonk_version() -> str:
+    """Return the Plonk version, which is part of cache keys.
+
+    The version is read from the package metadata once per process.
+    """
+    return importlib_metadata.version('plonk')
+
+
+def _hash(*args) -> str:
+    return hashlib.sha1(repr(args).encode()).hexdigest()[:16]
@@ -1,8 +1,8 @@
 """Add extra quantities to Snap."""
 
-from .. import analysis
+from ..analysis import discs, particles
 
-MODULES = {'common': analysis.particles, 'disc': analysis.discs}
+MODULES = {'common': particles, 'disc': discs}
 
 
 def add_quantities(snap, category: str = 'common'):
@@ -47,6 +47,10 @@ def _add_array(snap, name, module):
         vector = _vector(name, module)
         dust = _dust(name, module)
         snap._array_registry[name] = getattr(module, name)
+        snap._file_arrays['particles'].discard(name)
+        snap._array_requires[name] = module.array_requires[name] + getattr(
+            module, 'property_requires', {}
+        ).get(name, [])
         if vector is True:
             snap._vector_arrays.add(name)
         if dust is True:
@@ -0,0 +1,117 @@
+"""Pool of open snapshot files."""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+import h5py
+
+from .._logging import logger
+
+DEFAULT_MAX_FILES = 64
+
+
+class FilePool:
+    """Least recently used pool of open HDF5 files.
+
+    Snaps access their file through the pool, which opens it on demand
+    and closes the least recently used file when more than the maximum
+    number of files are open. This bounds the number of open file
+    descriptors for, e.g., a Simulation with thousands of snapshots.
+
+    Parameters
+    ----------
+    max_files : optional
+        The maximum number of open files. If None, there is no limit.
+        Default is 64.
+    """
+
+    def __init__(self, max_files: Optional[int] = DEFAULT_MAX_FILES):
+        self._files: OrderedDict = OrderedDict()
+        self.max_files = max_files
+
+    def open(self, path: Path) -> h5py.File:
+        """Return the open file, opening it if required.
+
+        Parameters
+        ----------
+        path
+            The path to the file.
+
+        Returns
+        -------
+        h5py.File
+            The file.
+        """
+        try:
+            file = self._files[path]
+        except KeyError:
+            file = None
+        if file is None or not file.id.valid:
+            file = h5py.File(path, mode='r')
+            self._files[path] = file
+            self._evict()
+        else:
+            self._files.move_to_end(path)
+        return file
+
+    def close(self, path: Path) -> None:
+        """Close a file.
+
+        Parameters
+        ----------
+        path
+            The path to the file.
+        """
+        file = self._files.pop(path, None)
+        if file is not None:
+            file.close()
+
+    def set_limit(self, max_files: Optional[int]) -> None:
+        """Set the maximum number of open files, closing files if required.
+
+        Parameters
+        ----------
+        max_files
+            The maximum number of open files. If None, there is no limit.
+        """
+        if max_files is not None and max_files < 1:
+            raise ValueError('max_files must be at least 1')
+        self.max_files = max_files
+        self._evict()
+
+    def _evict(self) -> None:
+        if self.max_files is None:
+            return
+        while len(self._files) > self.max_files:
+            path, file = self._files.popitem(last=False)
+            logger.debug(f'Closing least recently used file: {path}')
+            file.close()
+
+    def __contains__(self, path: object) -> bool:
+        return path in self._files
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+    def __repr__(self) -> str:
+        return f'<plonk.FilePool files={len(self)} max_files={self.max_files}>'
+
+
+file_pool = FilePool()
+
+
+def set_open_file_limit(max_files: Optional[int]) -> None:
+    """Set the maximum number of snapshot files open at once.
+
+    Files are closed in least recently used order, and reopened when
+    next accessed.
+
+    Parameters
+    ----------
+    max_files
+        The maximum number of open files. If None, there is no limit.
+    """
+    file_pool.set_limit(max_files)
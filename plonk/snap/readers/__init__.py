@@ -38,18 +38,26 @@
 # )
 #
 # See phantom.py for an example.
+#
+# Optionally, a reader can provide prefetch_datasets to read datasets in
+# parallel for Snap.bulk_load. Registry functions then list the datasets they
+# read in a "datasets" attribute.
 
 from __future__ import annotations
 
-from typing import Any, Callable, Dict, Tuple
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple
 
 import h5py
 
 from ..._units import Quantity
+from .phantom import prefetch_datasets as prefetch_datasets_phantom
 from .phantom import snap_array_registry as snap_array_registry_phantom
 from .phantom import snap_properties_and_units as snap_properties_and_units_phantom
 from .phantom import snap_sink_registry as snap_sink_registry_phantom
 
+if TYPE_CHECKING:
+    from ..snap import Snap
+
 DATA_SOURCES = ['phantom']
 
 
@@ -137,3 +145,22 @@ def snap_sink_registry(
     if data_source.lower() == 'phantom':
         return snap_sink_registry_phantom(file_pointer=file_pointer, name_map=name_map)
     raise RuntimeError('Cannot generate sink registry')
+
+
+def prefetch_datasets(snap: Snap, datasets: List[str], num_workers: int):
+    """Read datasets in parallel into the Snap dataset memo.
+
+    Parameters
+    ----------
+    snap
+        The Snap (or SubSnap) object.
+    datasets
+        The datasets to read.
+    num_workers
+        The number of processes.
+    """
+    if snap.data_source.lower() == 'phantom':
+        return prefetch_datasets_phantom(
+            snap=snap, datasets=datasets, num_workers=num_workers
+        )
+    raise RuntimeError('Cannot prefetch datasets')
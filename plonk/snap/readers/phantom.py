@@ -2,15 +2,19 @@
 
 from __future__ import annotations
 
+import functools
+from multiprocessing.shared_memory import SharedMemory
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, Union
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple, Union
 
 import h5py
 import numpy as np
+from numpy import ndarray
 
 from ..._logging import logger
-from ..._units import Quantity
+from ..._units import Quantity, code_unit
 from ..._units import units as plonk_units
+from ...utils.processes import process_pool
 
 if TYPE_CHECKING:
     from ..snap import Snap
@@ -19,6 +23,12 @@ igas, iboundary, istar, idarkmatter, ibulge = 1, 3, 4, 5, 6
 bignumber = 1e29
 missing_infile_parameters = ['alpha', 'alphaB', 'alphau', 'C_cour', 'C_force', 'tolh']
 
+# Reading a subset of particles: runs of indices separated by fewer than
+# HYPERSLAB_MAX_GAP rows are read as a single hyperslab, and no single
+# hyperslab spans more than HYPERSLAB_MAX_SPAN rows.
+HYPERSLAB_MAX_GAP = 1024
+HYPERSLAB_MAX_SPAN = 2 ** 20
+
 
 def add_to_header_from_infile(
     snapfile: Union[str, Path], infile: Union[str, Path], parameters: List[str] = None,
@@ -80,7 +90,7 @@ def fileid(snap: Snap) -> str:
     str
         The file id.
     """
-    return snap._file_pointer['header/fileident'][()].decode()
+    return read_header(snap, 'fileident').decode()
 
 
 def snap_properties_and_units(
@@ -223,8 +233,13 @@ def snap_array_registry(
     # Derived arrays not stored on file
     array_registry['mass'] = mass
     array_registry['density'] = density
-    array_registry['pressure'] = pressure
-    array_registry['sound_speed'] = sound_speed
+    if header.get('ieos') == 3:
+        # The vertically isothermal equation of state also reads positions
+        array_registry['pressure'] = _reads_position(pressure)
+        array_registry['sound_speed'] = _reads_position(sound_speed)
+    else:
+        array_registry['pressure'] = pressure
+        array_registry['sound_speed'] = sound_speed
 
     # Read *any* extra arrays
     for array in arrays:
@@ -276,6 +291,15 @@ def snap_sink_registry(
     return {}
 
 
+def _reads_position(fn: Callable) -> Callable:
+    @functools.wraps(fn)
+    def func(snap: Snap) -> Quantity:
+        return fn(snap)
+
+    func.datasets = fn.datasets + ['particles/xyz']  # type: ignore
+    return func
+
+
 def get_dataset(dataset: str, group: str) -> Callable:
     """Return a function that returns an array from file.
 
@@ -296,7 +320,7 @@ def get_dataset(dataset: str, group: str) -> Callable:
     """
 
     def func(snap: Snap) -> Quantity:
-        array = snap._file_pointer[f'{group}/{dataset}'][()]
+        array = read_dataset(snap, dataset, group)
         name_map = snap._name_map[group]
         if dataset in name_map:
             name = name_map[dataset]
@@ -310,14 +334,270 @@ def get_dataset(dataset: str, group: str) -> Callable:
                 'assuming dimensionless'
             )
             unit = plonk_units('dimensionless')
+        if isinstance(array, np.memmap):
+            # Attach the code unit without copying the memory-mapped array
+            return Quantity(array, code_unit(unit))
         return array * unit
 
+    func.datasets = [f'{group}/{dataset}']  # type: ignore
     return func
 
 
+def read_dataset(snap: Snap, dataset: str, group: str) -> ndarray:
+    """Read an array from file.
+
+    If the Snap is a SubSnap, only the rows corresponding to its
+    particles are read from the particles group.
+
+    Parameters
+    ----------
+    snap
+        The Snap (or SubSnap) object.
+    dataset
+        The name of the HDF5 dataset, i.e. the array name.
+    group
+        The name of the HDF5 group. For Phantom, this is one of
+        'header', 'particles', or 'sinks'.
+
+    Returns
+    -------
+    ndarray
+        The array without units.
+    """
+    # While an array is being generated from the registry, raw datasets
+    # are memoized so derived arrays sharing a dataset read it only once
+    key = f'{group}/{dataset}'
+    if key in snap._dataset_memo:
+        return snap._dataset_memo[key]
+    dset = snap._file_pointer[key]
+    dtype = _read_dtype(snap, dset)
+    indices = snap._file_indices if group == 'particles' else None
+    array = memmap_dataset(dset) if snap._memmap and dtype is None else None
+    if array is None:
+        array = _read(dset, indices, dtype)
+    elif indices is not None:
+        array = np.asarray(array[indices])
+    if snap._memo_depth > 0:
+        snap._dataset_memo[key] = array
+    return array
+
+
+def prefetch_datasets(snap: Snap, datasets: List[str], num_workers: int):
+    """Read datasets in parallel into the Snap dataset memo.
+
+    Each dataset is read, and decompressed, in a separate process with
+    its own file handle, as the HDF5 library serializes reads from
+    threads. The processes write the datasets into one shared memory
+    segment, and the memo holds views into it, so the data is not copied
+    again. The segment is released when the Snap clears the memo.
+
+    Parameters
+    ----------
+    snap
+        The Snap (or SubSnap) object.
+    datasets
+        The datasets to read, like 'particles/xyz'. Datasets not on file
+        are skipped.
+    num_workers
+        The number of processes.
+    """
+    args = list()
+    size = 0
+    for key in datasets:
+        if key in snap._dataset_memo or key not in snap._file_pointer:
+            continue
+        dset = snap._file_pointer[key]
+        dtype = _read_dtype(snap, dset)
+        if snap._memmap and dtype is None and memmap_dataset(dset) is not None:
+            continue
+        indices = snap._file_indices if key.startswith('particles/') else None
+        shape = dset.shape if indices is None else (len(indices),) + dset.shape[1:]
+        itemsize = (dset.dtype if dtype is None else np.dtype(dtype)).itemsize
+        nbytes = int(np.prod(shape)) * itemsize
+        args.append((key, indices, dtype, shape, size))
+        # Align each dataset in the segment to a cache line
+        size += -(-nbytes // 64) * 64
+    if not args:
+        return
+    logger.debug(f'Reading {len(args)} datasets with {num_workers} processes')
+    shm = SharedMemory(create=True, size=max(size, 1))
+    try:
+        with process_pool(min(num_workers, len(args))) as executor:
+            filename = str(snap.file_path)
+            futures = [
+                executor.submit(_read_to_shared_memory, filename, shm.name, *arg)
+                for arg in args
+            ]
+            dtypes = [future.result() for future in futures]
+    except BaseException:
+        shm.close()
+        raise
+    finally:
+        # The segment stays mapped in this process until it is closed
+        shm.unlink()
+    snap._dataset_buffers.append(shm)
+    for (key, _, _, shape, offset), dtype in zip(args, dtypes):
+        snap._dataset_memo[key] = np.ndarray(
+            shape, dtype=dtype, buffer=shm.buf, offset=offset
+        )
+
+
+def _read_to_shared_memory(
+    filename: str,
+    name: str,
+    key: str,
+    indices: Optional[ndarray],
+    dtype: Optional[np.dtype],
+    shape: Tuple[int, ...],
+    offset: int,
+) -> str:
+    with h5py.File(filename, mode='r') as f:
+        array = _read(f[key], indices, dtype)
+    shm = SharedMemory(name=name)
+    try:
+        out = np.ndarray(shape, dtype=array.dtype, buffer=shm.buf, offset=offset)
+        out[...] = array
+        del out
+    finally:
+        shm.close()
+    return array.dtype.str
+
+
+def _read(
+    dset: h5py.Dataset, indices: Optional[ndarray], dtype: Optional[np.dtype]
+) -> ndarray:
+    if indices is not None:
+        return read_hyperslabs(dset, indices, dtype=dtype)
+    if dtype is None:
+        return dset[()]
+    return dset.astype(dtype)[()]
+
+
+def _read_dtype(snap: Snap, dset: h5py.Dataset) -> Optional[np.dtype]:
+    if snap._precision is not None and dset.dtype.kind == 'f':
+        # Let HDF5 convert floating point data while reading
+        return snap._precision
+    return None
+
+
+def read_header(snap: Snap, name: str) -> Any:
+    """Read a value from the file header.
+
+    Header values are memoized on the Snap until it is reset.
+
+    Parameters
+    ----------
+    snap
+        The Snap (or SubSnap) object.
+    name
+        The name of the header dataset.
+
+    Returns
+    -------
+    Any
+        The header value.
+    """
+    if name not in snap._header_memo:
+        snap._header_memo[name] = snap._file_pointer[f'header/{name}'][()]
+    return snap._header_memo[name]
+
+
+def memmap_dataset(dset: h5py.Dataset) -> Optional[np.memmap]:
+    """Memory-map a dataset directly from the file.
+
+    This is only possible for datasets that are stored contiguously
+    and uncompressed, with a fixed-size numeric data type.
+
+    Parameters
+    ----------
+    dset
+        The h5py dataset.
+
+    Returns
+    -------
+    np.memmap or None
+        A read-only memory-mapped view of the dataset, or None if the
+        dataset cannot be memory-mapped.
+    """
+    if dset.chunks is not None or dset.compression is not None:
+        return None
+    if dset.shape is None or len(dset.shape) == 0 or dset.size == 0:
+        return None
+    if dset.dtype.kind not in 'biuf' or dset.external is not None:
+        return None
+    offset = dset.id.get_offset()
+    if offset is None:
+        return None
+    return np.memmap(
+        dset.file.filename, mode='r', dtype=dset.dtype, offset=offset, shape=dset.shape
+    )
+
+
+def read_hyperslabs(
+    dset: h5py.Dataset, indices: ndarray, dtype: np.dtype = None
+) -> ndarray:
+    """Read rows of a dataset by index via hyperslab selections.
+
+    Indices are sorted and coalesced into runs, and each run is read as
+    a contiguous hyperslab, so memory and I/O scale with the number of
+    indices rather than with the size of the dataset.
+
+    Parameters
+    ----------
+    dset
+        The h5py dataset.
+    indices
+        The row indices to read. They need not be sorted or unique.
+    dtype : optional
+        The data type to convert to while reading. Default is the
+        dataset data type.
+
+    Returns
+    -------
+    ndarray
+        The rows of the dataset in the order given by indices.
+    """
+    num_rows = dset.shape[0]
+    indices = np.asarray(indices, dtype=np.int64)
+    if dtype is None:
+        dtype = dset.dtype
+    source = dset if dtype == dset.dtype else dset.astype(dtype)
+    if indices.size == 0:
+        return np.empty((0,) + dset.shape[1:], dtype=dtype)
+    indices = np.where(indices < 0, indices + num_rows, indices)
+
+    rows, inverse = np.unique(indices, return_inverse=True)
+    if rows[0] < 0 or rows[-1] >= num_rows:
+        raise IndexError('particle index out of range')
+    if rows[-1] - rows[0] + 1 == len(rows):
+        # A single contiguous hyperslab
+        array = source[rows[0] : rows[-1] + 1]
+        return array if len(rows) == len(indices) else array[inverse]
+
+    # Split into runs at large gaps, and split runs that span too many rows
+    run = np.cumsum(np.r_[0, np.diff(rows) > HYPERSLAB_MAX_GAP])
+    run_start = rows[np.r_[0, np.flatnonzero(np.diff(run)) + 1]]
+    block = (rows - run_start[run]) // HYPERSLAB_MAX_SPAN
+    splits = np.flatnonzero((np.diff(run) != 0) | (np.diff(block) != 0)) + 1
+
+    array = np.empty((len(rows),) + dset.shape[1:], dtype=dtype)
+    for first, last in zip(np.r_[0, splits], np.r_[splits, len(rows)]):
+        start, stop = rows[first], rows[last - 1] + 1
+        if stop - start == last - first:
+            array[first:last] = source[start:stop]
+        else:
+            array[first:last] = source[start:stop][rows[first:last] - start]
+
+    if np.array_equal(rows, indices):
+        return array
+    return array[inverse]
+
+
 def particle_id(snap: Snap) -> Quantity:
     """Particle id."""
-    num_particles = snap._file_pointer['header/nparttot'][()]
+    if snap._file_indices is not None:
+        return np.array(snap._file_indices) * plonk_units('dimensionless')
+    num_particles = read_header(snap, 'nparttot')
     return np.arange(num_particles) * plonk_units('dimensionless')
 
 
@@ -333,14 +613,14 @@ def particle_type(snap: Snap) -> Quantity:
     Dark matter |                                     5 | 5
     Bulge       |                                     6 | 6
     """
-    idust = snap._file_pointer['header/idust'][()]
-    ndustlarge = snap._file_pointer['header/ndustlarge'][()]
+    idust = read_header(snap, 'idust')
+    ndustlarge = read_header(snap, 'ndustlarge')
     particle_type = np.abs(get_dataset('itype', 'particles')(snap))
     particle_type[
         (particle_type >= idust) & (particle_type < idust + ndustlarge)
     ] = snap.particle_type['dust']
     try:
-        idustbound = snap._file_pointer['header/idustbound'][()]
+        idustbound = read_header(snap, 'idustbound')
         particle_type[
             (particle_type >= idustbound) & (particle_type < idustbound + ndustlarge)
         ] = snap.particle_type['boundary']
@@ -372,12 +652,12 @@ def sub_type(snap: Snap) -> Quantity:
         | (particle_type == ibulge)
     ] = 0
     sub_type[particle_type == iboundary] = 0
-    idust = snap._file_pointer['header/idust'][()]
-    ndustlarge = snap._file_pointer['header/ndustlarge'][()]
+    idust = read_header(snap, 'idust')
+    ndustlarge = read_header(snap, 'ndustlarge')
     for idx in range(idust, idust + ndustlarge):
         sub_type[particle_type == idx] = idx - idust + 1
     try:
-        idustbound = snap._file_pointer['header/idustbound'][()]
+        idustbound = read_header(snap, 'idustbound')
         for idx in range(idustbound, idustbound + ndustlarge):
             sub_type[particle_type == idx] = idx - idustbound + 1
     except KeyError:
@@ -388,7 +668,7 @@ def sub_type(snap: Snap) -> Quantity:
 
 def mass(snap: Snap) -> Quantity:
     """Particle mass."""
-    massoftype = snap._file_pointer['header/massoftype'][()]
+    massoftype = read_header(snap, 'massoftype')
     particle_type = np.array(
         np.abs(get_dataset('itype', 'particles')(snap)).magnitude, dtype=int
     )
@@ -398,9 +678,7 @@ def mass(snap: Snap) -> Quantity:
 def density(snap: Snap) -> Quantity:
     """Density."""
     m = (mass(snap) / snap._array_code_units['mass']).magnitude
-    h = (
-        get_dataset('h', 'particles')(snap) / snap._array_code_units['smoothing_length']
-    ).magnitude
+    h = read_dataset(snap, 'h', 'particles')
     hfact = snap.properties['smoothing_length_factor']
     rho = m * (hfact / np.abs(h)) ** 3
     return rho * snap._array_code_units['density']
@@ -408,8 +686,8 @@ def density(snap: Snap) -> Quantity:
 
 def pressure(snap: Snap) -> Quantity:
     """Pressure."""
-    ieos = snap._file_pointer['header/ieos'][()]
-    K = 2 / 3 * snap._file_pointer['header/RK2'][()]
+    ieos = read_header(snap, 'ieos')
+    K = 2 / 3 * read_header(snap, 'RK2')
     gamma = snap.properties['adiabatic_index']
     rho = density(snap)
     if ieos == 1:
@@ -435,17 +713,16 @@ def pressure(snap: Snap) -> Quantity:
     if ieos == 3:
         # Vertically isothermal (for accretion disc)
         K = K * snap.code_units['length'] ** 2 * snap.code_units['time'] ** (-2)
-        q = snap._file_pointer['header/qfacdisc'][()]
-        pos = get_dataset('xyz', 'particles')(snap)
+        q = read_header(snap, 'qfacdisc')
+        pos = read_dataset(snap, 'xyz', 'particles')
         r_squared = pos[:, 0] ** 2 + pos[:, 1] ** 2 + pos[:, 2] ** 2
-        r_squared = (r_squared / snap._array_code_units['position'] ** 2).magnitude
         return K * rho * r_squared ** (-q)
     raise ValueError('Unknown equation of state')
 
 
 def sound_speed(snap: Snap) -> Quantity:
     """Sound speed."""
-    ieos = snap._file_pointer['header/ieos'][()]
+    ieos = read_header(snap, 'ieos')
     gamma = snap.properties['adiabatic_index']
     rho = density(snap)
     P = pressure(snap)
@@ -459,6 +736,8 @@ def sound_speed(snap: Snap) -> Quantity:
 def stopping_time(snap: Snap) -> Quantity:
     """Dust stopping time."""
     stopping_time = get_dataset('tstop', 'particles')(snap)
+    if not stopping_time.magnitude.flags.writeable:
+        stopping_time = stopping_time.copy()
     stopping_time[stopping_time == bignumber] = np.inf * snap.code_units['time']
     return stopping_time
 
@@ -477,3 +756,16 @@ def dust_to_gas_ratio(snap: Snap) -> Quantity:
             'Dust fraction only available for "dust as separate sets of particles"'
         )
     return get_dataset('dustfrac', 'particles')(snap)
+
+
+# Datasets read by the derived arrays, used to prefetch datasets
+particle_id.datasets = []  # type: ignore
+particle_type.datasets = ['particles/itype']  # type: ignore
+sub_type.datasets = ['particles/itype']  # type: ignore
+mass.datasets = ['particles/itype']  # type: ignore
+density.datasets = ['particles/itype', 'particles/h']  # type: ignore
+pressure.datasets = ['particles/itype', 'particles/h', 'particles/u']  # type: ignore
+sound_speed.datasets = pressure.datasets  # type: ignore
+stopping_time.datasets = ['particles/tstop']  # type: ignore
+dust_fraction.datasets = ['particles/dustfrac']  # type: ignore
+dust_to_gas_ratio.datasets = ['particles/dustfrac']  # type: ignore
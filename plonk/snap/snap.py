@@ -8,33 +8,52 @@ accessing a subset of particles in a Snap.
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Tuple, Union
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 import h5py
 import numpy as np
-import pandas as pd
 from numpy import ndarray
-from pandas import DataFrame
-from scipy.spatial import cKDTree
-from scipy.spatial.transform import Rotation
 
-from .. import visualize
 from .._config import read_config
 from .._logging import logger
 from .._units import Quantity, array_units, generate_array_code_units
 from .._units import units as plonk_units
-from ..utils.kernels import kernel_names, kernel_radius
+from ..utils.lazy import LazyMethod
 from ..utils.math import norm
 from ..utils.snap import add_aliases
 from . import context
+from .cache import ArrayCache, parse_memory
+from .disk_cache import DiskCache
+from .file_pool import file_pool
 from .extra import add_quantities as _add_quantities
 from .readers import (
     DATA_SOURCES,
+    prefetch_datasets,
     snap_array_registry,
     snap_properties_and_units,
     snap_sink_registry,
 )
 
+if TYPE_CHECKING:
+    from pandas import DataFrame
+    from scipy.spatial import cKDTree
+    from scipy.spatial.transform import Rotation
+
+# A SubSnap with at most this fraction of the particles in the file reads
+# its arrays from file, otherwise it indexes the arrays of the base Snap
+SUBSNAP_READ_FRACTION = 0.1
+
 
 class Snap:
     """Smoothed particle hydrodynamics Snap object.
@@ -124,12 +143,23 @@ class Snap:
         self._array_code_units = {}
         self._array_registry: Dict[str, Callable] = {}
         self._sink_registry: Dict[str, Callable] = {}
+        self._file_arrays: Dict[str, set] = {'particles': set(), 'sinks': set()}
+        self._array_requires: Dict[str, List[str]] = {}
+        self._unit_factors: Dict[Tuple[str, Any], Tuple[Any, float]] = {}
         self._name_map = {}
         self._cache_arrays = True
-        self._arrays = {}
+        self._arrays = ArrayCache()
         self._sink_arrays = {}
         self._sinks = None
-        self._file_pointer = None
+        self._file_indices = None
+        self._memmap = False
+        self._precision = None
+        self._disk_cache = None
+        self._config_key = None
+        self._dataset_memo = {}
+        self._dataset_buffers = []
+        self._header_memo = {}
+        self._memo_depth = 0
         self._num_particles = -1
         self._num_particles_of_type = -1
         self._num_sinks = -1
@@ -137,12 +167,16 @@ class Snap:
         self.rotation = None
         self.translation = None
         self._tree = None
+        self._footprints = {}
 
     def load_snap(
         self,
         filename: Union[str, Path],
         data_source: str,
         config: Union[str, Path] = None,
+        memmap: bool = False,
+        precision: str = None,
+        disk_cache: Union[bool, str, Path] = False,
     ):
         """Load snapshot from file.
 
@@ -154,6 +188,29 @@ class Snap:
             The SPH software that produced the data. Default is 'phantom'.
         config : optional
             The path to a Plonk config.toml file.
+        memmap : optional
+            If True, read uncompressed, contiguous datasets as
+            memory-mapped arrays. Data is then paged in from the file on
+            demand and the OS page cache is shared between processes
+            reading the same file. The arrays are read-only and in code
+            units, not the default units, as converting them would copy
+            them. Convert them with .to(), e.g. snap['position'].to('au').
+            Default is False.
+        precision : optional
+            The floating point precision of particle and sink arrays,
+            either 'float32' or 'float64'. Data on file is converted
+            while reading, and arrays calculated from it are converted
+            before they are cached. Single precision halves the memory
+            required. If None, arrays keep the precision they are
+            read or calculated in. Default is None.
+        disk_cache : optional
+            If True, or a path to a directory, store derived arrays in a
+            persistent on-disk cache and read them from there instead
+            of recalculating them, e.g. in a later session. If True, the
+            cache is in a directory named .plonk_cache next to the
+            snapshot file. Only arrays with declared requirements that
+            are read from file, or are themselves cacheable, are stored.
+            Default is False.
         """
         logger.debug(f'Loading Phantom snapshot: {filename}')
 
@@ -163,8 +220,13 @@ class Snap:
             raise FileNotFoundError('Cannot find snapshot file')
         self.file_path = file_path
 
-        # Set file_pointer
-        self._file_pointer = h5py.File(file_path, mode='r')
+        self._memmap = memmap
+
+        # Set precision
+        if precision is not None:
+            if precision not in ('float32', 'float64'):
+                raise ValueError('precision must be "float32" or "float64"')
+            self._precision = np.dtype(precision)
 
         # Set data_source
         if data_source.lower() not in DATA_SOURCES:
@@ -182,6 +244,7 @@ class Snap:
 
         # Set name_map
         conf = read_config(filename=config)
+        self._config_key = repr(conf)
         self._name_map = {
             'particles': conf[self.data_source]['particles']['namemap'],
             'sinks': conf[self.data_source]['sinks']['namemap'],
@@ -205,6 +268,19 @@ class Snap:
             )
         )
 
+        # Arrays from the reader depend on rotation and translation only via
+        # the transformations applied in _get_array_from_registry
+        self._file_arrays = {
+            'particles': set(self._array_registry),
+            'sinks': set(self._sink_registry),
+        }
+
+        # Set disk cache
+        if disk_cache is True:
+            self._disk_cache = DiskCache()
+        elif disk_cache:
+            self._disk_cache = DiskCache(directory=disk_cache)
+
         # Add aliases
         add_aliases(self, filename=config)
 
@@ -213,15 +289,25 @@ class Snap:
 
         return self
 
+    @property
+    def _file_pointer(self) -> h5py.File:
+        """The underlying file, opened on demand via the file pool."""
+        return file_pool.open(self.file_path)
+
     def close_file(self):
-        """Close access to underlying file."""
-        self._file_pointer.close()
+        """Close access to underlying file.
+
+        The file is reopened automatically when next accessed.
+        """
+        file_pool.close(self.file_path)
 
     def reopen_file(self):
         """Re-open access to the underlying file."""
-        self._file_pointer = h5py.File(self.file_path, mode='r')
+        file_pool.open(self.file_path)
 
-    def add_array(self, vector: bool = False, dust: bool = False) -> Callable:
+    def add_array(
+        self, vector: bool = False, dust: bool = False, requires: List[str] = None
+    ) -> Callable:
         """Decorate function to add array to Snap.
 
         This function decorates a function that returns an array. The
@@ -241,6 +327,13 @@ class Snap:
         dust
             A bool to represent if the array is a dust array, in that
             it has one column per dust species. Default is False.
+        requires : optional
+            A list of the arrays (or Snap properties) the array is
+            calculated from. If set, the array is only unloaded on
+            rotation or translation if it depends on a vector array, and
+            it is unloaded when any of its requirements are unloaded or
+            changed. If None, the array is always unloaded on rotation
+            or translation. Default is None.
 
         Returns
         -------
@@ -250,6 +343,11 @@ class Snap:
 
         def _add_array(fn):
             self._array_registry[fn.__name__] = fn
+            self._file_arrays['particles'].discard(fn.__name__)
+            if requires is not None:
+                self._array_requires[fn.__name__] = list(requires)
+            else:
+                self._array_requires.pop(fn.__name__, None)
             if vector is True:
                 self._vector_arrays.add(fn.__name__)
             if dust is True:
@@ -378,7 +476,7 @@ class Snap:
         """
         return self._available_arrays(sinks=False, verbose=verbose, aliases=aliases)
 
-    def bulk_load(self, arrays: List[str] = None) -> Snap:
+    def bulk_load(self, arrays: List[str] = None, num_workers: int = None) -> Snap:
         """Load arrays into memory in bulk.
 
         Parameters
@@ -386,17 +484,41 @@ class Snap:
         arrays
             A list of arrays to load as strings. If None, then load all
             available arrays.
+        num_workers : optional
+            If greater than 1, first read the datasets on file required
+            for the arrays in parallel with this many processes. Reading
+            and decompressing datasets in parallel can make better use
+            of the bandwidth of parallel file systems. Default is None,
+            i.e. read datasets one after another.
         """
         if arrays is None:
             _arrays = self.available_arrays()
         else:
-            _arrays = arrays
-        with self.context(cache=True):
-            for array in _arrays:
-                try:
-                    self[array]
-                except ValueError as e:
-                    logger.warning(f'Cannot load {array}\n{e}')
+            _arrays = self._with_requirements(arrays)
+        parallel = num_workers is not None and num_workers > 1
+        if parallel:
+            # Keep the prefetched datasets until all arrays are loaded
+            self._memo_depth += 1
+        try:
+            if parallel:
+                datasets: List[str] = []
+                for array in _arrays:
+                    fn = self._array_registry.get(array)
+                    for dataset in getattr(fn, 'datasets', []):
+                        if dataset not in datasets:
+                            datasets.append(dataset)
+                prefetch_datasets(self, datasets, num_workers)
+            with self.context(cache=True):
+                for array in _arrays:
+                    try:
+                        self[array]
+                    except ValueError as e:
+                        logger.warning(f'Cannot load {array}\n{e}')
+        finally:
+            if parallel:
+                self._memo_depth -= 1
+                if self._memo_depth == 0:
+                    self._clear_dataset_memo()
 
         return self
 
@@ -413,7 +535,11 @@ class Snap:
             _arrays = self.loaded_arrays()
         else:
             _arrays = arrays
+        loaded = set(self.loaded_arrays())
         for array in _arrays:
+            if array in loaded and array not in self.loaded_arrays():
+                # Already unloaded with an array it depends on
+                continue
             try:
                 del self[array]
             except KeyError:
@@ -528,6 +654,46 @@ class Snap:
     def cache_arrays(self, value):
         self._cache_arrays = value
 
+    def set_cache_limit(self, limit: Union[int, str, None]) -> Snap:
+        """Set the memory budget for cached particle arrays.
+
+        When the cached arrays exceed the budget, the least recently
+        used arrays are evicted. Arrays set by the user are never
+        evicted. The default for new Snaps can be set with
+        plonk.snap.set_default_cache_limit.
+
+        Parameters
+        ----------
+        limit
+            The limit as an integer number of bytes, or a string with
+            units, e.g. '4 GB'. If None, there is no limit.
+
+        Returns
+        -------
+        Snap
+            The Snap.
+
+        Examples
+        --------
+        Limit the cached arrays to 4 GB.
+
+        >>> snap.set_cache_limit('4 GB')
+        """
+        self._arrays.set_limit(parse_memory(limit))
+        return self
+
+    def cache_info(self) -> Dict[str, Any]:
+        """Return particle array cache statistics.
+
+        Returns
+        -------
+        Dict
+            The number of hits, misses, and evictions, the number of
+            cached arrays, the total size in bytes, and the budget in
+            bytes.
+        """
+        return self._arrays.info()
+
     def reset(
         self, arrays: bool = False, rotation: bool = True, translation: bool = True
     ) -> Snap:
@@ -558,6 +724,9 @@ class Snap:
                     del self._sink_arrays[arr]
         else:
             logger.warning('Select something to reset')
+        self._clear_dataset_memo()
+        self._header_memo.clear()
+        self._footprints.clear()
 
         if rotation:
             self.rotation = None
@@ -609,13 +778,11 @@ class Snap:
         else:
             _rotation = axis / norm(axis) * angle
         if isinstance(_rotation, (list, tuple, ndarray)):
+            from scipy.spatial.transform import Rotation
+
             _rotation = Rotation.from_rotvec(_rotation)
 
-        for arr in self.loaded_arrays():
-            del self[arr]
-        if self.num_sinks > 0:
-            for arr in self.sinks.loaded_arrays():
-                del self._sink_arrays[arr]
+        self._transform_loaded_arrays(rotation=_rotation)
 
         if self.rotation is None:
             self.rotation = _rotation
@@ -662,11 +829,7 @@ class Snap:
                 )
             translation *= plonk_units(unit)
 
-        for arr in self.loaded_arrays():
-            del self[arr]
-        if self.num_sinks > 0:
-            for arr in self.sinks.loaded_arrays():
-                del self._sink_arrays[arr]
+        self._transform_loaded_arrays(translation=translation)
 
         if self.translation is None:
             self.translation = translation
@@ -675,6 +838,110 @@ class Snap:
 
         return self
 
+    def _transform_loaded_arrays(
+        self, rotation: Rotation = None, translation: Quantity = None
+    ):
+        """Apply a rotation or translation to loaded arrays.
+
+        Arrays read from file are transformed in memory: vector arrays
+        are rotated about the current origin and position is translated,
+        while other arrays from file are unchanged. Derived arrays which
+        depend on transformed arrays, and arrays with undeclared
+        dependencies, e.g. set by the user, are unloaded.
+        """
+        self._tree = None
+        self._footprints.clear()
+        if rotation is not None:
+            changed = self._vector_arrays & self._file_arrays['particles']
+        else:
+            changed = {'position'}
+        stale = self._dependents(changed)
+        loaded = {'particles': self._arrays, 'sinks': self._sink_arrays}
+        for group, arrays in loaded.items():
+            for name in list(arrays.keys()):
+                if name not in self._file_arrays[group]:
+                    if (
+                        group == 'sinks'
+                        or name in stale
+                        or name not in self._array_requires
+                    ):
+                        del arrays[name]
+                    continue
+                if rotation is not None and name in self._vector_arrays:
+                    array = arrays[name]
+                    if name == 'position' and self.translation is not None:
+                        array = array - self.translation
+                    array = rotation.apply(array.magnitude) * array.units
+                    if name == 'position' and self.translation is not None:
+                        array = array + self.translation
+                    arrays[name] = self._to_precision(array)
+                if translation is not None and name == 'position':
+                    arrays[name] = self._to_precision(arrays[name] + translation)
+
+    def _dependents(self, names: Iterable[str]) -> Set[str]:
+        """Return arrays which depend, directly or indirectly, on names."""
+        dependents: Set[str] = set()
+        queue = list(names)
+        while queue:
+            name = queue.pop()
+            for array, requires in self._array_requires.items():
+                if name in requires and array not in dependents:
+                    dependents.add(array)
+                    queue.append(array)
+        return dependents
+
+    def _with_requirements(self, names: Iterable[str]) -> List[str]:
+        """Return arrays preceded by the arrays they are calculated from."""
+        ordered: List[str] = []
+
+        def visit(name):
+            if name in ordered:
+                return
+            for required in self._array_requires.get(name, []):
+                if required in self._array_registry:
+                    visit(required)
+            ordered.append(name)
+
+        for name in names:
+            visit(name)
+        return ordered
+
+    def _requirements(self, name: str) -> Set[str]:
+        """Return arrays and properties which name depends on."""
+        requirements: Set[str] = set()
+        queue = [name]
+        while queue:
+            for required in self._array_requires.get(queue.pop(), []):
+                if required not in requirements:
+                    requirements.add(required)
+                    queue.append(required)
+        return requirements
+
+    def _disk_cacheable(self, name: str) -> bool:
+        """Whether an array can be stored in the disk cache.
+
+        The array must be derived, with declared requirements which are
+        Snap properties, arrays from file, or arrays which are
+        themselves disk cacheable.
+        """
+        if name in self._file_arrays['particles'] or name not in self._array_requires:
+            return False
+        for required in self._requirements(name):
+            if required in self._arrays and required not in self._array_registry:
+                return False
+            if required in self._array_registry:
+                if required in self._file_arrays['particles']:
+                    continue
+                if required not in self._array_requires:
+                    return False
+        return True
+
+    def _unload_dependents(self, names: Iterable[str]) -> None:
+        """Unload loaded arrays which depend on names."""
+        for array in self._dependents(names):
+            if array in self._arrays:
+                del self._arrays[array]
+
     def particle_indices(
         self, particle_type: str, squeeze: bool = False
     ) -> Union[ndarray, List[ndarray]]:
@@ -780,6 +1047,8 @@ class Snap:
         Snap
             The Snap.
         """
+        from ..utils.kernels import kernel_names
+
         if kernel not in kernel_names:
             raise ValueError(f'Kernel must be in {kernel_names}')
         self._properties['kernel'] = kernel
@@ -823,6 +1092,7 @@ class Snap:
             'position': barycenter,
             'velocity': velocity,
         }
+        self._unload_dependents(['central_body'])
 
         return self
 
@@ -845,6 +1115,7 @@ class Snap:
             The Snap.
         """
         self._properties['molecular_weight'] = molecular_weight
+        self._unload_dependents(['molecular_weight'])
         return self
 
     @property
@@ -854,6 +1125,8 @@ class Snap:
         Trees are represented by scipy cKDTree objects.
         """
         if self._tree is None:
+            from scipy.spatial import cKDTree
+
             pos: Quantity = self['position']
             self._tree = cKDTree(pos.magnitude)
         return self._tree
@@ -881,6 +1154,8 @@ class Snap:
         subsnap = self[indices]
         position: Quantity = subsnap['position']
         smoothing_length: Quantity = subsnap['smoothing_length']
+        from ..utils.kernels import kernel_radius
+
         r_kern = kernel_radius[kernel]
 
         neighbours = self.tree.query_ball_point(
@@ -1001,6 +1276,8 @@ class Snap:
             if array.ndim == 2:
                 for idx in range(array.shape[1]):
                     d[f'{name}.{idx+1}' + suffix] = array[:, idx]
+        import pandas as pd
+
         return pd.DataFrame(d)
 
     def family(self, name: str, squeeze: bool = False) -> Union[SubSnap, List[SubSnap]]:
@@ -1115,6 +1392,8 @@ class Snap:
         str
             The base array name.
         """
+        if name in self._arrays or name in self._array_registry:
+            return name
         if name in self.available_arrays():
             return name
         if self.num_sinks > 0 and name in self.sinks.available_arrays():
@@ -1141,6 +1420,8 @@ class Snap:
         raise ValueError('Unknown array')
 
     def _array_suffix(self, name: str) -> str:
+        if name in self._arrays or name in self._array_registry:
+            return ''
         if name in self.available_arrays() or name in self._array_aliases:
             return ''
         if self.num_sinks > 0 and name in self.sinks.available_arrays():
@@ -1188,17 +1469,48 @@ class Snap:
 
         raise ValueError('Unknown array')
 
+    def _clear_dataset_memo(self):
+        # Arrays computed from the memoized datasets do not share memory
+        # with them, so any buffers holding the datasets can be released
+        self._dataset_memo.clear()
+        while self._dataset_buffers:
+            self._dataset_buffers.pop().close()
+
     def _get_array_from_registry(self, name: str, sinks: bool = False) -> Quantity:
-        if sinks:
-            array = self._sink_registry[name](self)
-        else:
-            array = self._array_registry[name](self)
+        # Raw datasets read while generating the array (including any arrays
+        # it depends on) are memoized until the outermost call returns
+        self._memo_depth += 1
+        try:
+            if sinks:
+                array = self._sink_registry[name](self)
+            else:
+                array = self._array_registry[name](self)
+        finally:
+            self._memo_depth -= 1
+            if self._memo_depth == 0:
+                self._clear_dataset_memo()
         if self.rotation is not None and name in self._vector_arrays:
             array_m, array_u = array.magnitude, array.units
             array = self.rotation.apply(array_m) * array_u
         if self.translation is not None and name == 'position':
-            array += self.translation
-        return array
+            if isinstance(array.magnitude, np.memmap):
+                array = array + self.translation
+            else:
+                array += self.translation
+        return self._to_precision(array)
+
+    def _to_precision(self, array: Quantity) -> Quantity:
+        """Convert a floating point array to the Snap precision."""
+        magnitude = array.magnitude
+        if (
+            self._precision is None
+            or not isinstance(magnitude, ndarray)
+            or isinstance(magnitude, np.memmap)
+            or magnitude.dtype.kind != 'f'
+            or magnitude.dtype == self._precision
+        ):
+            return array
+        return Quantity(magnitude.astype(self._precision), array.units)
 
     def _get_array(self, name: str, sinks: bool = False) -> Quantity:
         """Get an array by name."""
@@ -1206,25 +1518,72 @@ class Snap:
             array_dict = self._sink_arrays
         else:
             array_dict = self._arrays
-        if name in array_dict:
-            if name in self.default_units:
-                return array_dict[name].to(self.default_units[name])
-            return array_dict[name]
+        registry = self._sink_registry if sinks else self._array_registry
+        try:
+            array = array_dict[name]
+        except KeyError:
+            pass
+        else:
+            converted = self._to_default_units(name, array)
+            if converted is not array:
+                # Keep the array in its new default unit for the next access
+                array_dict[name] = converted
+            if name in registry:
+                return _read_only(converted)
+            return converted
         if name in self._array_registry or name in self._sink_registry:
-            if name in self.default_units:
-                array = self._get_array_from_registry(name, sinks).to(
-                    self.default_units[name]
-                )
-            else:
+            disk_cache = (
+                self._disk_cache
+                if not sinks
+                and self._disk_cache is not None
+                and self._disk_cacheable(name)
+                else None
+            )
+            array = None
+            if disk_cache is not None:
+                array = disk_cache.read(self, name)
+            if array is None:
                 array = self._get_array_from_registry(name, sinks)
+                if disk_cache is not None:
+                    disk_cache.write(self, name, array)
+            array = self._to_default_units(name, array)
             if self.cache_arrays:
                 if sinks:
                     self._sink_arrays[name] = array
                 else:
                     self._arrays[name] = array
+                return _read_only(array)
             return array
         raise ValueError('Array not available')
 
+    def _to_default_units(self, name: str, array: Quantity) -> Quantity:
+        """Convert an array to its default unit.
+
+        Conversion factors are cached on the Snap, and an array already
+        in its default unit is returned as is, without a copy.
+        """
+        unit = self._default_units.get(name)
+        if unit is None or isinstance(array.magnitude, np.memmap):
+            # Memory-mapped arrays stay in code units, so are not copied
+            return array
+        key = (unit, array.units)
+        try:
+            target, factor = self._unit_factors[key]
+        except KeyError:
+            target = plonk_units(unit).units
+            factor = float(Quantity(1.0, array.units).to(target).magnitude)
+            if Quantity(0.0, array.units).to(target).magnitude != 0:
+                # Offset units, e.g. degC, need a full conversion
+                factor = None
+            elif factor == 1 and target == array.units:
+                target = None
+            self._unit_factors[key] = (target, factor)
+        if target is None:
+            return array
+        if factor is None:
+            return array.to(target)
+        return Quantity(array.magnitude * factor, target)
+
     def _getitem(
         self, inp: Union[str, ndarray, int, slice], sinks: bool = False,
     ) -> Union[Quantity, SubSnap, List[SubSnap]]:
@@ -1257,11 +1616,12 @@ class Snap:
                 'Attempting to set array already available. '
                 'See snap.available_arrays().'
             )
-        self._arrays[name] = item
+        self._arrays.set(name, item, pin=True)
 
     def __delitem__(self, name):
-        """Delete an array from memory."""
+        """Delete an array, and arrays that depend on it, from memory."""
         del self._arrays[name]
+        self._unload_dependents([name])
 
     def _ipython_key_completions_(self) -> List[str]:
         """Tab completion for IPython __getitem__ method."""
@@ -1280,9 +1640,9 @@ class Snap:
         return f'<plonk.Snap "{self.file_path.name}">'
 
     # Add methods defined in other modules
-    image = visualize.image
-    plot = visualize.plot
-    vector = visualize.vector
+    image = LazyMethod('plonk.visualize.visualization', 'image')
+    plot = LazyMethod('plonk.visualize.visualization', 'plot')
+    vector = LazyMethod('plonk.visualize.visualization', 'vector')
     context = context.context
     add_quantities = _add_quantities
 
@@ -1331,12 +1691,23 @@ class SubSnap(Snap):
         if len(ind) == 0:
             logger.warning('SubSnap has no particles')
         self._indices = ind
+        ind = np.asarray(ind, dtype=int)
+        ind = np.where(ind < 0, ind + len(base), ind)
+        if isinstance(base, SubSnap):
+            self._root = base._root
+            self._file_indices = base._file_indices[ind]
+        else:
+            self._root = base
+            self._file_indices = ind
 
         # Attributes different to Snap
         self._num_particles = len(self._indices)
         self._num_particles_of_type = -1
         self._num_dust_species = -1
         self._tree = None
+        self._footprints = {}
+        self._subset_arrays = ArrayCache(base._arrays.max_bytes)
+        self._subset_transform: Tuple[Any, Any] = (None, None)
 
         # Attributes same as Snap
         self.data_source = self.base.data_source
@@ -1347,10 +1718,21 @@ class SubSnap(Snap):
         self._array_code_units = self.base._array_code_units
         self._array_registry = self.base._array_registry
         self._sink_registry = self.base._sink_registry
+        self._file_arrays = self.base._file_arrays
+        self._array_requires = self.base._array_requires
+        self._unit_factors = self.base._unit_factors
+        self._name_map = self.base._name_map
         self._cache_arrays = self.base._cache_arrays
         self._arrays = self.base._arrays
         self._sink_arrays = self.base._sink_arrays
-        self._file_pointer = self.base._file_pointer
+        self._memmap = self.base._memmap
+        self._precision = self.base._precision
+        self._disk_cache = self.base._disk_cache
+        self._config_key = self.base._config_key
+        self._dataset_memo = {}
+        self._dataset_buffers = []
+        self._header_memo = self.base._header_memo
+        self._memo_depth = 0
         self.rotation = self.base.rotation
         self.translation = self.base.translation
 
@@ -1372,8 +1754,121 @@ class SubSnap(Snap):
         """Dunder str method."""
         return f'<plonk.SubSnap "{self.file_path.name}">'
 
+    def loaded_arrays(self) -> List[str]:
+        """Return a list of loaded arrays.
+
+        Returns
+        -------
+        List
+            A list of names of loaded particle arrays.
+        """
+        return sorted(set(self._arrays.keys()) | set(self._subset_arrays.keys()))
+
+    def bulk_load(self, arrays: List[str] = None, num_workers: int = None) -> SubSnap:
+        """Load arrays into memory in bulk.
+
+        Parameters
+        ----------
+        arrays
+            A list of arrays to load as strings. If None, then load all
+            available arrays.
+        num_workers : optional
+            If greater than 1, first read the datasets on file required
+            for the arrays in parallel with this many processes. Default
+            is None, i.e. read datasets one after another.
+        """
+        if not self._read_from_file():
+            # The arrays are indexed from the base Snap, so load them there
+            self.base.bulk_load(arrays=arrays, num_workers=num_workers)
+            return self
+        super().bulk_load(arrays=arrays, num_workers=num_workers)
+        return self
+
+    def reset(
+        self, arrays: bool = False, rotation: bool = True, translation: bool = True
+    ) -> SubSnap:
+        """Reset Snap.
+
+        Reset rotation and translations transformations on the Snap to
+        initial (on-file) values. In addition, unload cached arrays.
+
+        Parameters
+        ----------
+        arrays
+            Set to True to unload arrays from memory. Default is False.
+        rotation
+            Set to True to reset rotation. Default is True.
+        translation
+            Set to True to reset translation. Default is True.
+
+        Returns
+        -------
+        SubSnap
+            The reset SubSnap. Note that the reset operation is in-place.
+        """
+        if any((arrays, rotation, translation)):
+            self._subset_arrays.clear()
+        super().reset(arrays=arrays, rotation=rotation, translation=translation)
+        return self
+
+    def __delitem__(self, name):
+        """Delete an array, and arrays that depend on it, from memory."""
+        if name not in self._subset_arrays and name not in self._arrays:
+            raise KeyError(name)
+        if name in self._subset_arrays:
+            del self._subset_arrays[name]
+        if name in self._arrays:
+            del self._arrays[name]
+        self._unload_dependents([name])
+
+    def _unload_dependents(self, names: Iterable[str]) -> None:
+        """Unload loaded arrays which depend on names."""
+        super()._unload_dependents(names)
+        for array in self._dependents(names):
+            if array in self._subset_arrays:
+                del self._subset_arrays[array]
+
+    def _read_from_file(self) -> bool:
+        """Whether to read arrays of the particles from file.
+
+        Small subsets read only their rows from file, while large
+        subsets, e.g. a family, index the arrays of the base Snap.
+        """
+        return len(self) <= SUBSNAP_READ_FRACTION * len(self._root)
+
     def _get_array(self, name: str, sinks: bool = False) -> Quantity:
-        return self.base._get_array(name, sinks)[self.indices]
+        if (
+            sinks
+            or name in self._arrays
+            or name not in self._array_registry
+            or not self._read_from_file()
+        ):
+            return self.base._get_array(name, sinks)[self.indices]
+        # Arrays read from file have the transformations of the base Snap
+        # at the time, so drop them if those have changed
+        rotation, translation = self._root.rotation, self._root.translation
+        _rotation, _translation = self._subset_transform
+        if rotation is not _rotation or not _equal(translation, _translation):
+            self._subset_arrays.clear()
+            self._subset_transform = (
+                rotation,
+                None if translation is None else translation.copy(),
+            )
+        if name in self._subset_arrays:
+            array = self._subset_arrays[name]
+            converted = self._to_default_units(name, array)
+            if converted is not array:
+                self._subset_arrays[name] = converted
+            return _read_only(converted)
+        # Read only the particles in the SubSnap from file, applying the
+        # current transformations on the base Snap
+        self.rotation = rotation
+        self.translation = translation
+        array = self._to_default_units(name, self._get_array_from_registry(name))
+        if self.cache_arrays:
+            self._subset_arrays[name] = array
+            return _read_only(array)
+        return array
 
 
 SnapLike = Union[Snap, SubSnap]
@@ -1535,7 +2030,7 @@ class Sinks:
         """Tab completion for IPython __getitem__ method."""
         return self.available_arrays(verbose=True)
 
-    plot = visualize.plot
+    plot = LazyMethod('plonk.visualize.visualization', 'plot')
 
 
 def _str_is_int(string: str) -> bool:
@@ -1564,3 +2059,20 @@ def _input_indices_array(
         i2 = inp.stop if inp.stop is not None else max_slice
         return np.arange(i1, i2, inp.step)
     return []
+
+
+def _equal(a: Optional[Quantity], b: Optional[Quantity]) -> bool:
+    """Whether two optional quantities are equal."""
+    if a is None or b is None:
+        return a is None and b is None
+    return a.units == b.units and np.array_equal(a.magnitude, b.magnitude)
+
+
+def _read_only(array: Quantity) -> Quantity:
+    """Return a read-only view of a cached array."""
+    magnitude = array.magnitude
+    if not isinstance(magnitude, ndarray) or not magnitude.flags.writeable:
+        return array
+    view = magnitude.view()
+    view.flags.writeable = False
+    return Quantity(view, array.units)
@@ -0,0 +1,142 @@
+"""Numba compilation and caching.
+
+Numba functions in Plonk are compiled on first call and cached to disk,
+so later processes load the compiled machine code instead of compiling
+again. Each function registers explicit signatures for the types it is
+called with, e.g. float64 positions with the float32 smoothing length of
+Phantom files, or float32 arrays for single precision Snaps, which can be
+compiled ahead of time with warmup, e.g. from the command line with
+"plonk warmup". Calls with other types are compiled, and cached, as
+required.
+
+The cache is written to __pycache__ next to the source files, or to the
+NUMBA_CACHE_DIR directory if set.
+
+Parallel functions run in the Numba threading layer, which can be chosen
+with the NUMBA_THREADING_LAYER environment variable, or
+numba.config.THREADING_LAYER before the first parallel call. Plonk does
+not change the layer.
+"""
+
+from importlib import import_module
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Tuple
+
+import numba
+from numba.core import event
+
+from .._logging import logger
+
+# Modules with Numba functions to compile in warmup
+MODULES = [
+    'plonk.utils.kernels',
+    'plonk.visualize.splash',
+    'plonk.analysis.sph',
+    'plonk.analysis.sinks',
+]
+
+_registry: Dict[Any, Tuple[Any, ...]] = dict()
+
+
+def njit(
+    *signatures: Any, parallel: bool = False, inline: str = 'never'
+) -> Callable:
+    """Compile a function with Numba in nopython mode, cached to disk.
+
+    Parameters
+    ----------
+    *signatures
+        The argument types, as tuples of Numba types, to compile in
+        warmup.
+    parallel : optional
+        If True, run numba.prange loops in parallel threads. The number
+        of threads is set by numba.set_num_threads, or the
+        NUMBA_NUM_THREADS environment variable. Default is False.
+    inline : optional
+        If 'always', inline the function in the Numba IR of the Numba
+        functions calling it, so arrays they allocate are optimized as
+        local arrays. Default is 'never'.
+
+    Returns
+    -------
+    Callable
+        The decorator.
+    """
+
+    def decorator(function: Callable) -> Any:
+        dispatcher = numba.njit(cache=True, parallel=parallel, inline=inline)(function)
+        _registry[dispatcher] = signatures
+        return dispatcher
+
+    return decorator
+
+
+def warmup() -> Dict[str, Dict[str, int]]:
+    """Compile all registered Numba functions and signatures.
+
+    Compiled functions are written to the cache on disk. Functions
+    already in the cache are loaded from it.
+
+    Returns
+    -------
+    Dict
+        A dictionary with keys as function names, and values as
+        dictionaries with the number of signatures loaded, i.e. already
+        compiled or in the cache, and compiled.
+    """
+    for module in MODULES:
+        import_module(module)
+    stats = dict()
+    for dispatcher, signatures in _registry.items():
+        name = _name(dispatcher)
+        stats[name] = {'loaded': 0, 'compiled': 0}
+        for signature in signatures:
+            if _compile(dispatcher, signature):
+                stats[name]['loaded'] += 1
+            else:
+                stats[name]['compiled'] += 1
+    return stats
+
+
+def _compile(dispatcher: Any, signature: Tuple[Any, ...]) -> bool:
+    """Compile a signature, returning True if already compiled or cached."""
+    name = _name(dispatcher)
+    if tuple(signature) in dispatcher.overloads:
+        return True
+    hits = sum(dispatcher.stats.cache_hits.values())
+    time = perf_counter()
+    dispatcher.compile(signature)
+    time = perf_counter() - time
+    if sum(dispatcher.stats.cache_hits.values()) > hits:
+        logger.info(f'Loaded {name}{_format(signature)} from cache in {time:.3f} s')
+        return True
+    logger.info(f'Compiled {name}{_format(signature)} in {time:.2f} s')
+    return False
+
+
+def _name(dispatcher: Any) -> str:
+    return f'{dispatcher.py_func.__module__}.{dispatcher.__name__}'
+
+
+def _format(args: Tuple[Any, ...]) -> str:
+    return '(' + ', '.join(str(arg) for arg in args) + ')'
+
+
+class _CompileListener(event.Listener):
+    """Log compile times of Plonk functions compiled on first call."""
+
+    def __init__(self):
+        self._start: List[float] = list()
+
+    def on_start(self, ev):
+        self._start.append(perf_counter())
+
+    def on_end(self, ev):
+        time = perf_counter() - self._start.pop()
+        dispatcher = ev.data['dispatcher']
+        if dispatcher in _registry:
+            args = _format(ev.data['args'])
+            logger.debug(f'Compiled {_name(dispatcher)}{args} in {time:.2f} s')
+
+
+event.register('numba:compile', _CompileListener())
@@ -3,8 +3,12 @@
 import numba
 import numpy as np
 
+from .jit import njit
 
-@numba.njit
+SIGNATURES = [(numba.float32,), (numba.float64,)]
+
+
+@njit(*SIGNATURES)
 def kernel_cubic(q):
     """Cubic kernel function.
 
@@ -29,7 +33,7 @@ def kernel_cubic(q):
         return 0.0
 
 
-@numba.njit
+@njit(*SIGNATURES)
 def kernel_gradient_cubic(q):
     """Cubic kernel gradient function.
 
@@ -54,7 +58,7 @@ def kernel_gradient_cubic(q):
         return 0.0
 
 
-@numba.njit
+@njit(*SIGNATURES)
 def kernel_quintic(q):
     """Quintic kernel function.
 
@@ -81,7 +85,7 @@ def kernel_quintic(q):
         return 0.0
 
 
-@numba.njit
+@njit(*SIGNATURES)
 def kernel_gradient_quintic(q):
     """Quintic kernel gradient function.
 
@@ -108,7 +112,7 @@ def kernel_gradient_quintic(q):
         return 0.0
 
 
-@numba.njit
+@njit(*SIGNATURES)
 def kernel_wendland_c4(q):
     """Wendland C4 kernel function.
 
@@ -133,7 +137,7 @@ def kernel_wendland_c4(q):
         return 0.0
 
 
-@numba.njit
+@njit(*SIGNATURES)
 def kernel_gradient_wendland_c4(q):
     """Wendland C4 kernel gradient function.
 
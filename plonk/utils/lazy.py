@@ -0,0 +1,80 @@
+"""Utils for lazy imports.
+
+Heavy dependencies, such as matplotlib, numba, pandas and scipy, are
+only imported when functionality that requires them is first used.
+"""
+
+from importlib import import_module
+from types import MethodType
+from typing import Any, Callable, Dict, List, Tuple
+
+
+def lazy_getattr(
+    package: str, attributes: Dict[str, str], namespace: Dict[str, Any]
+) -> Tuple[Callable[[str], Any], Callable[[], List[str]]]:
+    """Generate module __getattr__ and __dir__ for lazy attributes.
+
+    Parameters
+    ----------
+    package
+        The name of the package, i.e. __name__.
+    attributes
+        A dict with keys as attribute names and values as the module,
+        relative to the package, in which it is defined. If the value
+        is an empty string the attribute is the submodule itself. Other
+        submodules of the package are also imported on access.
+    namespace
+        The package namespace, i.e. globals(). Attributes are added to
+        the namespace once imported.
+
+    Returns
+    -------
+    __getattr__
+        The module __getattr__ function.
+    __dir__
+        The module __dir__ function.
+    """
+
+    def __getattr__(name: str) -> Any:
+        module_name = attributes.get(name, '')
+        if module_name == '':
+            try:
+                value = import_module(f'.{name}', package)
+            except ModuleNotFoundError as e:
+                if e.name != f'{package}.{name}':
+                    raise
+                raise AttributeError(
+                    f'module {package!r} has no attribute {name!r}'
+                ) from None
+        else:
+            value = getattr(import_module(f'.{module_name}', package), name)
+        namespace[name] = value
+        return value
+
+    def __dir__() -> List[str]:
+        return sorted(set(namespace) | set(attributes))
+
+    return __getattr__, __dir__
+
+
+class LazyMethod:
+    """Method defined in a module which is imported on first use.
+
+    Parameters
+    ----------
+    module
+        The absolute name of the module.
+    name
+        The name of the function in the module. The function takes the
+        instance as its first argument.
+    """
+
+    def __init__(self, module: str, name: str):
+        self.module = module
+        self.name = name
+
+    def __get__(self, instance, owner):
+        function = getattr(import_module(self.module), self.name)
+        if instance is None:
+            return function
+        return MethodType(function, instance)
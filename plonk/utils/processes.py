@@ -0,0 +1,39 @@
+"""Pools of worker processes."""
+
+import multiprocessing
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+
+def process_pool(max_workers: int) -> ProcessPoolExecutor:
+    """Return a pool of worker processes.
+
+    Worker processes are forked, unless Numba threads are running in a
+    threading layer other than workqueue, as forking a process with
+    those threads can deadlock, e.g. at exit with the TBB layer. Then
+    the worker processes are started by a fork server, or spawned, so
+    the functions they run must be importable.
+
+    Parameters
+    ----------
+    max_workers
+        The number of processes.
+
+    Returns
+    -------
+    ProcessPoolExecutor
+        The pool of processes.
+    """
+    context = None
+    numba = sys.modules.get('numba')
+    if numba is not None:
+        try:
+            layer = numba.threading_layer()
+        except ValueError:
+            # No parallel function has run, so no threads are running
+            layer = 'workqueue'
+        if layer != 'workqueue':
+            methods = multiprocessing.get_all_start_methods()
+            method = 'forkserver' if 'forkserver' in methods else 'spawn'
+            context = multiprocessing.get_context(method)
+    return ProcessPoolExecutor(max_workers=max_workers, mp_context=context)
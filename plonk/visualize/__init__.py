@@ -4,24 +4,40 @@ The Plonk implementation for visualizing smoothed particle hydrodynamics
 simulations using kernel density estimation based interpolation.
 """
 
-from .animation import (
-    animate,
-    animation_images,
-    animation_particles,
-    animation_profiles,
+from ..utils.lazy import lazy_getattr as _lazy_getattr
+
+__getattr__, __dir__ = _lazy_getattr(
+    __name__,
+    {
+        'TilePyramid': 'tiles',
+        'animate': 'animation',
+        'animation_images': 'animation',
+        'animation_particles': 'animation',
+        'animation_profiles': 'animation',
+        'clear_render_cache': 'visualization',
+        'image': 'visualization',
+        'interpolate': 'interpolation',
+        'plot': 'visualization',
+        'render_cache_info': 'visualization',
+        'set_render_cache_limit': 'visualization',
+        'vector': 'visualization',
+        'visualize_sim': 'simulation',
+    },
+    globals(),
 )
-from .interpolation import interpolate
-from .simulation import visualize_sim
-from .visualization import image, plot, vector
 
 __all__ = [
+    'TilePyramid',
     'animate',
     'animation_images',
     'animation_particles',
     'animation_profiles',
+    'clear_render_cache',
     'image',
     'interpolate',
     'plot',
+    'render_cache_info',
+    'set_render_cache_limit',
     'vector',
     'visualize_sim',
 ]
@@ -274,6 +274,7 @@ def animation_images(
     units = kwargs.get('units')
     weighted = kwargs.get('weighted')
     num_pixels = kwargs.get('num_pixels')
+    footprint = kwargs.get('footprint', False)
 
     def animate(idx):
         if tqdm is not None:
@@ -291,6 +292,7 @@ def animation_images(
             units=units,
             weighted=weighted,
             num_pixels=num_pixels,
+            footprint=footprint,
         )
         image.set_data(interp_data)
         image.set_extent(_extent)
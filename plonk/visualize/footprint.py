@@ -0,0 +1,264 @@
+"""Sparse operators from particles to pixels.
+
+The footprint of the particles on a pixel grid is the kernel weight of
+each particle on each pixel. It depends on the particle positions and
+smoothing lengths, and the view, but not on the quantity interpolated,
+so once it is built any quantity is interpolated to the same view with a
+sparse matrix-vector product.
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Optional, Tuple
+
+import numpy as np
+from numpy import ndarray
+from scipy.sparse import csc_matrix
+
+from .._logging import logger
+from .splash import footprint_projection, footprint_slice
+
+if TYPE_CHECKING:
+    from ..snap.snap import SnapLike
+
+# The maximum number of footprints kept on each Snap, as they use much
+# more memory than the particle arrays
+MAX_FOOTPRINTS = 4
+
+
+class Footprint:
+    """Kernel weights of particles on a pixel grid.
+
+    The weights are stored as a sparse matrix with a row per pixel and a
+    column per particle, in compressed sparse column format as written by
+    the splash footprint functions. Products with the matrix add the
+    particles to each pixel in order, as in the interpolation functions.
+
+    Parameters
+    ----------
+    matrix
+        The sparse matrix with shape (npixx * npixy, npart).
+    num_pixels
+        The pixel grid as (npixx, npixy).
+    normalise
+        Whether to normalise interpolated data by the interpolated
+        weights.
+    indices : optional
+        The indices of the particles in the columns of the matrix, i.e.
+        the particles in view. If None, all particles.
+    """
+
+    def __init__(
+        self,
+        matrix: Any,
+        num_pixels: Tuple[int, int],
+        normalise: bool,
+        indices: ndarray = None,
+    ):
+        self.matrix = matrix
+        self.num_pixels = num_pixels
+        self.normalise = normalise
+        self.indices = indices
+        self._norm = None
+        if normalise:
+            self._norm = matrix @ np.ones(matrix.shape[1], dtype=matrix.dtype)
+
+    @classmethod
+    def build(
+        cls,
+        *,
+        x_coordinate: ndarray,
+        y_coordinate: ndarray,
+        dist_from_slice: ndarray = None,
+        extent: Tuple[float, float, float, float],
+        smoothing_length: ndarray,
+        weight: ndarray,
+        num_pixels: Tuple[int, int],
+        normalise: bool,
+        indices: ndarray = None,
+    ) -> Footprint:
+        """Build the footprint of particles on a pixel grid.
+
+        Parameters
+        ----------
+        x_coordinate
+            Particle coordinate for x-axis in interpolation.
+        y_coordinate
+            Particle coordinate for y-axis in interpolation.
+        dist_from_slice
+            The distance from the cross section slice. Only required for
+            cross section interpolation.
+        extent
+            The range in the x- and y-direction as (xmin, xmax, ymin,
+            ymax).
+        smoothing_length
+            The smoothing length on each particle.
+        weight
+            The interpolation weight on each particle.
+        num_pixels
+            The pixel grid as (npixx, npixy).
+        normalise
+            Whether to normalise interpolated data.
+        indices : optional
+            The indices of the particles passed in, if not all of them.
+
+        Returns
+        -------
+        Footprint
+            The footprint.
+        """
+        npixx, npixy = num_pixels
+        xmin, ymin = extent[0], extent[2]
+        pixwidthx = (extent[1] - extent[0]) / npixx
+        pixwidthy = (extent[3] - extent[2]) / npixy
+        npart = len(smoothing_length)
+        itype = np.ones(smoothing_length.shape, dtype=np.int8)
+        grid = (npart, xmin, ymin, npixx, npixy, pixwidthx, pixwidthy)
+
+        if dist_from_slice is None:
+            indptr, rows, data = footprint_projection(
+                x_coordinate, y_coordinate, smoothing_length, weight, itype, *grid
+            )
+        else:
+            indptr, rows, data = footprint_slice(
+                x_coordinate,
+                y_coordinate,
+                dist_from_slice,
+                smoothing_length,
+                weight,
+                itype,
+                *grid,
+            )
+        matrix = csc_matrix((data, rows, indptr), shape=(npixx * npixy, npart))
+        footprint = cls(
+            matrix, num_pixels=num_pixels, normalise=normalise, indices=indices
+        )
+        logger.debug(f'Built footprint with {footprint.nbytes / 2**20:.1f} MiB')
+        return footprint
+
+    @property
+    def nbytes(self) -> int:
+        """The memory used by the sparse matrix in bytes."""
+        matrix = self.matrix
+        return matrix.data.nbytes + matrix.indices.nbytes + matrix.indptr.nbytes
+
+    def interpolate(self, quantity: ndarray) -> ndarray:
+        """Interpolate a quantity to the pixel grid.
+
+        Parameters
+        ----------
+        quantity
+            The quantity on the particles, with shape (npart,), or
+            (npart, nfields) for multiple fields.
+
+        Returns
+        -------
+        ndarray
+            The interpolated data with shape (npixy, npixx), or (nfields,
+            npixy, npixx) for multiple fields, as interpolate_projection
+            and interpolate_slice or their fields versions.
+        """
+        npixx, npixy = self.num_pixels
+        # The matrix is in the precision of the weights, i.e. float64
+        # unless the Snap is single precision
+        data = self.matrix @ quantity
+        data = data.astype(self.matrix.dtype, copy=False)
+        if self.normalise:
+            mask = self._norm > 0.0
+            if data.ndim == 1:
+                data[mask] /= self._norm[mask]
+            else:
+                data[mask] /= self._norm[mask, np.newaxis]
+        if data.ndim == 1:
+            return data.reshape((npixy, npixx))
+        return data.T.reshape((-1, npixy, npixx))
+
+    def __repr__(self) -> str:
+        npixx, npixy = self.num_pixels
+        return (
+            f'<plonk.Footprint particles={self.matrix.shape[1]} '
+            f'pixels=({npixx}, {npixy}) nnz={self.matrix.nnz}>'
+        )
+
+
+def footprint_key(snap: SnapLike, **view: Any) -> Tuple[Any, ...]:
+    """Return the key of a footprint on a Snap.
+
+    The key is the view parameters, and the rotation and translation of
+    the Snap, or of the base Snap of a SubSnap.
+
+    Parameters
+    ----------
+    snap
+        The Snap or SubSnap.
+    **view
+        The view parameters, e.g. the coordinates, interpolation type,
+        extent and number of pixels. Arrays are compared by value.
+
+    Returns
+    -------
+    Tuple
+        The key.
+    """
+    root = getattr(snap, '_root', snap)
+    if root.rotation is None:
+        rotation = None
+    else:
+        rotation = np.asarray(root.rotation.as_quat()).tobytes()
+    if root.translation is None:
+        translation = None
+    else:
+        translation = np.asarray(
+            root.translation.to_base_units().magnitude, dtype=float
+        ).tobytes()
+    parameters = tuple((name, _hashable(value)) for name, value in sorted(view.items()))
+    return parameters + (('rotation', rotation), ('translation', translation))
+
+
+def get_footprint(snap: SnapLike, key: Tuple[Any, ...]) -> Optional[Footprint]:
+    """Return a footprint cached on a Snap, or None.
+
+    Parameters
+    ----------
+    snap
+        The Snap or SubSnap.
+    key
+        The key from footprint_key.
+
+    Returns
+    -------
+    Footprint or None
+        The footprint, or None if it is not cached.
+    """
+    footprint = snap._footprints.pop(key, None)
+    if footprint is not None:
+        # Move to the end as most recently used
+        snap._footprints[key] = footprint
+        logger.debug('Using cached footprint')
+    return footprint
+
+
+def set_footprint(snap: SnapLike, key: Tuple[Any, ...], footprint: Footprint):
+    """Cache a footprint on a Snap.
+
+    The least recently used footprints are removed so that at most
+    MAX_FOOTPRINTS are kept.
+
+    Parameters
+    ----------
+    snap
+        The Snap or SubSnap.
+    key
+        The key from footprint_key.
+    footprint
+        The footprint.
+    """
+    snap._footprints[key] = footprint
+    while len(snap._footprints) > MAX_FOOTPRINTS:
+        del snap._footprints[next(iter(snap._footprints))]
+
+
+def _hashable(value: Any) -> Any:
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    return tuple(np.asarray(value, dtype=float).ravel())
@@ -1,12 +1,13 @@
 """Interpolation to a pixel grid.
 
 There are two functions: one for interpolation of scalar fields, and one
-for interpolation of vector fields.
+for interpolation of vector fields. Multiple quantities can be
+interpolated together with interpolate, sharing the loop over particles.
 """
 
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Tuple
+from typing import TYPE_CHECKING, Any, List, NamedTuple, Optional, Tuple, Union
 
 import numpy as np
 from numpy import ndarray
@@ -15,7 +16,8 @@ from .._logging import logger
 from .._units import Quantity
 from .._units import units as plonk_units
 from ..utils.math import distance_from_plane
-from .splash import interpolate_projection, interpolate_slice
+from .footprint import Footprint, footprint_key, get_footprint, set_footprint
+from .splash import RADKERNEL, interpolate_projection_fields, interpolate_slice_fields
 
 if TYPE_CHECKING:
     from ..snap.snap import SnapLike
@@ -28,7 +30,7 @@ NUM_PIXELS = (512, 512)
 def interpolate(
     *,
     snap: SnapLike,
-    quantity: str,
+    quantity: Union[str, List[str]],
     x: str = 'x',
     y: str = 'y',
     interp: 'str',
@@ -37,7 +39,8 @@ def interpolate(
     slice_offset: Quantity = None,
     extent: Quantity,
     num_pixels: Tuple[float, float] = None,
-) -> Quantity:
+    footprint: bool = False,
+) -> Union[Quantity, List[Quantity]]:
     """Interpolate a quantity on the snapshot to a pixel grid.
 
     Parameters
@@ -46,6 +49,8 @@ def interpolate(
         The Snap (or SubSnap) object.
     quantity
         The quantity to visualize. Must be a string to pass to Snap,
+        or a list of strings to interpolate multiple quantities in one
+        pass over the particles.
     x
         The x-coordinate for the visualization. Must be a string to
         pass to Snap. Default is 'x'.
@@ -69,13 +74,22 @@ def interpolate(
     num_pixels
         The pixel grid to interpolate the scalar quantity to, as
         (npixx, npixy). Default is (512, 512).
+    footprint
+        If True, store the kernel weights of the particles on the pixel
+        grid as a sparse matrix on the Snap, so later calls with the
+        same view interpolate with a sparse matrix-vector product.
+        Matrices for the four most recently used views are kept until
+        the Snap is rotated, translated or reset. The memory used is
+        proportional to the number of particles times the number of
+        pixels per particle. Default is False.
 
     Returns
     -------
     Quantity
         The interpolated quantity on a pixel grid as a Pint Quantity.
         The shape for scalar data is (npixx, npixy), and for vector is
-        (2, npixx, npixy).
+        (2, npixx, npixy). If quantity is a list, a list of Quantity,
+        one for each quantity.
 
     Examples
     --------
@@ -87,6 +101,15 @@ def interpolate(
     ...     interp='projection',
     ...     extent=(-100, 100, -100, 100),
     ... )
+
+    Interpolate density and velocity to grid together.
+
+    >>> density, velocity = plonk.interpolate(
+    ...     snap=snap,
+    ...     quantity=['density', 'velocity'],
+    ...     interp='projection',
+    ...     extent=(-100, 100, -100, 100),
+    ... )
     """
     if not isinstance(extent[0], Quantity):
         raise ValueError('extent must have units')
@@ -94,71 +117,268 @@ def interpolate(
     if num_pixels is None:
         num_pixels = NUM_PIXELS
 
-    _quantity, x, y, z = _get_arrays_from_str(snap=snap, quantity=quantity, x=x, y=y)
-    h = snap.array_in_code_units('smoothing_length')
-    m = snap.array_in_code_units('mass')
-
-    extent = (
-        (extent[0] / snap.code_units['length']).to_base_units().magnitude,
-        (extent[1] / snap.code_units['length']).to_base_units().magnitude,
-        (extent[2] / snap.code_units['length']).to_base_units().magnitude,
-        (extent[3] / snap.code_units['length']).to_base_units().magnitude,
+    quantities = [quantity] if isinstance(quantity, str) else list(quantity)
+    extent = _extent_in_code_units(snap=snap, extent=extent)
+    slice_normal, slice_offset = _slice_parameters(
+        snap=snap, interp=interp, slice_normal=slice_normal, slice_offset=slice_offset
+    )
+    view = dict(
+        x=x,
+        y=y,
+        interp=interp,
+        weighted=weighted,
+        slice_normal=slice_normal,
+        slice_offset=slice_offset,
+        extent=extent,
+        num_pixels=num_pixels,
     )
 
+    key = footprint_key(snap, **view) if footprint else None
+    operator = get_footprint(snap, key) if footprint else None
+    if operator is None:
+        particles = _cull(snap=snap, **view)
+        indices = particles.indices
+    else:
+        indices = operator.indices
+
+    if indices is not None and len(indices) == 0:
+        # No particles in view, so the images are zero
+        images = [
+            np.zeros(_shape(snap=snap, quantity=name, x=x, y=y, num_pixels=num_pixels))
+            for name in quantities
+        ]
+        return _with_units(snap, quantities, images, quantity, interp, weighted)
+
+    quantity_in_view = _QuantityInView(snap, indices)
+    fields = [quantity_in_view(name, x=x, y=y) for name in quantities]
+    # Interpolate multiple quantities as fields in one pass over the particles
+    data = fields[0] if isinstance(quantity, str) else np.column_stack(fields)
+
+    if operator is None:
+        particle_mass = quantity_in_view('mass', x=x, y=y)
+        if footprint:
+            operator = particles.footprint(particle_mass=particle_mass, **view)
+            set_footprint(snap, key, operator)
+
+    if operator is not None:
+        interpolated_data = operator.interpolate(data)
+    else:
+        interpolated_data = particles.interpolate(
+            quantity=data, particle_mass=particle_mass, **view
+        )
+
+    if isinstance(quantity, str):
+        interpolated = [interpolated_data]
+    else:
+        interpolated = _split_fields(interpolated_data, fields)
+
+    return _with_units(snap, quantities, interpolated, quantity, interp, weighted)
+
+
+def _extent_in_code_units(*, snap: SnapLike, extent: Quantity) -> Extent:
+    """Convert the extent to code units of length."""
+    length = snap.code_units['length']
+    return tuple((limit / length).to_base_units().magnitude for limit in extent)
+
+
+def _slice_parameters(
+    *,
+    snap: SnapLike,
+    interp: str,
+    slice_normal: Optional[Tuple[float, float, float]],
+    slice_offset: Optional[Quantity],
+) -> Tuple[Optional[ndarray], Optional[float]]:
+    """Return the slice normal and the offset in code units.
+
+    Both are None for projections.
+    """
     if interp == 'projection':
-        dist_from_slice = None
         if slice_normal is not None:
             logger.warning('ignoring slice_normal for projection')
         if slice_offset is not None:
             logger.warning('ignoring slice_offset for projection')
-    elif interp == 'slice':
-        if slice_offset is None:
-            slice_offset = 0.0 * plonk_units('meter')
-        if not isinstance(slice_offset, Quantity):
-            raise ValueError('slice_offset must have units')
-        if slice_normal is None:
-            slice_normal = np.array([0, 0, 1])
-        slice_offset = (
-            (slice_offset / snap.code_units['length']).to_base_units().magnitude
-        )
-        dist_from_slice = distance_from_plane(x, y, z, slice_normal, slice_offset)
-
-    if _quantity.ndim == 1:
-        interpolated_data = scalar_interpolation(
-            quantity=_quantity,
-            x_coordinate=x,
-            y_coordinate=y,
-            dist_from_slice=dist_from_slice,
+        return None, None
+    if interp != 'slice':
+        raise ValueError('interp must be "projection" or "slice"')
+    if slice_offset is None:
+        slice_offset = 0.0 * plonk_units('meter')
+    if not isinstance(slice_offset, Quantity):
+        raise ValueError('slice_offset must have units')
+    if slice_normal is None:
+        slice_normal = np.array([0, 0, 1])
+    slice_offset = (slice_offset / snap.code_units['length']).to_base_units().magnitude
+    return slice_normal, slice_offset
+
+
+class _Particles(NamedTuple):
+    """Coordinates and smoothing lengths of the particles in view."""
+
+    x_coordinate: ndarray
+    y_coordinate: ndarray
+    dist_from_slice: Optional[ndarray]
+    smoothing_length: ndarray
+    hfact: float
+    indices: Optional[ndarray]
+
+    def interpolate(
+        self,
+        *,
+        quantity: ndarray,
+        particle_mass: ndarray,
+        weighted: bool,
+        extent: Extent,
+        num_pixels: Tuple[float, float],
+        **view: Any,
+    ) -> ndarray:
+        """Interpolate a quantity on these particles to a pixel grid."""
+        return _interpolate(
+            quantity=quantity,
+            x_coordinate=self.x_coordinate,
+            y_coordinate=self.y_coordinate,
+            dist_from_slice=self.dist_from_slice,
             extent=extent,
-            smoothing_length=h,
-            particle_mass=m,
-            hfact=snap.properties['smoothing_length_factor'],
+            smoothing_length=self.smoothing_length,
+            particle_mass=particle_mass,
+            hfact=self.hfact,
             weighted=weighted,
             num_pixels=num_pixels,
         )
 
-    elif _quantity.ndim == 2:
-        interpolated_data = vector_interpolation(
-            quantity_x=_quantity[:, 0],
-            quantity_y=_quantity[:, 1],
-            x_coordinate=x,
-            y_coordinate=y,
-            dist_from_slice=dist_from_slice,
+    def footprint(
+        self,
+        *,
+        particle_mass: ndarray,
+        weighted: bool,
+        extent: Extent,
+        num_pixels: Tuple[float, float],
+        **view: Any,
+    ) -> Footprint:
+        """Build the footprint of these particles on a pixel grid."""
+        h = self.smoothing_length
+        dtype = _dtype(self.x_coordinate, self.y_coordinate, h, particle_mass)
+        return Footprint.build(
+            x_coordinate=self.x_coordinate,
+            y_coordinate=self.y_coordinate,
+            dist_from_slice=self.dist_from_slice,
             extent=extent,
             smoothing_length=h,
-            particle_mass=m,
-            hfact=snap.properties['smoothing_length_factor'],
-            weighted=weighted,
+            weight=_weight(h, particle_mass, self.hfact, weighted, dtype),
             num_pixels=num_pixels,
+            normalise=weighted,
+            indices=self.indices,
         )
 
-    else:
-        raise ValueError('quantity.ndim > 2: cannot determine quantity')
 
-    interpolated_data = interpolated_data * snap.array_code_unit(quantity)
-    if interp == 'projection' and not weighted:
-        interpolated_data = interpolated_data * snap.array_code_unit('position')
-    return interpolated_data
+def _cull(
+    *,
+    snap: SnapLike,
+    x: str,
+    y: str,
+    interp: str,
+    slice_normal: Optional[ndarray],
+    slice_offset: Optional[float],
+    extent: Extent,
+    num_pixels: Tuple[float, float],
+    **view: Any,
+) -> _Particles:
+    """Return the particles that may contribute to the pixels.
+
+    All particles are returned, with indices None, if more than half of
+    them are in view.
+    """
+    z = _get_z_coordinate(x=x, y=y)
+    x_coordinate = snap.array_in_code_units(x)
+    y_coordinate = snap.array_in_code_units(y)
+    h = snap.array_in_code_units('smoothing_length')
+    dist_from_slice = None
+    if interp == 'slice':
+        dist_from_slice = distance_from_plane(
+            x_coordinate,
+            y_coordinate,
+            snap.array_in_code_units(z),
+            slice_normal,
+            slice_offset,
+        )
+    indices = _particles_in_view(
+        x_coordinate=x_coordinate,
+        y_coordinate=y_coordinate,
+        dist_from_slice=dist_from_slice,
+        extent=extent,
+        smoothing_length=h,
+        num_pixels=num_pixels,
+    )
+    if indices is not None:
+        x_coordinate = x_coordinate[indices]
+        y_coordinate = y_coordinate[indices]
+        h = h[indices]
+        if dist_from_slice is not None:
+            dist_from_slice = dist_from_slice[indices]
+    return _Particles(
+        x_coordinate=x_coordinate,
+        y_coordinate=y_coordinate,
+        dist_from_slice=dist_from_slice,
+        smoothing_length=h,
+        hfact=snap.properties['smoothing_length_factor'],
+        indices=indices,
+    )
+
+
+def _split_fields(interpolated_data: ndarray, fields: List[ndarray]) -> List[ndarray]:
+    """Split fields interpolated together into an image per quantity."""
+    interpolated = list()
+    idx = 0
+    for field in fields:
+        if field.ndim == 1:
+            interpolated.append(interpolated_data[idx])
+            idx += 1
+        else:
+            interpolated.append(interpolated_data[idx : idx + 2])
+            idx += 2
+    return interpolated
+
+
+def _with_units(
+    snap: SnapLike,
+    quantities: List[str],
+    interpolated: List[ndarray],
+    quantity: Union[str, List[str]],
+    interp: str,
+    weighted: bool,
+) -> Union[Quantity, List[Quantity]]:
+    """Attach units to the interpolated quantities."""
+    for idx, name in enumerate(quantities):
+        interpolated[idx] = interpolated[idx] * snap.array_code_unit(name)
+        if interp == 'projection' and not weighted:
+            interpolated[idx] = interpolated[idx] * snap.array_code_unit('position')
+
+    if isinstance(quantity, str):
+        return interpolated[0]
+    return interpolated
+
+
+class _QuantityInView:
+    """Get quantities on the particles in view, in code units.
+
+    Quantities loaded on the Snap are indexed, as are all quantities if
+    all particles are in view. Other quantities are read from file for
+    the particles in view only, via a SubSnap.
+    """
+
+    def __init__(self, snap: SnapLike, indices: Optional[ndarray]):
+        self.snap = snap
+        self.indices = indices
+        self._subsnap: Optional[SnapLike] = None
+
+    def __call__(self, name: str, *, x: str, y: str) -> ndarray:
+        snap = self.snap
+        if self.indices is None:
+            return _get_quantity_from_str(snap=snap, quantity=name, x=x, y=y)
+        if snap.base_array_name(name) in snap.loaded_arrays():
+            array = _get_quantity_from_str(snap=snap, quantity=name, x=x, y=y)
+            return array[self.indices]
+        if self._subsnap is None:
+            self._subsnap = snap[self.indices]
+        return _get_quantity_from_str(snap=self._subsnap, quantity=name, x=x, y=y)
 
 
 def scalar_interpolation(
@@ -270,20 +490,8 @@ def vector_interpolation(
         An array of vector quantities interpolated to a pixel grid with
         shape (2, npixx, npixy).
     """
-    vecsmoothx = _interpolate(
-        quantity=quantity_x,
-        x_coordinate=x_coordinate,
-        y_coordinate=y_coordinate,
-        dist_from_slice=dist_from_slice,
-        extent=extent,
-        smoothing_length=smoothing_length,
-        particle_mass=particle_mass,
-        hfact=hfact,
-        weighted=weighted,
-        num_pixels=num_pixels,
-    )
-    vecsmoothy = _interpolate(
-        quantity=quantity_y,
+    return _interpolate(
+        quantity=np.stack((quantity_x, quantity_y), axis=1),
         x_coordinate=x_coordinate,
         y_coordinate=y_coordinate,
         dist_from_slice=dist_from_slice,
@@ -294,7 +502,6 @@ def vector_interpolation(
         weighted=weighted,
         num_pixels=num_pixels,
     )
-    return np.stack((np.array(vecsmoothx), np.array(vecsmoothy)))
 
 
 def _interpolate(
@@ -310,6 +517,12 @@ def _interpolate(
     weighted: bool = None,
     num_pixels: Tuple[float, float],
 ) -> ndarray:
+    """Interpolate to a pixel grid.
+
+    The quantity is 1-dimensional for scalar data, or 2-dimensional with
+    shape (npart, nfields) for multiple fields interpolated together,
+    returned with shape (nfields, npixy, npixx).
+    """
     if dist_from_slice is None:
         do_slice = False
     else:
@@ -326,20 +539,20 @@ def _interpolate(
     pixwidthy = (extent[3] - extent[2]) / npixy
     npart = len(smoothing_length)
 
-    itype = np.ones(smoothing_length.shape)
-    if weighted:
-        weight = particle_mass / smoothing_length ** 3
-    else:
-        weight = hfact ** -3 * np.ones(smoothing_length.shape)
+    itype = np.ones(smoothing_length.shape, dtype=np.int8)
+    dtype = _dtype(x_coordinate, y_coordinate, smoothing_length, particle_mass)
+    weight = _weight(smoothing_length, particle_mass, hfact, weighted, dtype)
+    # Scalar data is interpolated as one field
+    fields = np.ascontiguousarray(quantity, dtype=dtype).reshape((npart, -1))
 
     if do_slice:
-        interpolated_data = interpolate_slice(
+        interpolated_data = interpolate_slice_fields(
             x=x_coordinate,
             y=y_coordinate,
             dslice=dist_from_slice,
             hh=smoothing_length,
             weight=weight,
-            dat=quantity,
+            dat=fields,
             itype=itype,
             npart=npart,
             xmin=xmin,
@@ -351,12 +564,12 @@ def _interpolate(
             normalise=normalise,
         )
     else:
-        interpolated_data = interpolate_projection(
+        interpolated_data = interpolate_projection_fields(
             x=x_coordinate,
             y=y_coordinate,
             hh=smoothing_length,
             weight=weight,
-            dat=quantity,
+            dat=fields,
             itype=itype,
             npart=npart,
             xmin=xmin,
@@ -368,10 +581,85 @@ def _interpolate(
             normalise=normalise,
         )
 
+    if quantity.ndim == 1:
+        return interpolated_data[0]
     return interpolated_data
 
 
-def _get_arrays_from_str(*, snap, quantity, x, y):
+def _dtype(*arrays: ndarray) -> np.dtype:
+    """Return the precision to interpolate in.
+
+    This is float64, unless all the particle arrays are float32, i.e.
+    for Snaps loaded with precision='float32'. The smoothing length is
+    float32 in Phantom files, but is not enough to interpolate in single
+    precision.
+    """
+    return np.result_type(*arrays)
+
+
+def _weight(
+    smoothing_length: ndarray,
+    particle_mass: ndarray,
+    hfact: float,
+    weighted: bool,
+    dtype: np.dtype,
+) -> ndarray:
+    if weighted:
+        weight = particle_mass / smoothing_length ** 3
+        return weight.astype(dtype, copy=False)
+    return np.full(smoothing_length.shape, hfact ** -3, dtype=dtype)
+
+
+def _particles_in_view(
+    *,
+    x_coordinate: ndarray,
+    y_coordinate: ndarray,
+    dist_from_slice: ndarray = None,
+    extent: Extent,
+    smoothing_length: ndarray,
+    num_pixels: Tuple[float, float],
+) -> Optional[ndarray]:
+    """Return the indices of particles that may contribute to the pixels.
+
+    The test is the early exit in the interpolation functions, widened
+    by a pixel, and by a small factor on the distance from the slice,
+    for rounding. Returns None if more than half of the particles are in
+    view, as then reading the full arrays, which are cached on the Snap,
+    costs little more than reading the particles in view.
+    """
+    npixx, npixy = num_pixels
+    xmin, xmax, ymin, ymax = extent
+    marginx = (xmax - xmin) / npixx
+    marginy = (ymax - ymin) / npixy
+    radkern = RADKERNEL * smoothing_length
+    mask = (
+        (smoothing_length > 0.0)
+        & (x_coordinate - radkern <= xmax + marginx)
+        & (x_coordinate + radkern >= xmin - marginx)
+        & (y_coordinate - radkern <= ymax + marginy)
+        & (y_coordinate + radkern >= ymin - marginy)
+    )
+    if dist_from_slice is not None:
+        mask &= np.abs(dist_from_slice) < (1.0 + 1e-6) * radkern
+    indices = np.flatnonzero(mask)
+    if len(indices) > len(mask) // 2:
+        return None
+    logger.debug(f'Interpolating {len(indices)} of {len(mask)} particles in view')
+    return indices
+
+
+def _shape(
+    *, snap: SnapLike, quantity: str, x: str, y: str, num_pixels: Tuple[float, float]
+) -> Tuple[int, ...]:
+    """Shape of the image of a quantity, read for one particle."""
+    npixx, npixy = num_pixels
+    array = _get_quantity_from_str(snap=snap[:1], quantity=quantity, x=x, y=y)
+    if array.ndim == 2:
+        return (2, npixy, npixx)
+    return (npixy, npixx)
+
+
+def _get_z_coordinate(*, x, y):
 
     coords = {'x', 'y', 'z'}
     if x not in coords:
@@ -379,13 +667,13 @@ def _get_arrays_from_str(*, snap, quantity, x, y):
     if y not in coords:
         raise ValueError('y-coordinate must be one of "x", "y", "z"')
 
-    quantity_str, x_str, y_str = quantity, x, y
-    z_str = coords.difference((x_str, y_str)).pop()
+    return coords.difference((x, y)).pop()
 
+
+def _get_quantity_from_str(*, snap, quantity, x, y):
+
+    quantity_str, x_str, y_str = quantity, x, y
     quantity = snap.array_in_code_units(quantity_str)
-    x = snap.array_in_code_units(x_str)
-    y = snap.array_in_code_units(y_str)
-    z = snap.array_in_code_units(z_str)
 
     if quantity.ndim > 2:
         raise ValueError('Cannot interpret quantity with ndim > 2')
@@ -401,4 +689,4 @@ def _get_arrays_from_str(*, snap, quantity, x, y):
                 'e.g. "dust_density_001".'
             )
 
-    return quantity, x, y, z
+    return quantity
@@ -196,8 +196,8 @@ def quiver(*, interpolated_data: ndarray, extent: Extent, ax: Any, **kwargs):
     V = V[::stride_y, ::stride_x]
     if normalize_vectors:
         norm = np.hypot(U, V)
-        U /= norm
-        V /= norm
+        U = U / norm
+        V = V / norm
 
     return ax.quiver(X, Y, U, V, **_kwargs)
 
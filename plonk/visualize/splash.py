@@ -7,6 +7,8 @@ import numba
 import numpy as np
 from numpy import ndarray
 
+from ..utils.jit import njit
+
 RADKERNEL = 2.0
 RADKERNEL2 = 4.0
 CNORMK3D = 1.0 / np.pi
@@ -18,8 +20,67 @@ DDQ2TABLE = 1.0 / DQ2TABLE
 
 IVERBOSE = -1
 
+# The number of rows of pixels in each block of rows owned by a thread
+ROW_BLOCK = 16
+
+FLOATS = (numba.float32, numba.float64)
+
+# The types of the particle arrays and of the smoothing length passed by
+# plonk.interpolate: float64 with the float32 smoothing length of Phantom
+# files, float64, or float32 for single precision Snaps
+PRECISIONS = (
+    (numba.float64, numba.float32),
+    (numba.float64, numba.float64),
+    (numba.float32, numba.float32),
+)
+
+
+def _particle_arrays(num_positions, f, h):
+    """Types of the particle positions, smoothing length and weight.
+
+    The positions are the coordinates, and the distance from the slice
+    for cross sections.
+    """
+    return (f[::1],) * num_positions + (h[::1], f[::1])
+
+
+def _interpolate_signatures(num_arrays):
+    """Signatures of interpolate_projection_fields and interpolate_slice_fields.
+
+    The particle arrays are as in PRECISIONS, the data to interpolate is
+    2-dimensional, the particle type is int8, and the grid parameters
+    and number of threads are Python ints and floats.
+    """
+    grid = (numba.float64,) * 2 + (numba.int64,) * 2 + (numba.float64,) * 2
+    return [
+        _particle_arrays(num_arrays - 3, f, h)
+        + (f[:, ::1], numba.int8[::1], numba.int64)
+        + grid
+        + (numba.boolean, numba.int64)
+        for f, h in PRECISIONS
+    ]
+
 
-@numba.njit
+def _rows_signatures(num_arrays):
+    """Signatures of the functions interpolating the rows of a thread.
+
+    The arguments are as for interpolate_projection_fields and
+    interpolate_slice_fields, followed by the thread, the number of
+    threads, and the pixel arrays.
+    """
+    grid = (numba.float64,) * 2 + (numba.int64,) * 2 + (numba.float64,) * 2
+    return [
+        _particle_arrays(num_arrays - 3, f, h)
+        + (f[:, ::1], numba.int8[::1], numba.int64)
+        + grid
+        + (numba.boolean,)
+        + (numba.int64,) * 2
+        + (f[:, :, ::1], f[:, ::1])
+        for f, h in PRECISIONS
+    ]
+
+
+@njit(*[(f,) for f in FLOATS])
 def w_cubic(q2: float):
     """Cubic spline kernel.
 
@@ -41,7 +102,7 @@ def w_cubic(q2: float):
     return w
 
 
-@numba.njit
+@njit(())
 def setup_integratedkernel():
     """Set up integrated kernel.
 
@@ -76,7 +137,7 @@ def setup_integratedkernel():
     return coltable
 
 
-@numba.njit
+@njit(*[(f, numba.float64[::1]) for f in FLOATS])
 def wfromtable(q2, coltable):
     """Interpolate from integrated kernel table values to give w(q).
 
@@ -103,7 +164,6 @@ def wfromtable(q2, coltable):
     return coltable[index] + dwdx * dxx
 
 
-@numba.njit
 def interpolate_projection(
     x: ndarray,
     y: ndarray,
@@ -119,9 +179,15 @@ def interpolate_projection(
     pixwidthx: float,
     pixwidthy: float,
     normalise: bool,
+    num_threads: int = 0,
 ):
     """Interpolate particles to grid via projection.
 
+    The rows of pixels are split between threads, see _first_row_block.
+    Each thread loops over all particles in order, so the result is the
+    same for any number of threads. The data is interpolated as the one
+    field of interpolate_projection_fields.
+
     Parameters
     ----------
     x
@@ -148,19 +214,191 @@ def interpolate_projection(
         The number of pixels in the y direction.
     normalise
         Whether to normalize.
+    num_threads : optional
+        The number of threads. Default is 0, i.e. the number of
+        Numba threads, see numba.get_num_threads.
 
     Return
     ------
     datsmooth
         The data smoothed to a pixel grid.
     """
-    coltable = setup_integratedkernel()
+    fields = interpolate_projection_fields(
+        x,
+        y,
+        hh,
+        weight,
+        dat.reshape((-1, 1)),
+        itype,
+        npart,
+        xmin,
+        ymin,
+        npixx,
+        npixy,
+        pixwidthx,
+        pixwidthy,
+        normalise,
+        num_threads,
+    )
+    return fields[0]
+
+
+@njit(*_interpolate_signatures(5), parallel=True)
+def interpolate_projection_fields(
+    x: ndarray,
+    y: ndarray,
+    hh: ndarray,
+    weight: ndarray,
+    dat: ndarray,
+    itype: ndarray,
+    npart: int,
+    xmin: float,
+    ymin: float,
+    npixx: int,
+    npixy: int,
+    pixwidthx: float,
+    pixwidthy: float,
+    normalise: bool,
+    num_threads: int = 0,
+):
+    """Interpolate multiple fields to grid via projection.
+
+    The particle loop, kernel evaluation and normalisation are shared
+    between the fields, so this is faster than interpolating each
+    field separately.
+
+    Parameters
+    ----------
+    x
+        The particle x positions.
+    y
+        The particle y positions.
+    hh
+        The particle smoothing length.
+    weight
+        The particle weight.
+    dat
+        The data to interpolate, with shape (npart, nfields).
+    itype
+        The particle type.
+    npart
+        The number of particles.
+    xmin
+        The minimum x position.
+    ymin
+        The minimum y position.
+    npixx
+        The number of pixels in the x direction.
+    npixy
+        The number of pixels in the y direction.
+    normalise
+        Whether to normalize.
+    num_threads : optional
+        The number of threads. Default is 0, i.e. the number of
+        Numba threads, see numba.get_num_threads.
+
+    Return
+    ------
+    datsmooth
+        The data smoothed to a pixel grid, with shape
+        (nfields, npixy, npixx).
+    """
+    # Accumulate in the precision of the weights, i.e. float32 for single
+    # precision Snaps
+    datsmooth = np.zeros((npixx, npixy, dat.shape[1]), dtype=weight.dtype)
+    # The normalisation is only stored if required
+    datnorm = np.zeros((npixx, npixy) if normalise else (0, 0), dtype=weight.dtype)
+
+    nthreads = _num_row_threads(num_threads, npixy)
+    nsubgrid = np.zeros(nthreads, dtype=np.int64)
+    nok = np.zeros(nthreads, dtype=np.int64)
+    hminall = np.full(nthreads, 1e10)
 
-    datsmooth = np.zeros((npixx, npixy))
-    datnorm = np.zeros((npixx, npixy))
+    # Loop over threads, each adding to its own rows of pixels
+    for thread in numba.prange(nthreads):
+        nsubgrid[thread], nok[thread], hminall[thread] = _project_rows(
+            x,
+            y,
+            hh,
+            weight,
+            dat,
+            itype,
+            npart,
+            xmin,
+            ymin,
+            npixx,
+            npixy,
+            pixwidthx,
+            pixwidthy,
+            normalise,
+            np.int64(thread),
+            nthreads,
+            datsmooth,
+            datnorm,
+        )
+
+    # Normalise dat array
+    if normalise:
+        _normalise(datsmooth, datnorm)
+
+    # Warn about subgrid interpolation
+    if nsubgrid[0] > 1:
+        xmax = xmin + npixx * pixwidthx
+        nfull = int((xmax - xmin) / (hminall[0])) + 1
+        if nsubgrid[0] > 0.1 * nok[0] and IVERBOSE > -1:
+            print('Warning: pixel size > 2h for ', nsubgrid[0], ' particles')
+            print('need ', nfull, ' pixels for full resolution')
+
+    # Return datsmooth
+    return np.transpose(datsmooth, (2, 1, 0))
+
+
+@njit(*_rows_signatures(5))
+def _project_rows(
+    x,
+    y,
+    hh,
+    weight,
+    dat,
+    itype,
+    npart,
+    xmin,
+    ymin,
+    npixx,
+    npixy,
+    pixwidthx,
+    pixwidthy,
+    normalise,
+    thread,
+    nthreads,
+    datsmooth,
+    datnorm,
+):
+    """Add particles to the rows of pixels owned by a thread.
+
+    The rows are accumulated in arrays local to the thread, which Numba
+    optimizes better than the shared arrays, and then copied to them.
+    The kernel weight of each pixel is computed once for all fields.
+
+    Returns
+    -------
+    nsubgrid
+        The number of particles with h smaller than half a pixel.
+    nok
+        The number of other particles.
+    hminall
+        The minimum smoothing length of subgrid particles.
+    """
+    coltable = setup_integratedkernel()
+    nfields = dat.shape[1]
+    # Arrays for the blocks of rows owned by this thread, where row jpix
+    # in block b is (b // nthreads) * ROW_BLOCK + jpix % ROW_BLOCK
+    num_blocks = (npixy + ROW_BLOCK - 1) // ROW_BLOCK
+    num_rows = (num_blocks - thread + nthreads - 1) // nthreads * ROW_BLOCK
+    rowsmooth = np.zeros((npixx, num_rows, nfields), dtype=datsmooth.dtype)
+    rownorm = np.zeros((npixx, num_rows), dtype=datnorm.dtype)
     dx2i = np.zeros(npixx)
-    xpix = np.zeros(npixx)
-    term = 0.0
+    term = np.zeros(nfields, dtype=dat.dtype)
 
     xminpix = xmin - 0.5 * pixwidthx
     yminpix = ymin - 0.5 * pixwidthy
@@ -172,6 +410,7 @@ def interpolate_projection(
     hmin = 0.5 * max(pixwidthx, pixwidthy)
 
     xpix = xminpix + np.arange(1, npixx + 1) * pixwidthx
+    ypix = yminpix + np.arange(npixy) * pixwidthy
     nsubgrid = 0
     nok = 0
     hminall = 1e10
@@ -194,19 +433,10 @@ def interpolate_projection(
 
         # Cycle as soon as we know the particle does not contribute
         xi = x[idx]
-        xpixmin = xi - radkern
-        if xpixmin > xmax:
+        if xi - radkern > xmax or xi + radkern < xmin:
             continue
-        xpixmax = xi + radkern
-        if xpixmax < xmin:
-            continue
-
         yi = y[idx]
-        ypixmin = yi - radkern
-        if ypixmin > ymax:
-            continue
-        ypixmax = yi + radkern
-        if ypixmax < ymin:
+        if yi - radkern > ymax or yi + radkern < ymin:
             continue
 
         # Take resolution length as max of h and 1/2 pixel width
@@ -219,70 +449,51 @@ def interpolate_projection(
             nok = nok + 1
         radkern = RADKERNEL * hsmooth
 
+        ipixmin, ipixmax, jpixmin, jpixmax = _pixel_range(
+            xi, yi, radkern, xmin, ymin, pixwidthx, pixwidthy, npixx, npixy
+        )
+
+        # Skip particles not overlapping rows owned by this thread
+        block = _first_row_block(jpixmin, thread, nthreads)
+        if block * ROW_BLOCK >= jpixmax:
+            continue
+
         # Set kernel related quantities
         hi1 = 1.0 / hsmooth
         hi21 = hi1 * hi1
         termnorm = weight[idx] * horigi
-        term = termnorm * dat[idx]
-
-        # Loop over pixels, adding the contribution from this particle
-        # copy by quarters if all pixels within domain
-        ipixmin = int((xi - radkern - xmin) / pixwidthx)
-        ipixmax = int((xi + radkern - xmin) / pixwidthx) + 1
-        jpixmin = int((yi - radkern - ymin) / pixwidthy)
-        jpixmax = int((yi + radkern - ymin) / pixwidthy) + 1
-
-        # Make sure they only contribute to pixels in the image
-        # (note that this optimises much better than using min/max)
-        if ipixmin < 0:
-            ipixmin = 0
-        if jpixmin < 0:
-            jpixmin = 0
-        if ipixmax > npixx:
-            ipixmax = npixx
-        if jpixmax > npixy:
-            jpixmax = npixy
-
-        # Precalculate an array of dx2 for this particle (optimisation)
-        for ipix in range(ipixmin, ipixmax):
-            dx2i[ipix] = ((xpix[ipix] - xi) ** 2) * hi21
+        for ifield in range(nfields):
+            term[ifield] = termnorm * dat[idx, ifield]
 
-        for jpix in range(jpixmin, jpixmax):
-            ypix = yminpix + jpix * pixwidthy
-            dy = ypix - yi
-            dy2 = dy * dy * hi21
-            for ipix in range(ipixmin, ipixmax):
-                # dx2 pre-calculated; dy2 pre-multiplied by hi21
-                q2 = dx2i[ipix] + dy2
-                # SPH kernel - integral through cubic spline
-                # interpolate from a pre-calculated table
-                if q2 < RADKERNEL2:
-                    wab = wfromtable(q2, coltable)
-                    # Calculate data value at this pixel using the summation interpolant
-                    datsmooth[ipix, jpix] = datsmooth[ipix, jpix] + term * wab
-                    if normalise:
-                        datnorm[ipix, jpix] = datnorm[ipix, jpix] + termnorm * wab
+        _add_rows(
+            rowsmooth,
+            rownorm,
+            term,
+            termnorm,
+            xpix,
+            ypix,
+            dx2i,
+            xi,
+            yi,
+            hi21,
+            0.0,
+            ipixmin,
+            ipixmax,
+            jpixmin,
+            jpixmax,
+            block,
+            nthreads,
+            normalise,
+            coltable,
+        )
 
-    # Normalise dat array
+    _copy_rows(rowsmooth, datsmooth, thread, nthreads)
     if normalise:
-        # Normalise everywhere (required if not using SPH weighting)
-        for idxi in range(npixx):
-            for idxj in range(npixy):
-                if datnorm[idxi, idxj] > 0.0:
-                    datsmooth[idxi, idxj] /= datnorm[idxi, idxj]
+        _copy_rows(rownorm, datnorm, thread, nthreads)
 
-    # Warn about subgrid interpolation
-    if nsubgrid > 1:
-        nfull = int((xmax - xmin) / (hminall)) + 1
-        if nsubgrid > 0.1 * nok and IVERBOSE > -1:
-            print('Warning: pixel size > 2h for ', nsubgrid, ' particles')
-            print('need ', nfull, ' pixels for full resolution')
+    return nsubgrid, nok, hminall
 
-    # Return datsmooth
-    return datsmooth.T
 
-
-@numba.njit
 def interpolate_slice(
     x: ndarray,
     y: ndarray,
@@ -299,9 +510,15 @@ def interpolate_slice(
     pixwidthx: float,
     pixwidthy: float,
     normalise: bool,
+    num_threads: int = 0,
 ):
     """Interpolate particles to grid via cross section.
 
+    The rows of pixels are split between threads, see _first_row_block.
+    Each thread loops over all particles in order, so the result is the
+    same for any number of threads. The data is interpolated as the one
+    field of interpolate_slice_fields.
+
     Parameters
     ----------
     x
@@ -332,16 +549,180 @@ def interpolate_slice(
         The number of pixels in the y direction.
     normalise
         Whether to normalize.
+    num_threads : optional
+        The number of threads. Default is 0, i.e. the number of
+        Numba threads, see numba.get_num_threads.
 
     Return
     ------
     datsmooth
         The data smoothed to a pixel grid.
     """
-    datsmooth = np.zeros((npixx, npixy))
-    datnorm = np.zeros((npixx, npixy))
+    fields = interpolate_slice_fields(
+        x,
+        y,
+        dslice,
+        hh,
+        weight,
+        dat.reshape((-1, 1)),
+        itype,
+        npart,
+        xmin,
+        ymin,
+        npixx,
+        npixy,
+        pixwidthx,
+        pixwidthy,
+        normalise,
+        num_threads,
+    )
+    return fields[0]
+
+
+@njit(*_interpolate_signatures(6), parallel=True)
+def interpolate_slice_fields(
+    x: ndarray,
+    y: ndarray,
+    dslice: ndarray,
+    hh: ndarray,
+    weight: ndarray,
+    dat: ndarray,
+    itype: ndarray,
+    npart: int,
+    xmin: float,
+    ymin: float,
+    npixx: int,
+    npixy: int,
+    pixwidthx: float,
+    pixwidthy: float,
+    normalise: bool,
+    num_threads: int = 0,
+):
+    """Interpolate multiple fields to grid via cross section.
+
+    The particle loop, kernel evaluation and normalisation are shared
+    between the fields, so this is faster than interpolating each
+    field separately.
+
+    Parameters
+    ----------
+    x
+        The particle x positions.
+    y
+        The particle y positions.
+    dslice
+        The distance from the cross section slice.
+    hh
+        The particle smoothing length.
+    weight
+        The particle weight.
+    dat
+        The data to interpolate, with shape (npart, nfields).
+    itype
+        The particle type.
+    npart
+        The number of particles.
+    xmin
+        The minimum x position.
+    ymin
+        The minimum y position.
+    npixx
+        The number of pixels in the x direction.
+    npixy
+        The number of pixels in the y direction.
+    normalise
+        Whether to normalize.
+    num_threads : optional
+        The number of threads. Default is 0, i.e. the number of
+        Numba threads, see numba.get_num_threads.
+
+    Return
+    ------
+    datsmooth
+        The data smoothed to a pixel grid, with shape
+        (nfields, npixy, npixx).
+    """
+    # Accumulate in the precision of the weights, i.e. float32 for single
+    # precision Snaps
+    datsmooth = np.zeros((npixx, npixy, dat.shape[1]), dtype=weight.dtype)
+    # The normalisation is only stored if required
+    datnorm = np.zeros((npixx, npixy) if normalise else (0, 0), dtype=weight.dtype)
+
+    nthreads = _num_row_threads(num_threads, npixy)
+
+    # Loop over threads, each adding to its own rows of pixels
+    for thread in numba.prange(nthreads):
+        _slice_rows(
+            x,
+            y,
+            dslice,
+            hh,
+            weight,
+            dat,
+            itype,
+            npart,
+            xmin,
+            ymin,
+            npixx,
+            npixy,
+            pixwidthx,
+            pixwidthy,
+            normalise,
+            np.int64(thread),
+            nthreads,
+            datsmooth,
+            datnorm,
+        )
+
+    # Normalise dat array
+    if normalise:
+        _normalise(datsmooth, datnorm)
+
+    # Return datsmooth
+    return np.transpose(datsmooth, (2, 1, 0))
+
+
+@njit(*_rows_signatures(6))
+def _slice_rows(
+    x,
+    y,
+    dslice,
+    hh,
+    weight,
+    dat,
+    itype,
+    npart,
+    xmin,
+    ymin,
+    npixx,
+    npixy,
+    pixwidthx,
+    pixwidthy,
+    normalise,
+    thread,
+    nthreads,
+    datsmooth,
+    datnorm,
+):
+    """Add particles to the rows of pixels owned by a thread.
+
+    As _project_rows, for a cross section.
+    """
+    nfields = dat.shape[1]
+    # Arrays for the blocks of rows owned by this thread, where row jpix
+    # in block b is (b // nthreads) * ROW_BLOCK + jpix % ROW_BLOCK
+    num_blocks = (npixy + ROW_BLOCK - 1) // ROW_BLOCK
+    num_rows = (num_blocks - thread + nthreads - 1) // nthreads * ROW_BLOCK
+    rowsmooth = np.zeros((npixx, num_rows, nfields), dtype=datsmooth.dtype)
+    rownorm = np.zeros((npixx, num_rows), dtype=datnorm.dtype)
     dx2i = np.zeros(npixx)
+    term = np.zeros(nfields, dtype=dat.dtype)
     const = CNORMK3D
+    # The cubic spline kernel is evaluated directly, without a table
+    no_coltable = np.zeros(0)
+
+    xpix = xmin + (np.arange(npixx) - 0.5) * pixwidthx
+    ypix = ymin + (np.arange(npixy) - 0.5) * pixwidthy
 
     # Loop over particles
     for idx in range(npart):
@@ -363,58 +744,635 @@ def interpolate_slice(
 
         # If this is < 2h then add the particle's contribution to the pixels
         # otherwise skip all this and start on the next particle
-        if dz2 < RADKERNEL2:
-
-            xi = x[idx]
-            yi = y[idx]
-            termnorm = const * weight[idx]
-            term = termnorm * dat[idx]
-
-            # Loop over pixels, adding the contribution from this particle
-            # copy by quarters if all pixels within domain
-            ipixmin = int((xi - radkern - xmin) / pixwidthx)
-            ipixmax = int((xi + radkern - xmin) / pixwidthx) + 1
-            jpixmin = int((yi - radkern - ymin) / pixwidthy)
-            jpixmax = int((yi + radkern - ymin) / pixwidthy) + 1
-
-            # Make sure they only contribute to pixels in the image
-            # (note that this optimises much better than using min/max)
-            if ipixmin < 0:
-                ipixmin = 0
-            if jpixmin < 0:
-                jpixmin = 0
-            if ipixmax > npixx:
-                ipixmax = npixx
-            if jpixmax > npixy:
-                jpixmax = npixy
-
-            # Precalculate an array of dx2 for this particle (optimisation)
+        if not dz2 < RADKERNEL2:
+            continue
+
+        xi = x[idx]
+        yi = y[idx]
+
+        ipixmin, ipixmax, jpixmin, jpixmax = _pixel_range(
+            xi, yi, radkern, xmin, ymin, pixwidthx, pixwidthy, npixx, npixy
+        )
+
+        # Skip particles not overlapping rows owned by this thread
+        block = _first_row_block(jpixmin, thread, nthreads)
+        if block * ROW_BLOCK >= jpixmax:
+            continue
+
+        termnorm = const * weight[idx]
+        for ifield in range(nfields):
+            term[ifield] = termnorm * dat[idx, ifield]
+
+        _add_rows(
+            rowsmooth,
+            rownorm,
+            term,
+            termnorm,
+            xpix,
+            ypix,
+            dx2i,
+            xi,
+            yi,
+            hi21,
+            dz2,
+            ipixmin,
+            ipixmax,
+            jpixmin,
+            jpixmax,
+            block,
+            nthreads,
+            normalise,
+            no_coltable,
+        )
+
+    _copy_rows(rowsmooth, datsmooth, thread, nthreads)
+    if normalise:
+        _copy_rows(rownorm, datnorm, thread, nthreads)
+
+
+def _pixel_range_signatures():
+    """Signatures of _pixel_range, for positions of either precision."""
+    grid = (numba.float64,) * 4 + (numba.int64,) * 2
+    return [(f, f, numba.float64) + grid for f in FLOATS]
+
+
+@njit(*_pixel_range_signatures(), inline='always')
+def _pixel_range(xi, yi, radkern, xmin, ymin, pixwidthx, pixwidthy, npixx, npixy):
+    """Range of pixels within the kernel radius of a particle.
+
+    Returns
+    -------
+    ipixmin, ipixmax, jpixmin, jpixmax
+        The pixels in the x and y directions, clipped to the image.
+    """
+    ipixmin = int((xi - radkern - xmin) / pixwidthx)
+    ipixmax = int((xi + radkern - xmin) / pixwidthx) + 1
+    jpixmin = int((yi - radkern - ymin) / pixwidthy)
+    jpixmax = int((yi + radkern - ymin) / pixwidthy) + 1
+
+    # Make sure they only contribute to pixels in the image
+    # (note that this optimises much better than using min/max)
+    if ipixmin < 0:
+        ipixmin = 0
+    if jpixmin < 0:
+        jpixmin = 0
+    if ipixmax > npixx:
+        ipixmax = npixx
+    if jpixmax > npixy:
+        jpixmax = npixy
+
+    return ipixmin, ipixmax, jpixmin, jpixmax
+
+
+def _add_rows_signatures():
+    """Signatures of _add_rows.
+
+    The pixel arrays and the terms are in the precision of the weights,
+    and the normalisation term in the precision of the weights or, for
+    cross sections, float64.
+    """
+    pixels = (numba.float64[::1],) * 3
+    ints = (numba.int64,) * 6
+    return [
+        (f[:, :, ::1], f[:, ::1], f[::1], t)
+        + pixels
+        + (f, f, numba.float64, numba.float64)
+        + ints
+        + (numba.boolean, numba.float64[::1])
+        for f in FLOATS
+        for t in {f, numba.float64}
+    ]
+
+
+@njit(*_add_rows_signatures(), inline='always')
+def _add_rows(
+    rowsmooth,
+    rownorm,
+    term,
+    termnorm,
+    xpix,
+    ypix,
+    dx2i,
+    xi,
+    yi,
+    hi21,
+    dz2,
+    ipixmin,
+    ipixmax,
+    jpixmin,
+    jpixmax,
+    block,
+    nthreads,
+    normalise,
+    coltable,
+):
+    """Add a particle to the blocks of rows owned by a thread.
+
+    The kernel is integrated through with coltable for projections, and
+    is the cubic spline at distance dz2 from the slice for cross
+    sections, when coltable is empty.
+    """
+    projection = len(coltable) > 0
+    nfields = len(term)
+
+    # Precalculate an array of dx2 for this particle (optimisation)
+    for ipix in range(ipixmin, ipixmax):
+        dx2i[ipix] = ((xpix[ipix] - xi) ** 2) * hi21 + dz2
+
+    # Loop over pixels, adding the contribution from this particle
+    while block * ROW_BLOCK < jpixmax:
+        jstart = max(block * ROW_BLOCK, jpixmin)
+        jstop = min((block + 1) * ROW_BLOCK, jpixmax)
+        # The row in the local arrays
+        jrow = (block // nthreads) * ROW_BLOCK - block * ROW_BLOCK
+        for jpix in range(jstart, jstop):
+            dy = ypix[jpix] - yi
+            dy2 = dy * dy * hi21
             for ipix in range(ipixmin, ipixmax):
-                dx2i[ipix] = ((xmin + (ipix - 0.5) * pixwidthx - xi) ** 2) * hi21 + dz2
-
-            # Loop over pixels, adding the contribution from this particle
-            for jpix in range(jpixmin, jpixmax):
-                ypix = ymin + (jpix - 0.5) * pixwidthy
-                dy = ypix - yi
-                dy2 = dy * dy * hi21
-                for ipix in range(ipixmin, ipixmax):
-                    q2 = dx2i[ipix] + dy2
-                    # SPH kernel - cubic spline
-                    if q2 < RADKERNEL2:
+                # dx2 pre-calculated; dy2 pre-multiplied by hi21
+                q2 = dx2i[ipix] + dy2
+                if q2 < RADKERNEL2:
+                    # SPH kernel - integral through cubic spline
+                    # interpolated from a pre-calculated table, or cubic
+                    # spline
+                    if projection:
+                        wab = wfromtable(q2, coltable)
+                    else:
                         wab = w_cubic(q2)
-                        # Calculate data value at this pixel using the summation
-                        # interpolant
-                        datsmooth[ipix, jpix] = datsmooth[ipix, jpix] + term * wab
-                        if normalise:
-                            datnorm[ipix, jpix] = datnorm[ipix, jpix] + termnorm * wab
+                    # Calculate data value at this pixel using the summation
+                    # interpolant
+                    for ifield in range(nfields):
+                        rowsmooth[ipix, jrow + jpix, ifield] += term[ifield] * wab
+                    if normalise:
+                        rownorm[ipix, jrow + jpix] += termnorm * wab
+        block += nthreads
 
-    # Normalise dat array
-    if normalise:
-        # Normalise everywhere (required if not using SPH weighting)
-        for idxi in range(npixx):
-            for idxj in range(npixy):
-                if datnorm[idxi, idxj] > 0.0:
-                    datsmooth[idxi, idxj] /= datnorm[idxi, idxj]
 
-    # Return datsmooth
-    return datsmooth.T
+def _footprint_signatures(num_arrays):
+    """Signatures of footprint_projection and footprint_slice."""
+    grid = (numba.float64,) * 2 + (numba.int64,) * 2 + (numba.float64,) * 2
+    return [
+        _particle_arrays(num_arrays - 2, f, h)
+        + (numba.int8[::1], numba.int64)
+        + grid
+        for f, h in PRECISIONS
+    ]
+
+
+def _particle_footprint_signatures(num_arrays, coltable):
+    """Signatures of the functions finding the footprint of a particle.
+
+    The arguments are as for footprint_projection and footprint_slice,
+    without the number of particles, followed by the kernel table if
+    required, the particle, the start of the particle in the output
+    arrays, the output arrays, and whether to fill them.
+    """
+    grid = (numba.float64,) * 2 + (numba.int64,) * 2 + (numba.float64,) * 2
+    table = (numba.float64[::1],) if coltable else ()
+    return [
+        _particle_arrays(num_arrays - 2, f, h)
+        + (numba.int8[::1],)
+        + grid
+        + table
+        + (numba.int64,) * 2
+        + (numba.int64[::1], f[::1], numba.boolean)
+        for f, h in PRECISIONS
+    ]
+
+
+@njit(*_footprint_signatures(4), parallel=True)
+def footprint_projection(
+    x: ndarray,
+    y: ndarray,
+    hh: ndarray,
+    weight: ndarray,
+    itype: ndarray,
+    npart: int,
+    xmin: float,
+    ymin: float,
+    npixx: int,
+    npixy: int,
+    pixwidthx: float,
+    pixwidthy: float,
+):
+    """Kernel weights of particles on a pixel grid via projection.
+
+    The weights are a sparse matrix from particles to pixels, in
+    compressed sparse column format. The product of the matrix with
+    particle data is the data interpolated by interpolate_projection
+    without normalisation, and the product with ones is the
+    normalisation.
+
+    Parameters
+    ----------
+    x
+        The particle x positions.
+    y
+        The particle y positions.
+    hh
+        The particle smoothing length.
+    weight
+        The particle weight.
+    itype
+        The particle type.
+    npart
+        The number of particles.
+    xmin
+        The minimum x position.
+    ymin
+        The minimum y position.
+    npixx
+        The number of pixels in the x direction.
+    npixy
+        The number of pixels in the y direction.
+    pixwidthx
+        The pixel width in the x direction.
+    pixwidthy
+        The pixel width in the y direction.
+
+    Return
+    ------
+    indptr
+        The start of each particle in indices and data.
+    indices
+        The pixel of each weight, as jpix * npixx + ipix.
+    data
+        The kernel weights.
+    """
+    coltable = setup_integratedkernel()
+    no_indices = np.zeros(0, dtype=np.int64)
+    no_data = np.zeros(0, dtype=weight.dtype)
+
+    # Count the pixels of each particle, then fill them in
+    counts = np.zeros(npart + 1, dtype=np.int64)
+    for idx in numba.prange(npart):
+        counts[idx + 1] = _project_footprint(
+            x,
+            y,
+            hh,
+            weight,
+            itype,
+            xmin,
+            ymin,
+            npixx,
+            npixy,
+            pixwidthx,
+            pixwidthy,
+            coltable,
+            idx,
+            0,
+            no_indices,
+            no_data,
+            False,
+        )
+    indptr = np.cumsum(counts)
+    indices = np.empty(indptr[npart], dtype=np.int64)
+    data = np.empty(indptr[npart], dtype=weight.dtype)
+    for idx in numba.prange(npart):
+        _project_footprint(
+            x,
+            y,
+            hh,
+            weight,
+            itype,
+            xmin,
+            ymin,
+            npixx,
+            npixy,
+            pixwidthx,
+            pixwidthy,
+            coltable,
+            idx,
+            indptr[idx],
+            indices,
+            data,
+            True,
+        )
+
+    return indptr, indices, data
+
+
+@njit(*_particle_footprint_signatures(4, coltable=True))
+def _project_footprint(
+    x,
+    y,
+    hh,
+    weight,
+    itype,
+    xmin,
+    ymin,
+    npixx,
+    npixy,
+    pixwidthx,
+    pixwidthy,
+    coltable,
+    idx,
+    start,
+    indices,
+    data,
+    fill,
+):
+    """Find the pixels and kernel weights of a particle via projection.
+
+    The pixels and weights are as in _project_rows, and are written to
+    indices and data from start if fill is True.
+
+    Returns
+    -------
+    count
+        The number of pixels.
+    """
+    # Skip particles with itype < 0
+    if itype[idx] < 0:
+        return 0
+
+    # Set h related quantities
+    hi = hh[idx]
+    horigi = hi
+    if not hi > 0.0:
+        return 0
+
+    xminpix = xmin - 0.5 * pixwidthx
+    yminpix = ymin - 0.5 * pixwidthy
+    xmax = xmin + npixx * pixwidthx
+    ymax = ymin + npixy * pixwidthy
+
+    # Radius of the smoothing kernel
+    radkern = RADKERNEL * hi
+
+    # Cycle as soon as we know the particle does not contribute
+    xi = x[idx]
+    if xi - radkern > xmax or xi + radkern < xmin:
+        return 0
+    yi = y[idx]
+    if yi - radkern > ymax or yi + radkern < ymin:
+        return 0
+
+    # Take resolution length as max of h and 1/2 pixel width
+    hsmooth = max(hi, 0.5 * max(pixwidthx, pixwidthy))
+    radkern = RADKERNEL * hsmooth
+
+    ipixmin = max(int((xi - radkern - xmin) / pixwidthx), 0)
+    ipixmax = min(int((xi + radkern - xmin) / pixwidthx) + 1, npixx)
+    jpixmin = max(int((yi - radkern - ymin) / pixwidthy), 0)
+    jpixmax = min(int((yi + radkern - ymin) / pixwidthy) + 1, npixy)
+
+    # Set kernel related quantities
+    hi1 = 1.0 / hsmooth
+    hi21 = hi1 * hi1
+    termnorm = weight[idx] * horigi
+
+    count = 0
+    for jpix in range(jpixmin, jpixmax):
+        ypix = yminpix + jpix * pixwidthy
+        dy = ypix - yi
+        dy2 = dy * dy * hi21
+        for ipix in range(ipixmin, ipixmax):
+            xpix = xminpix + (ipix + 1) * pixwidthx
+            q2 = ((xpix - xi) ** 2) * hi21 + dy2
+            if q2 < RADKERNEL2:
+                if fill:
+                    indices[start + count] = jpix * npixx + ipix
+                    data[start + count] = termnorm * wfromtable(q2, coltable)
+                count += 1
+
+    return count
+
+
+@njit(*_footprint_signatures(5), parallel=True)
+def footprint_slice(
+    x: ndarray,
+    y: ndarray,
+    dslice: ndarray,
+    hh: ndarray,
+    weight: ndarray,
+    itype: ndarray,
+    npart: int,
+    xmin: float,
+    ymin: float,
+    npixx: int,
+    npixy: int,
+    pixwidthx: float,
+    pixwidthy: float,
+):
+    """Kernel weights of particles on a pixel grid via cross section.
+
+    The weights are a sparse matrix from particles to pixels, as for
+    footprint_projection, for interpolate_slice.
+
+    Parameters
+    ----------
+    x
+        The particle x positions.
+    y
+        The particle y positions.
+    dslice
+        The distance from the cross section slice.
+    hh
+        The particle smoothing length.
+    weight
+        The particle weight.
+    itype
+        The particle type.
+    npart
+        The number of particles.
+    xmin
+        The minimum x position.
+    ymin
+        The minimum y position.
+    npixx
+        The number of pixels in the x direction.
+    npixy
+        The number of pixels in the y direction.
+    pixwidthx
+        The pixel width in the x direction.
+    pixwidthy
+        The pixel width in the y direction.
+
+    Return
+    ------
+    indptr
+        The start of each particle in indices and data.
+    indices
+        The pixel of each weight, as jpix * npixx + ipix.
+    data
+        The kernel weights.
+    """
+    no_indices = np.zeros(0, dtype=np.int64)
+    no_data = np.zeros(0, dtype=weight.dtype)
+
+    # Count the pixels of each particle, then fill them in
+    counts = np.zeros(npart + 1, dtype=np.int64)
+    for idx in numba.prange(npart):
+        counts[idx + 1] = _slice_footprint(
+            x,
+            y,
+            dslice,
+            hh,
+            weight,
+            itype,
+            xmin,
+            ymin,
+            npixx,
+            npixy,
+            pixwidthx,
+            pixwidthy,
+            idx,
+            0,
+            no_indices,
+            no_data,
+            False,
+        )
+    indptr = np.cumsum(counts)
+    indices = np.empty(indptr[npart], dtype=np.int64)
+    data = np.empty(indptr[npart], dtype=weight.dtype)
+    for idx in numba.prange(npart):
+        _slice_footprint(
+            x,
+            y,
+            dslice,
+            hh,
+            weight,
+            itype,
+            xmin,
+            ymin,
+            npixx,
+            npixy,
+            pixwidthx,
+            pixwidthy,
+            idx,
+            indptr[idx],
+            indices,
+            data,
+            True,
+        )
+
+    return indptr, indices, data
+
+
+@njit(*_particle_footprint_signatures(5, coltable=False))
+def _slice_footprint(
+    x,
+    y,
+    dslice,
+    hh,
+    weight,
+    itype,
+    xmin,
+    ymin,
+    npixx,
+    npixy,
+    pixwidthx,
+    pixwidthy,
+    idx,
+    start,
+    indices,
+    data,
+    fill,
+):
+    """Find the pixels and kernel weights of a particle via cross section.
+
+    The pixels and weights are as in _slice_rows, and are written to
+    indices and data from start if fill is True.
+
+    Returns
+    -------
+    count
+        The number of pixels.
+    """
+    # Skip particles with itype < 0
+    if itype[idx] < 0:
+        return 0
+
+    # Set h related quantities
+    hi = hh[idx]
+    if not hi > 0.0:
+        return 0
+    hi1 = 1.0 / hi
+    hi21 = hi1 * hi1
+    radkern = RADKERNEL * hi
+
+    # Distance from the cross section slice
+    dz2 = dslice[idx] ** 2 * hi21
+    if not dz2 < RADKERNEL2:
+        return 0
+
+    xi = x[idx]
+    yi = y[idx]
+
+    ipixmin = max(int((xi - radkern - xmin) / pixwidthx), 0)
+    ipixmax = min(int((xi + radkern - xmin) / pixwidthx) + 1, npixx)
+    jpixmin = max(int((yi - radkern - ymin) / pixwidthy), 0)
+    jpixmax = min(int((yi + radkern - ymin) / pixwidthy) + 1, npixy)
+
+    termnorm = CNORMK3D * weight[idx]
+
+    count = 0
+    for jpix in range(jpixmin, jpixmax):
+        ypix = ymin + (jpix - 0.5) * pixwidthy
+        dy = ypix - yi
+        dy2 = dy * dy * hi21
+        for ipix in range(ipixmin, ipixmax):
+            q2 = ((xmin + (ipix - 0.5) * pixwidthx - xi) ** 2) * hi21 + dz2 + dy2
+            if q2 < RADKERNEL2:
+                if fill:
+                    indices[start + count] = jpix * npixx + ipix
+                    data[start + count] = termnorm * w_cubic(q2)
+                count += 1
+
+    return count
+
+
+@njit((numba.int64, numba.int64))
+def _num_row_threads(num_threads, npixy):
+    """Number of threads to split the rows of pixels between.
+
+    The number of Numba threads is read in object mode, as reading it in
+    nopython mode stops functions from being cached to disk.
+    """
+    if num_threads <= 0:
+        with numba.objmode(num_threads='int64'):
+            num_threads = numba.get_num_threads()
+    num_blocks = (npixy + ROW_BLOCK - 1) // ROW_BLOCK
+    return max(1, min(num_threads, num_blocks))
+
+
+@njit((numba.int64, numba.int64, numba.int64))
+def _first_row_block(jpixmin, thread, nthreads):
+    """First block of rows owned by a thread at or after a row.
+
+    The rows of pixels are split into blocks of ROW_BLOCK rows, assigned
+    to threads in turn so that the work is balanced when particles are
+    concentrated in part of the image. Each thread only adds to pixels
+    in its own rows, so no two threads write to the same pixel.
+    """
+    block = jpixmin // ROW_BLOCK
+    return block + (thread - block) % nthreads
+
+
+@njit(
+    *[(f[:, :, ::1], f[:, :, ::1], numba.int64, numba.int64) for f in FLOATS],
+    *[(f[:, ::1], f[:, ::1], numba.int64, numba.int64) for f in FLOATS],
+)
+def _copy_rows(rows, dat, thread, nthreads):
+    """Copy the blocks of rows owned by a thread from local arrays."""
+    npixy = dat.shape[1]
+    block = thread
+    while block * ROW_BLOCK < npixy:
+        jstart = block * ROW_BLOCK
+        jstop = min(jstart + ROW_BLOCK, npixy)
+        jrow = (block // nthreads) * ROW_BLOCK
+        dat[:, jstart:jstop] = rows[:, jrow : jrow + jstop - jstart]
+        block += nthreads
+
+
+@njit(*[(f[:, :, ::1], f[:, ::1]) for f in FLOATS], parallel=True)
+def _normalise(datsmooth, datnorm):
+    """Normalise interpolated fields in place."""
+    npixx, npixy, nfields = datsmooth.shape
+    # Normalise everywhere (required if not using SPH weighting)
+    for idxi in numba.prange(npixx):
+        for idxj in range(npixy):
+            if datnorm[idxi, idxj] > 0.0:
+                for ifield in range(nfields):
+                    datsmooth[idxi, idxj, ifield] /= datnorm[idxi, idxj]
@@ -0,0 +1,476 @@
+"""Tiled images for interactive zoom and pan.
+
+A tile pyramid divides the plane into square grids of tiles at
+power-of-two zoom levels, each tile with the same number of pixels.
+Images of any extent are made from the tiles at the level matching
+their resolution, so panning and zooming only interpolate the tiles not
+already made.
+"""
+
+from __future__ import annotations
+
+import hashlib
+from math import ceil, floor, log2
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple, Union
+
+import matplotlib.pyplot as plt
+import numpy as np
+from numpy import ndarray
+
+from .._logging import logger
+from .._units import Quantity
+from ..snap.disk_cache import DiskCache, plonk_version, write_atomic
+from ..utils.visualize import get_extent_from_percentile
+from .interpolation import Extent
+from .visualization import _get_unit, _interpolated_data, _interpolated_plot
+
+if TYPE_CHECKING:
+    from ..snap.snap import SnapLike
+
+# The number of pixels along each side of a tile
+TILE_PIXELS = 256
+
+# The maximum number of tiles kept in memory
+MAX_TILES = 256
+
+Tile = Tuple[int, int, int]
+
+
+class TilePyramid:
+    """Image tiles of a scalar quantity at power-of-two zoom levels.
+
+    The extent of the pyramid is a single tile at level 0. Each level
+    splits every tile of the level above into four, so tiles at level L
+    are 1 / 2**L of the width and height of the extent. Tiles are
+    indexed by (level, i, j), with i along x and j along y from the
+    lower left corner of the extent. Tiles may lie outside the extent,
+    so views can pan beyond it.
+
+    Tiles are interpolated when first required, and kept in memory, for
+    the most recently used, and on disk in the .plonk_cache directory
+    next to the snapshot file, or the disk_cache directory of the Snap.
+    Tiles on disk are keyed by the snapshot file, the view parameters,
+    and the rotation, translation and properties of the Snap. Tiles of
+    arrays set by the user are only kept in memory.
+
+    Parameters
+    ----------
+    snap
+        The Snap (or SubSnap) object to visualize.
+    quantity
+        The quantity to visualize. Must be a string to pass to Snap,
+        for a scalar quantity.
+    x
+        The x-coordinate for the visualization. Must be a string to
+        pass to Snap. Default is 'x'.
+    y
+        The y-coordinate for the visualization. Must be a string to
+        pass to Snap. Default is 'y'.
+    interp
+        The interpolation type. Default is 'projection'.
+
+        - 'projection' : 2d interpolation via projection to xy-plane
+        - 'slice' : 3d interpolation via cross-section slice.
+    weighted
+        Whether to density weight the interpolation or not.
+        Default is False.
+    slice_normal
+        The normal vector to the plane in which to take the
+        cross-section slice as a tuple (x, y, z). Default is
+        (0, 0, 1).
+    slice_offset
+        The offset of the cross-section slice. Default is 0.0.
+    extent
+        The extent of the level 0 tile as (xmin, xmax, ymin, ymax)
+        where xmin, etc. can be floats or quantities with units of
+        length. The default is to set the extent to a box of size such
+        that 99% of particles are contained within.
+    units
+        The units of the images as a dictionary, as for image.
+    tile_pixels
+        The number of pixels along each side of a tile. Default is 256.
+    max_tiles
+        The maximum number of tiles kept in memory. Default is 256.
+    cache
+        If True, store tiles on disk, unless the quantity is an array
+        set by the user. Default is True.
+
+    Examples
+    --------
+    Show an image of the surface density, and then zoom in on the
+    center, using the tiles of the first image at the lower levels.
+
+    >>> pyramid = plonk.visualize.TilePyramid(snap=snap, quantity='density')
+    >>> pyramid.image()
+    >>> pyramid.image(extent=(-20, 20, -20, 20))
+
+    Get the data of the tiles covering an extent.
+
+    >>> data, extent = pyramid.data(extent=(-20, 20, -20, 20))
+    """
+
+    def __init__(
+        self,
+        snap: SnapLike,
+        quantity: str,
+        *,
+        x: str = 'x',
+        y: str = 'y',
+        interp: str = 'projection',
+        weighted: bool = False,
+        slice_normal: Tuple[float, float, float] = None,
+        slice_offset: Union[Quantity, float] = None,
+        extent: Quantity = None,
+        units: Dict[str, str] = None,
+        tile_pixels: int = TILE_PIXELS,
+        max_tiles: int = MAX_TILES,
+        cache: bool = True,
+    ):
+        if interp not in ('projection', 'slice'):
+            raise ValueError('interp must be "projection" or "slice"')
+        if quantity in snap._vector_arrays:
+            raise ValueError('TilePyramid must be of a 1-dimensional quantity')
+        if tile_pixels < 1:
+            raise ValueError('tile_pixels must be positive')
+
+        self.snap = snap
+        self.quantity = quantity
+        self.x = x
+        self.y = y
+        self.interp = interp
+        self.weighted = weighted
+        self.slice_normal = slice_normal
+        self.slice_offset = slice_offset
+        self.tile_pixels = tile_pixels
+        self.max_tiles = max_tiles
+        self.cache = cache
+        # Arrays set by the user are not known in another session
+        self._on_disk = (
+            cache and snap.base_array_name(quantity) in snap._array_registry
+        )
+        self._units = units
+        self.units = {
+            'quantity': _get_unit(snap, quantity, units),
+            'extent': _get_unit(snap, 'position', units),
+            'projection': _get_unit(snap, 'projection', units),
+        }
+        if extent is None:
+            extent = get_extent_from_percentile(snap=snap, x=x, y=y)
+        self.extent = self._to_floats(extent)
+        self._tiles: Dict[Tile, ndarray] = {}
+        self._key: Optional[str] = None
+
+    def tile_extent(self, level: int, i: int, j: int) -> Extent:
+        """Return the extent of a tile.
+
+        Parameters
+        ----------
+        level
+            The zoom level.
+        i
+            The index of the tile along x.
+        j
+            The index of the tile along y.
+
+        Returns
+        -------
+        Tuple
+            The extent as (xmin, xmax, ymin, ymax).
+        """
+        xmin, xmax, ymin, ymax = self.extent
+        width = (xmax - xmin) / 2 ** level
+        height = (ymax - ymin) / 2 ** level
+        return (
+            xmin + i * width,
+            xmin + (i + 1) * width,
+            ymin + j * height,
+            ymin + (j + 1) * height,
+        )
+
+    def level(self, extent: Extent, num_pixels: Tuple[int, int]) -> int:
+        """Return the zoom level with pixels no larger than those of an image.
+
+        Parameters
+        ----------
+        extent
+            The extent of the image as (xmin, xmax, ymin, ymax) in the
+            units of the pyramid.
+        num_pixels
+            The pixels of the image as (npixx, npixy).
+
+        Returns
+        -------
+        int
+            The zoom level.
+        """
+        xmin, xmax, ymin, ymax = self.extent
+        ratio = max(
+            (xmax - xmin) * num_pixels[0] / (extent[1] - extent[0]),
+            (ymax - ymin) * num_pixels[1] / (extent[3] - extent[2]),
+        )
+        return max(0, ceil(log2(ratio / self.tile_pixels) - 1e-9))
+
+    def tile(self, level: int, i: int, j: int) -> ndarray:
+        """Return the interpolated data of a tile.
+
+        The tile is taken from memory or disk if available, or
+        interpolated otherwise.
+
+        Parameters
+        ----------
+        level
+            The zoom level.
+        i
+            The index of the tile along x.
+        j
+            The index of the tile along y.
+
+        Returns
+        -------
+        ndarray
+            The interpolated data with shape (tile_pixels, tile_pixels)
+            in the units of the pyramid.
+        """
+        key = self._check_key()
+        tile = (level, i, j)
+        data = self._tiles.pop(tile, None)
+        if data is None and self._on_disk:
+            data = self._read(key, tile)
+        if data is None:
+            data = self._interpolate(tile)
+            if self._on_disk:
+                self._write(key, tile, data)
+        # Add to the end as most recently used
+        self._tiles[tile] = data
+        while len(self._tiles) > self.max_tiles:
+            del self._tiles[next(iter(self._tiles))]
+        return data
+
+    def data(
+        self, extent: Quantity = None, num_pixels: Tuple[int, int] = (512, 512)
+    ) -> Tuple[ndarray, Extent]:
+        """Return the interpolated data of the tiles covering an extent.
+
+        Parameters
+        ----------
+        extent : optional
+            The extent to cover as (xmin, xmax, ymin, ymax) where xmin,
+            etc. can be floats or quantities with units of length.
+            Default is the extent of the pyramid.
+        num_pixels : optional
+            The pixels of the image to make as (npixx, npixy), to choose
+            the zoom level. Default is (512, 512).
+
+        Returns
+        -------
+        data
+            The interpolated data of the tiles, joined into one array.
+        extent
+            The extent of the tiles, which contains the extent requested.
+        """
+        extent = self.extent if extent is None else self._to_floats(extent)
+        level = self.level(extent, num_pixels)
+        xmin, xmax, ymin, ymax = self.extent
+        width = (xmax - xmin) / 2 ** level
+        height = (ymax - ymin) / 2 ** level
+        imin = floor((extent[0] - xmin) / width)
+        imax = max(ceil((extent[1] - xmin) / width), imin + 1)
+        jmin = floor((extent[2] - ymin) / height)
+        jmax = max(ceil((extent[3] - ymin) / height), jmin + 1)
+        logger.debug(
+            f'Tiles at level {level}: i in [{imin}, {imax}), j in [{jmin}, {jmax})'
+        )
+
+        n = self.tile_pixels
+        data = None
+        with self.snap.context(cache=True):
+            for j in range(jmin, jmax):
+                for i in range(imin, imax):
+                    tile = self.tile(level, i, j)
+                    if data is None:
+                        shape = ((jmax - jmin) * n, (imax - imin) * n)
+                        data = np.empty(shape, dtype=tile.dtype)
+                    rows = slice((j - jmin) * n, (j - jmin + 1) * n)
+                    cols = slice((i - imin) * n, (i - imin + 1) * n)
+                    data[rows, cols] = tile
+
+        xmin_tile, _, ymin_tile, _ = self.tile_extent(level, imin, jmin)
+        _, xmax_tile, _, ymax_tile = self.tile_extent(level, imax - 1, jmax - 1)
+        return data, (xmin_tile, xmax_tile, ymin_tile, ymax_tile)
+
+    def image(
+        self,
+        extent: Quantity = None,
+        num_pixels: Tuple[int, int] = (512, 512),
+        ax: Any = None,
+        ax_kwargs={},
+        colorbar_kwargs={},
+        **kwargs,
+    ) -> Any:
+        """Visualize the quantity as an image from tiles.
+
+        Parameters
+        ----------
+        extent : optional
+            The range in the x and y-coord as (xmin, xmax, ymin, ymax)
+            where xmin, etc. can be floats or quantities with units of
+            length. Default is the extent of the pyramid.
+        num_pixels : optional
+            The resolution of the image as (npixx, npixy), to choose the
+            zoom level. Default is (512, 512).
+        ax : optional
+            A matplotlib Axes handle.
+        ax_kwargs : optional
+            Keyword arguments to pass to matplotlib Axes.
+        colorbar_kwargs : optional
+            Keyword arguments to pass to matplotlib Colorbar.
+        **kwargs
+            Additional keyword arguments to pass to matplotlib imshow,
+            as for image.
+
+        Returns
+        -------
+        ax
+            The matplotlib Axes object.
+        """
+        extent = self.extent if extent is None else self._to_floats(extent)
+        data, tile_extent = self.data(extent=extent, num_pixels=num_pixels)
+
+        if ax is None:
+            fig, ax = plt.subplots()
+        else:
+            fig = ax.figure
+
+        _interpolated_plot(
+            interpolated_data=data,
+            extent=tile_extent,
+            names={'quantity': self.quantity, 'x': self.x, 'y': self.y},
+            kind='image',
+            interp=self.interp,
+            weighted=self.weighted,
+            units=self.units,
+            ax=ax,
+            fig=fig,
+            ax_kwargs={},
+            colorbar_kwargs=colorbar_kwargs,
+            **kwargs,
+        )
+        ax.set_xlim(*extent[:2])
+        ax.set_ylim(*extent[2:])
+        ax.set(**ax_kwargs)
+
+        return ax
+
+    def clear(self):
+        """Remove the tiles from memory and disk."""
+        self._tiles.clear()
+        directory = self._directory(self._check_key())
+        if directory.is_dir():
+            for path in directory.glob('*.npy'):
+                path.unlink()
+            directory.rmdir()
+
+    def _to_floats(self, extent: Any) -> Extent:
+        if isinstance(extent[0], Quantity):
+            unit = self.units['extent']
+            return tuple(float((e / unit).to_base_units().magnitude) for e in extent)
+        return tuple(float(e) for e in extent)
+
+    def _check_key(self) -> str:
+        """Return the key of the tiles, clearing them if it changed.
+
+        The key changes if the Snap is rotated or translated, or its
+        properties change.
+        """
+        snap = self.snap
+        root = getattr(snap, '_root', snap)
+        rotation, translation = None, None
+        if root.rotation is not None:
+            rotation = np.asarray(root.rotation.as_quat()).tobytes()
+        if root.translation is not None:
+            translation = np.asarray(
+                root.translation.to_base_units().magnitude, dtype=float
+            ).tobytes()
+        indices = None
+        if root is not snap:
+            indices = hashlib.sha1(np.asarray(snap._file_indices).tobytes())
+            indices = indices.hexdigest()
+        slice_offset = self.slice_offset
+        if isinstance(slice_offset, Quantity):
+            slice_offset = (slice_offset.to_base_units().magnitude, 'm')
+        parameters = (
+            self.quantity,
+            self.x,
+            self.y,
+            self.interp,
+            self.weighted,
+            None if self.slice_normal is None else tuple(self.slice_normal),
+            slice_offset,
+            self.extent,
+            self.tile_pixels,
+            {name: str(unit) for name, unit in self.units.items()},
+            rotation,
+            translation,
+            indices,
+            repr(sorted(root._properties.items())),
+            snap._config_key,
+            str(snap._precision),
+            plonk_version(),
+        )
+        key = hashlib.sha1(repr(parameters).encode()).hexdigest()[:16]
+        if key != self._key:
+            self._tiles.clear()
+            self._key = key
+        return key
+
+    def _directory(self, key: str) -> Path:
+        disk_cache = self.snap._disk_cache
+        if disk_cache is None:
+            disk_cache = DiskCache()
+        return disk_cache.snap_directory(self.snap) / f'tiles_{key}'
+
+    def _interpolate(self, tile: Tile) -> ndarray:
+        logger.debug(f'Interpolating tile {tile}')
+        data, _, _ = _interpolated_data(
+            snap=self.snap,
+            quantity=self.quantity,
+            x=self.x,
+            y=self.y,
+            interp=self.interp,
+            weighted=self.weighted,
+            slice_normal=self.slice_normal,
+            slice_offset=self.slice_offset,
+            extent=np.array(self.tile_extent(*tile)) * self.units['extent'],
+            units=self._units,
+            num_pixels=(self.tile_pixels, self.tile_pixels),
+            cache=False,
+        )
+        return data
+
+    def _read(self, key: str, tile: Tile) -> Optional[ndarray]:
+        path = self._directory(key) / '{}_{}_{}.npy'.format(*tile)
+        if not path.is_file():
+            return None
+        try:
+            data = np.load(path, allow_pickle=False)
+        except (OSError, ValueError) as e:
+            logger.warning(f'Cannot read tile {tile}: {e}')
+            return None
+        logger.debug(f'Read tile {tile} from disk: {path}')
+        return data
+
+    def _write(self, key: str, tile: Tile, data: ndarray) -> None:
+        path = self._directory(key) / '{}_{}_{}.npy'.format(*tile)
+
+        def write(tmp_path: Path):
+            with open(tmp_path, mode='wb') as fp:
+                np.save(fp, data, allow_pickle=False)
+
+        write_atomic(path, write, f'tile {tile}')
+
+    def __repr__(self) -> str:
+        return (
+            f'<plonk.TilePyramid "{self.quantity}" interp="{self.interp}" '
+            f'tiles={len(self._tiles)}>'
+        )
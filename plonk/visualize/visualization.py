@@ -2,9 +2,20 @@
 
 from __future__ import annotations
 
+import weakref
 from contextlib import suppress
 from copy import copy
-from typing import TYPE_CHECKING, Any, Dict, Sequence, Tuple, Union
+from functools import partial
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Dict,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
 import matplotlib.pyplot as plt
 import numpy as np
@@ -14,14 +25,21 @@ from numpy import ndarray
 from .._logging import logger
 from .._units import Quantity
 from .._units import units as plonk_units
+from ..snap.cache import ArrayCache, parse_memory
 from ..utils.strings import pretty_array_name
 from ..utils.visualize import get_extent_from_percentile
 from . import plots
+from .footprint import footprint_key
 from .interpolation import interpolate
 
 if TYPE_CHECKING:
     from ..snap.snap import SnapLike
 
+# The memory budget for cached interpolated data, in bytes
+RENDER_CACHE_LIMIT = 256 * 2 ** 20
+
+_render_cache = ArrayCache(max_bytes=RENDER_CACHE_LIMIT)
+
 _kind_to_function = {
     'image': plots.imshow,
     'contour': plots.contour,
@@ -121,6 +139,10 @@ def image(
     num_pixels : tuple
         The number of pixels to interpolate particle quantities
         to as a tuple (nx, ny). Default is (512, 512).
+    footprint : bool
+        Whether to store the kernel weights of the particles on the
+        pixel grid on the Snap, to reuse for other quantities with the
+        same view. See plonk.interpolate. Default is False.
     show_colorbar : bool
         Whether or not to display a colorbar. Default is True.
 
@@ -249,6 +271,10 @@ def vector(
     num_pixels : tuple
         The number of pixels to interpolate particle quantities
         to as a tuple (nx, ny). Default is (512, 512).
+    footprint : bool
+        Whether to store the kernel weights of the particles on the
+        pixel grid on the Snap, to reuse for other quantities with the
+        same view. See plonk.interpolate. Default is False.
     number_of_arrows : tuple
         The number of arrows to display by sub-sampling the
         interpolated data. Default is (25, 25).
@@ -318,15 +344,9 @@ def _interpolation_plot(
     if interp not in ('projection', 'slice'):
         raise ValueError('interp must be "projection" or "slice"')
 
-    q: Quantity = snap[quantity]
-    if kind is None:
-        if q.ndim == 1:
-            kind = 'image'
-        elif q.ndim == 2:
-            kind = 'quiver'
-    if kind not in ('image', 'contour', 'quiver', 'streamplot'):
+    if kind not in (None, 'image', 'contour', 'quiver', 'streamplot'):
         raise ValueError('Cannot determine plot type')
-    if kind in ('image', 'contour') and not q.ndim == 1:
+    if kind in ('image', 'contour') and quantity in snap._vector_arrays:
         raise ValueError('image and contour plots must be of 1-dimensional quantities')
     if kind in ('quiver', 'streamplot') and quantity not in snap._vector_arrays:
         raise ValueError('quiver and stream plots must be of vector quantities')
@@ -338,6 +358,7 @@ def _interpolation_plot(
 
     # Interpolate data to plot
     num_pixels = _kwargs.pop('num_pixels', None)
+    footprint = _kwargs.pop('footprint', False)
     _data, _extent, _units = _interpolated_data(
         snap=snap,
         quantity=quantity,
@@ -350,8 +371,16 @@ def _interpolation_plot(
         extent=extent,
         units=units,
         num_pixels=num_pixels,
+        footprint=footprint,
     )
 
+    # The interpolated data is (npixy, npixx) for a 1-dimensional quantity,
+    # and (2, npixy, npixx) for a vector quantity
+    if kind is None:
+        kind = 'image' if _data.ndim == 2 else 'quiver'
+    if kind in ('image', 'contour') and not _data.ndim == 2:
+        raise ValueError('image and contour plots must be of 1-dimensional quantities')
+
     # Make the actual plot
     _interpolated_plot(
         interpolated_data=_data,
@@ -383,6 +412,8 @@ def _interpolated_data(
     extent,
     units,
     num_pixels,
+    footprint=False,
+    cache=True,
 ):
     units = {
         'quantity': _get_unit(snap, quantity, units),
@@ -390,6 +421,28 @@ def _interpolated_data(
         'projection': _get_unit(snap, 'projection', units),
     }
 
+    # Arrays set by the user can be deleted and set again with other values
+    # under the same name, so are not cached
+    key = None
+    if cache and snap.base_array_name(quantity) in snap._array_registry:
+        key = _render_key(
+            snap,
+            units,
+            quantity=quantity,
+            x=x,
+            y=y,
+            interp=interp,
+            weighted=weighted,
+            slice_normal=slice_normal,
+            slice_offset=slice_offset,
+            extent=extent,
+            num_pixels=num_pixels,
+            footprint=footprint,
+        )
+        render = _get_render(snap, key)
+        if render is not None:
+            return render.data, render.extent, dict(render.units)
+
     if extent is None:
         extent = get_extent_from_percentile(snap=snap, x=x, y=y)
     if not isinstance(extent[0], Quantity):
@@ -410,6 +463,7 @@ def _interpolated_data(
         slice_offset=slice_offset,
         extent=extent,
         num_pixels=num_pixels,
+        footprint=footprint,
     )
 
     # Convert Quantity to ndarray
@@ -421,9 +475,112 @@ def _interpolated_data(
     else:
         interpolated_data = interpolated_data.to(units['quantity']).magnitude
 
+    if key is not None:
+        # The cached arrays are shared by later calls
+        interpolated_data.flags.writeable = False
+        extent.flags.writeable = False
+        _render_cache[key] = _Render(
+            snap=weakref.ref(snap, partial(_remove_render, key)),
+            data=interpolated_data,
+            extent=extent,
+            units=dict(units),
+        )
+
     return interpolated_data, extent, units
 
 
+class _Render(NamedTuple):
+    """Interpolated data cached for a Snap and view."""
+
+    snap: Any
+    data: ndarray
+    extent: ndarray
+    units: Dict[str, Any]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes
+
+
+def _render_key(snap: SnapLike, units: Dict[str, Any], **view: Any) -> Tuple[Any, ...]:
+    extent, slice_offset = view['extent'], view['slice_offset']
+    if extent is not None:
+        extent = ', '.join(str(e) for e in extent)
+    if slice_offset is not None:
+        view['slice_offset'] = str(slice_offset)
+    view['extent'] = extent
+    root = getattr(snap, '_root', snap)
+    return footprint_key(snap, **view) + (
+        ('snap', id(snap)),
+        ('units', tuple(str(unit) for unit in units.values())),
+        ('properties', repr(sorted(root._properties.items()))),
+    )
+
+
+def _get_render(snap: SnapLike, key: Tuple[Any, ...]) -> Optional[_Render]:
+    try:
+        render = _render_cache[key]
+    except KeyError:
+        return None
+    if render.snap() is not snap:
+        # A Snap since garbage collected with the same id
+        del _render_cache[key]
+        return None
+    logger.debug('Using cached interpolated data')
+    return render
+
+
+def _remove_render(key: Tuple[Any, ...], ref: Any = None) -> None:
+    """Remove cached data when its Snap is garbage collected."""
+    if key in _render_cache:
+        del _render_cache[key]
+
+
+def set_render_cache_limit(limit: Union[int, str, None]) -> None:
+    """Set the memory budget for cached interpolated images.
+
+    Data interpolated by image, vector, and the animation functions is
+    cached, keyed by the Snap, the quantity, the view, the units, and
+    the rotation and translation of the Snap. Showing the same image of
+    a Snap again, e.g. going back and forth between snaps with
+    visualize_sim, does not interpolate again. When the cached data
+    exceeds the budget, the least recently used is evicted, and the data
+    of a Snap is removed when it is garbage collected. The default
+    budget is 256 MiB.
+
+    Parameters
+    ----------
+    limit
+        The limit as an integer number of bytes, or a string with
+        units, e.g. '1 GB'. If None, there is no limit. If 0, nothing
+        is cached.
+
+    Examples
+    --------
+    Cache up to 1 GB of images.
+
+    >>> plonk.visualize.set_render_cache_limit('1 GB')
+    """
+    _render_cache.set_limit(parse_memory(limit))
+
+
+def render_cache_info() -> Dict[str, Any]:
+    """Return interpolated image cache statistics.
+
+    Returns
+    -------
+    Dict
+        The number of hits, misses, and evictions, the number of cached
+        images, the total size in bytes, and the budget in bytes.
+    """
+    return _render_cache.info()
+
+
+def clear_render_cache() -> None:
+    """Remove all cached interpolated images."""
+    _render_cache.clear()
+
+
 def _interpolated_plot(
     interpolated_data,
     extent,
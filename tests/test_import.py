@@ -0,0 +1,87 @@
+"""Testing import cost."""
+
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from .data.phantom import adiabatic, dustmixture, dustseparate, mhd
+
+SNAPTYPES = [adiabatic, dustmixture, dustseparate, mhd]
+DIR = Path(__file__).parent / 'data/phantom'
+HEAVY_MODULES = ['matplotlib', 'numba', 'pandas', 'scipy']
+
+# Maximum ratio of the import times of plonk and numpy. Reading the pint
+# unit definitions takes most of the time; also importing the heavy
+# modules takes about 20 times as long as numpy.
+IMPORT_TIME_RATIO = 10
+
+CODE = """
+import plonk
+snap = plonk.load_snap({filename!r})
+snap['position']
+snap['density']
+snap.close_file()
+"""
+
+
+def _import_times(code):
+    """Run code in a new interpreter and return import times by module.
+
+    The times are the cumulative import times in microseconds from
+    python -X importtime.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times = dict()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_import_plonk():
+    """Testing import plonk does not import heavy dependencies."""
+    times = _import_times('import plonk')
+    assert 'plonk' in times
+    for module in HEAVY_MODULES:
+        assert module not in times
+
+
+def test_import_time():
+    """Testing import plonk time relative to import numpy."""
+    plonk_time = min(_import_times('import plonk')['plonk'] for _ in range(3))
+    numpy_time = min(_import_times('import numpy')['numpy'] for _ in range(3))
+    print(f'import plonk: {plonk_time / 1e3:.0f} ms')
+    print(f'import numpy: {numpy_time / 1e3:.0f} ms')
+    assert plonk_time < IMPORT_TIME_RATIO * numpy_time
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_load_snap_imports(snaptype):
+    """Testing reading arrays does not import heavy dependencies."""
+    filename = str(DIR / snaptype.filename)
+    times = _import_times(CODE.format(filename=filename))
+    for module in HEAVY_MODULES:
+        assert module not in times
+
+
+def test_lazy_attributes():
+    """Testing lazily imported attributes."""
+    import plonk
+
+    assert callable(plonk.image)
+    assert plonk.Profile.__name__ == 'Profile'
+    assert plonk.analysis.particles.__name__ == 'plonk.analysis.particles'
+    assert 'image' in dir(plonk)
+    assert plonk.Snap.image is plonk.visualize.image
+    assert plonk.visualize.interpolation.interpolate is plonk.interpolate
+    with pytest.raises(AttributeError):
+        plonk.does_not_exist
@@ -3,6 +3,12 @@
 import numpy as np
 
 from plonk.visualize.interpolation import scalar_interpolation, vector_interpolation
+from plonk.visualize.splash import (
+    interpolate_projection,
+    interpolate_projection_fields,
+    interpolate_slice,
+    interpolate_slice_fields,
+)
 
 from .data.interpolation_arrays import (
     scalar_projection,
@@ -96,3 +102,67 @@ def test_vector_interpolation_slice():
     )
 
     np.testing.assert_allclose(vec, vector_slice, rtol=1e-5)
+
+
+def test_interpolation_threads():
+    """Test interpolation is identical for any number of threads."""
+    rng = np.random.default_rng(0)
+    n = 1000
+    x, y, z = rng.normal(size=(3, n))
+    h = rng.uniform(0.05, 0.5, n)
+    w = rng.uniform(0.5, 1.0, n)
+    dat = rng.uniform(size=n)
+    itype = np.ones(n, dtype=np.int8)
+    grid = (n, -2.0, -2.0, 64, 100, 4 / 64, 4 / 100)
+
+    # The default, 0, uses the number of Numba threads
+    for normalise in (False, True):
+        projection = [
+            interpolate_projection(x, y, h, w, dat, itype, *grid, normalise, threads)
+            for threads in (1, 3, 8, 0)
+        ]
+        slices = [
+            interpolate_slice(x, y, z, h, w, dat, itype, *grid, normalise, threads)
+            for threads in (1, 3, 8, 0)
+        ]
+        assert projection[0].shape == (100, 64)
+        for im in projection[1:]:
+            np.testing.assert_array_equal(im, projection[0])
+        for im in slices[1:]:
+            np.testing.assert_array_equal(im, slices[0])
+
+
+def test_interpolation_fields():
+    """Test interpolation of multiple fields is the same as one by one."""
+    rng = np.random.default_rng(0)
+    n = 1000
+    x, y, z = rng.normal(size=(3, n))
+    h = rng.uniform(0.05, 0.5, n)
+    w = rng.uniform(0.5, 1.0, n)
+    dat = rng.uniform(size=(n, 3))
+    itype = np.ones(n, dtype=np.int8)
+    grid = (n, -2.0, -2.0, 64, 100, 4 / 64, 4 / 100)
+
+    for normalise in (False, True):
+        for threads in (1, 3):
+            projection = interpolate_projection_fields(
+                x, y, h, w, dat, itype, *grid, normalise, threads
+            )
+            slices = interpolate_slice_fields(
+                x, y, z, h, w, dat, itype, *grid, normalise, threads
+            )
+            assert projection.shape == (3, 100, 64)
+            for idx in range(3):
+                _dat = np.ascontiguousarray(dat[:, idx])
+                np.testing.assert_array_equal(
+                    projection[idx],
+                    interpolate_projection(
+                        x, y, h, w, _dat, itype, *grid, normalise, threads
+                    ),
+                )
+                np.testing.assert_array_equal(
+                    slices[idx],
+                    interpolate_slice(
+                        x, y, z, h, w, _dat, itype, *grid, normalise, threads
+                    ),
+                )
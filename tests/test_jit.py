@@ -0,0 +1,91 @@
+"""Testing Numba compilation and caching."""
+
+import inspect
+import subprocess
+import sys
+from pathlib import Path
+
+import numba
+import pytest
+
+import plonk
+from plonk.__main__ import main
+from plonk.utils import jit
+from plonk.visualize import footprint, interpolation
+
+from .data.phantom import adiabatic, dustmixture, dustseparate, mhd
+
+SNAPTYPES = [adiabatic, dustmixture, dustseparate, mhd]
+DIR = Path(__file__).parent / 'data/phantom'
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_interpolate_signatures(snaptype, monkeypatch):
+    """Testing interpolation calls use the registered signatures."""
+    filename = DIR / snaptype.filename
+    extent = (-100, 100, -100, 100) * plonk.units('au')
+    calls = list()
+
+    def record(module, name):
+        function = getattr(module, name)
+        parameters = inspect.signature(function.py_func)
+
+        def wrapper(*args, **kwargs):
+            arguments = parameters.bind(*args, **kwargs)
+            arguments.apply_defaults()
+            types = tuple(numba.typeof(arg) for arg in arguments.args)
+            calls.append((function, types))
+            return function(*args, **kwargs)
+
+        monkeypatch.setattr(module, name, wrapper)
+
+    for name in ['interpolate_projection_fields', 'interpolate_slice_fields']:
+        record(interpolation, name)
+    for name in ['footprint_projection', 'footprint_slice']:
+        record(footprint, name)
+
+    for precision in (None, 'float32', 'float64'):
+        snap = plonk.load_snap(filename, precision=precision)
+        for interp in ('projection', 'slice'):
+            for quantity in ('density', ['density', 'velocity']):
+                for _footprint in (False, True):
+                    plonk.interpolate(
+                        snap=snap,
+                        quantity=quantity,
+                        interp=interp,
+                        extent=extent,
+                        num_pixels=(16, 16),
+                        footprint=_footprint,
+                    )
+        snap.close_file()
+    assert len(calls) == 3 * 2 * 3
+    for function, types in calls:
+        assert types in jit._registry[function]
+
+
+def test_warmup(capsys):
+    """Testing plonk warmup."""
+    main(['warmup'])
+    stats = jit.warmup()
+    assert 'plonk.visualize.splash.interpolate_projection_fields' in stats
+    for stat in stats.values():
+        assert stat['compiled'] == 0
+    assert 'signatures loaded' in capsys.readouterr().out
+    # Functions with dynamic globals cannot be cached to disk
+    for dispatcher in jit._registry:
+        for compiled in dispatcher.overloads.values():
+            assert not compiled.library.has_dynamic_globals
+
+
+def test_fork_after_parallel():
+    """Testing a process exits after forking following parallel functions."""
+    filename = DIR / adiabatic.filename
+    code = (
+        'import plonk\n'
+        f'snap = plonk.load_snap("{filename}")\n'
+        'extent = (-100, 100, -100, 100) * plonk.units("au")\n'
+        'plonk.interpolate(snap=snap, quantity="density", interp="projection", '
+        'extent=extent, num_pixels=(64, 64))\n'
+        'snap.bulk_load(num_workers=2)\n'
+    )
+    subprocess.run([sys.executable, '-c', code], check=True, timeout=120)
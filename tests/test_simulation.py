@@ -1,11 +1,15 @@
 """Testing Simulation."""
 
+import shutil
 from pathlib import Path
 
+import h5py
 import numpy as np
 import pytest
 
 import plonk
+from plonk.simulation.catalog import Catalog
+from plonk.snap.file_pool import file_pool
 
 DIR_PATH = Path(__file__).parent / 'data/phantom'
 PREFIX = 'dustseparate'
@@ -59,6 +63,27 @@ def test_simulation_visualization():
     viz.prev()
 
 
+def test_simulation_visualization_cache(tmp_path):
+    """Test going back to a snap shows cached interpolated data."""
+    for idx in range(3):
+        shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path / f'{PREFIX}_{idx:05}.h5')
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+
+    plonk.visualize.clear_render_cache()
+    viz = sim.visualize(kind='image', quantity='density', num_pixels=(32, 32))
+    viz.next()
+    info = plonk.visualize.render_cache_info()
+    viz.prev()
+    viz.next()
+    _info = plonk.visualize.render_cache_info()
+    assert _info['hits'] == info['hits'] + 2
+    assert _info['misses'] == info['misses']
+    # The quantity is not read again
+    assert 'density' not in sim.snaps[0].loaded_arrays()
+    for snap in sim.snaps:
+        snap.close_file()
+
+
 def test_to_array():
     """Testing to_array method."""
     sim = plonk.load_simulation(prefix=PREFIX, directory=DIR_PATH)
@@ -70,3 +95,230 @@ def test_set_units_time_series():
     sim = plonk.load_simulation(prefix=PREFIX, directory=DIR_PATH)
     sim.unset_units_on_time_series()
     sim.set_units_on_time_series()
+
+
+def test_lazy_snaps(tmp_path):
+    """Testing snaps are loaded on access with bounded open files."""
+    for idx in range(5):
+        shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path / f'{PREFIX}_{idx:05}.h5')
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    assert len(sim.snaps) == 5
+    assert sim.snaps.loaded == []
+
+    snap = sim.snaps[2]
+    assert sim.snaps.loaded == [2]
+    assert sim.snaps[2] is snap
+
+    max_files = file_pool.max_files
+    plonk.snap.set_open_file_limit(2)
+    try:
+        density = [snap['density'] for snap in sim.snaps]
+        open_files = [snap.file_path in file_pool for snap in sim.snaps]
+        assert sum(open_files) <= 2
+        # Files closed by the pool are reopened on access
+        snap = sim.snaps[0]
+        assert snap.file_path not in file_pool
+        del snap['density']
+        np.testing.assert_allclose(snap['density'], density[-1])
+    finally:
+        plonk.snap.set_open_file_limit(max_files)
+        for snap in sim.snaps:
+            snap.close_file()
+
+
+def test_catalog(tmp_path):
+    """Testing simulation catalog."""
+    for idx in range(3):
+        shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path / f'{PREFIX}_{idx:05}.h5')
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    properties, code_units = sim.properties, sim.code_units
+    assert sim._catalog is None
+    assert not (tmp_path / '.plonk_cache' / f'{PREFIX}_catalog.json').exists()
+
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path, catalog=True)
+    assert (tmp_path / '.plonk_cache' / f'{PREFIX}_catalog.json').is_file()
+    assert len(sim._catalog) == 3
+
+    # Re-open from the catalog without loading snaps
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path, catalog=True)
+    for key, val in sim.properties.items():
+        np.testing.assert_array_equal(val, properties[key])
+    for key, val in sim.code_units.items():
+        assert val == code_units[key]
+    assert sim.snaps.loaded == []
+    entry = sim._catalog.entry(sim.paths['snaps'][0])
+    assert entry['num_particles'] == 2000
+    assert 'density' in entry['arrays']['particles']
+
+    # Only new or changed files are scanned
+    shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path / f'{PREFIX}_00003.h5')
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    catalog = Catalog.for_simulation(tmp_path, PREFIX)
+    assert catalog.update(sim.paths['snaps']) == (1, [])
+    (tmp_path / f'{PREFIX}_00000.h5').unlink()
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path, catalog=True)
+    assert len(sim._catalog) == 3
+    assert len(sim.properties['time']) == 3
+
+
+def test_unreadable_snap(tmp_path):
+    """Testing snaps that cannot be read are skipped."""
+    for idx in range(2):
+        shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path / f'{PREFIX}_{idx:05}.h5')
+    # A partially written snap
+    with open(DIR_PATH / f'{PREFIX}_00000.h5', mode='rb') as fp:
+        data = fp.read(4096)
+    with open(tmp_path / f'{PREFIX}_00002.h5', mode='wb') as fp:
+        fp.write(data)
+
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    assert len(sim.snaps) == 3
+    assert len(sim.properties['time']) == 2
+    assert len(sim.snaps) == len(sim.paths['snaps']) == len(sim) == 2
+    assert sim.code_units['length'] is not None
+
+    # Snaps the catalog cannot scan are removed on loading
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path, catalog=True)
+    assert len(sim._catalog) == 2
+    assert len(sim.paths['snaps']) == len(sim.snaps) == 2
+    assert len(sim.properties['time']) == 2
+
+
+def test_refresh_time_series(tmp_path):
+    """Testing refreshing time series of a running simulation."""
+    shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path)
+    with open(DIR_PATH / TS_FILENAME) as fp:
+        lines = fp.readlines()
+    with open(tmp_path / TS_FILENAME, mode='w') as fp:
+        # Last line is incomplete
+        fp.writelines(lines[:-2] + [lines[-2][:20]])
+
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    ts = sim.time_series['global']
+    assert len(ts) == len(lines) - 3
+    columns = list(ts.columns)
+
+    # Lines appended
+    with open(tmp_path / TS_FILENAME, mode='a') as fp:
+        fp.writelines([lines[-2][20:], lines[-1]])
+    sim.time_series.refresh()
+    ts = sim.time_series['global']
+    assert len(ts) == len(lines) - 1
+    assert list(ts.columns) == columns
+    expected = plonk.load_time_series(DIR_PATH / TS_FILENAME, cache=False)
+    sim.unset_units_on_time_series()
+    np.testing.assert_allclose(sim.time_series['global'], expected)
+
+    # Restart from an earlier time
+    with open(tmp_path / f'{PREFIX}02.ev', mode='w') as fp:
+        fp.writelines([lines[0]] + lines[-4:])
+    sim.time_series.refresh()
+    assert len(sim.paths['time_series_global']) == 2
+    assert len(sim.time_series['global']) == len(lines)
+
+
+def test_sink_time_series(tmp_path):
+    """Testing reading sink time series in parallel and in long format."""
+    shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path)
+    names = ('time', 'x', 'y', 'z', 'macc')
+    header = '#' + ''.join(f' [{idx:02}{name:>12}]' for idx, name in enumerate(names))
+    for sink in range(1, 4):
+        for restart, times in enumerate(((0.0, 1.0, 2.0), (1.5, 2.5, 3.5)), start=1):
+            data = np.full((3, len(names)), float(sink))
+            data[:, 0] = times
+            filename = tmp_path / f'{PREFIX}Sink{sink:04}N{restart:02}.ev'
+            np.savetxt(filename, data, fmt='%18.10E', header=header[2:])
+
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    sinks = sim.time_series['sinks']
+    assert len(sinks) == 3
+    for ts in sinks:
+        assert len(ts) == 5
+        assert np.all(ts['mass_accreted [kg]'] > 0)
+
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path, num_workers=2)
+    for ts, expected in zip(sim.time_series['sinks'], sinks):
+        np.testing.assert_array_equal(ts, expected)
+
+    sim = plonk.load_simulation(
+        prefix=PREFIX, directory=tmp_path, num_workers=2, sinks_long_format=True
+    )
+    sinks_long = sim.time_series['sinks']
+    assert len(sinks_long) == 15
+    np.testing.assert_array_equal(sinks_long['sink'], np.repeat([0, 1, 2], 5))
+    for idx, ts in sinks_long.groupby('sink'):
+        np.testing.assert_array_equal(ts.drop(columns='sink'), sinks[idx])
+    sim.unset_units_on_time_series()
+    sinks_long = sim.time_series['sinks']
+    np.testing.assert_array_equal(sinks_long['position_x'], sinks_long['sink'] + 1)
+
+
+def _total_mass(snap):
+    return snap['mass'].sum()
+
+
+def _add(a, b):
+    return a + b
+
+
+def test_map_reduce(tmp_path):
+    """Testing map and reduce over snapshots."""
+    for idx in range(3):
+        shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path / f'{PREFIX}_{idx:05}.h5')
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    mass = sim.snaps[0]['mass'].sum()
+
+    for num_workers in (None, 2):
+        masses = sim.map(_total_mass, arrays=['mass'], num_workers=num_workers)
+        assert len(masses) == 3
+        for m in masses:
+            assert m == mass
+        masses = sim.map(_total_mass, indices=[1, 2], num_workers=num_workers)
+        assert len(masses) == 2
+        total = sim.reduce(_total_mass, _add, num_workers=num_workers)
+        np.testing.assert_allclose(total, 3 * mass)
+        total = sim.reduce(_total_mass, _add, initial=mass, num_workers=num_workers)
+        np.testing.assert_allclose(total, 4 * mass)
+    assert sim.snaps.loaded == [0]
+
+
+def test_track(tmp_path):
+    """Testing tracking particles by id."""
+    for idx in range(2):
+        shutil.copy(DIR_PATH / f'{PREFIX}_00000.h5', tmp_path / f'{PREFIX}_{idx:05}.h5')
+    snap = plonk.load_snap(DIR_PATH / f'{PREFIX}_00000.h5')
+    ids = np.array([5, 1999, 0, 42])
+    position = snap['position'][ids]
+    density = snap['density'][ids]
+    snap.close_file()
+
+    # Reorder the particles and store the original ids, starting from 1 as
+    # in Phantom, dropping one
+    filename = tmp_path / f'{PREFIX}_00001.h5'
+    with h5py.File(filename, mode='r+') as f:
+        num_particles = f['header/nparttot'][()]
+        order = np.random.default_rng(0).permutation(num_particles)
+        for name in list(f['particles']):
+            f['particles'][name][...] = f['particles'][name][()][order]
+        f['particles/iorig'] = np.where(order == 42, -1, order + 1)
+
+    sim = plonk.load_simulation(prefix=PREFIX, directory=tmp_path)
+    for num_workers, by in [(None, 'index'), (2, 'index'), (None, 'iorig')]:
+        _ids = ids + 1 if by == 'iorig' else ids
+        tracked = sim.track(
+            _ids, ['position', 'density'], by=by, num_workers=num_workers
+        )
+        assert tracked['position'].shape == (2, 4, 3)
+        for idx in range(2):
+            np.testing.assert_allclose(tracked['position'][idx, :3], position[:3])
+            np.testing.assert_allclose(tracked['density'][idx, :3], density[:3])
+        np.testing.assert_allclose(tracked['position'][0, 3], position[3])
+        assert np.all(np.isnan(tracked['position'][1, 3]))
+    assert (tmp_path / '.plonk_cache' / f'{PREFIX}_00001.h5.ids.npz').is_file()
+
+    with pytest.raises(ValueError):
+        sim.track(ids, 'position', by='row')
+
+    pos = sim.track([0, 5], 'position', indices=[0])
+    assert pos.shape == (1, 2, 3)
+    assert sim.snaps.loaded == []
@@ -1,12 +1,15 @@
 """Testing Snap."""
 
+from collections import Counter
 from pathlib import Path
 
+import h5py
 import numpy as np
 import pytest
 from scipy.spatial.transform import Rotation
 
 import plonk
+from plonk.snap.readers.phantom import read_dataset
 
 from .data.phantom import adiabatic, dustmixture, dustseparate, mhd
 
@@ -225,6 +228,80 @@ def test_translate_snap(snaptype):
     snap.close_file()
 
 
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_transform_loaded_arrays(snaptype):
+    """Testing rotating and translating loaded arrays in memory."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+
+    unit = f"{snap.code_units['length'].m} {snap.code_units['length'].u}"
+    arrays = ['position', 'velocity', 'density', 'smoothing_length']
+    for array in arrays + ['radius_cylindrical']:
+        snap[array]
+    snap.translate(translation=(100, 200, 300), unit=unit)
+    snap.rotate(axis=(1, 2, 3), angle=np.pi / 3)
+    snap.translate(translation=(-300, 100, 200), unit=unit)
+    snap.rotate(axis=(0, 1, 1), angle=-np.pi / 5)
+    assert snap.loaded_arrays() == sorted(arrays)
+
+    loaded = {array: snap[array] for array in arrays}
+    snap.bulk_unload()
+    for array in arrays:
+        np.testing.assert_allclose(
+            loaded[array].m, snap[array].to(loaded[array].units).m, rtol=RTOL
+        )
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_unload_dependent_arrays(snaptype, monkeypatch):
+    """Testing unloading arrays which depend on changed arrays."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+
+    unit = f"{snap.code_units['length'].m} {snap.code_units['length'].u}"
+    arrays = ['density', 'radius_cylindrical', 'kinetic_energy', 'temperature']
+    snap.bulk_load(arrays)
+    assert set(arrays + ['mass', 'position', 'velocity']).issubset(
+        snap.loaded_arrays()
+    )
+
+    snap.translate(translation=(100, 200, 300), unit=unit)
+    assert 'radius_cylindrical' not in snap.loaded_arrays()
+    assert {'density', 'kinetic_energy', 'temperature'}.issubset(snap.loaded_arrays())
+
+    snap.rotate(axis=(1, 2, 3), angle=np.pi / 3)
+    assert 'kinetic_energy' not in snap.loaded_arrays()
+    assert {'density', 'temperature'}.issubset(snap.loaded_arrays())
+
+    snap.set_molecular_weight(2.381)
+    assert 'temperature' not in snap.loaded_arrays()
+
+    snap['specific_kinetic_energy']
+    del snap['velocity']
+    assert 'specific_kinetic_energy' not in snap.loaded_arrays()
+    assert 'density' in snap.loaded_arrays()
+
+    # Arrays unloaded with their dependencies are skipped without warning
+    warnings = []
+    monkeypatch.setattr(plonk.snap.snap.logger, 'warning', warnings.append)
+    snap.bulk_load(['position', 'radius_cylindrical'])
+    snap.bulk_unload(['position', 'radius_cylindrical'])
+    snap.bulk_unload()
+    assert warnings == []
+    assert snap.loaded_arrays() == []
+
+    if snap.num_sinks > 0:
+        snap.add_quantities('disc')
+        snap.set_central_body(0)
+        snap['semi_major_axis']
+        snap.set_central_body(0)
+        assert 'semi_major_axis' not in snap.loaded_arrays()
+
+    snap.close_file()
+
+
 @pytest.mark.parametrize('snaptype', SNAPTYPES)
 def test_write_to_dataframe(snaptype):
     """Testing writing Snap to DataFrame."""
@@ -264,6 +341,200 @@ def test_subsnap(snaptype):
     snap.close_file()
 
 
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_subsnap_read_from_file(snaptype):
+    """Testing reading SubSnap arrays from file."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+
+    indices = [np.arange(10, 100), np.array([99, 3, 3, 0, 50, -1]), np.arange(0, 500, 7)]
+    for ind in indices:
+        subsnap = snap[ind]
+        for array in ['position', 'smoothing_length', 'density', 'type', 'id']:
+            with snap.context(cache=False):
+                expected = snap[array][ind]
+            np.testing.assert_allclose(subsnap[array].m, expected.m, rtol=RTOL)
+        assert snap.loaded_arrays() == []
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_subsnap_cache(snaptype, monkeypatch):
+    """Testing caching SubSnap arrays."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    file_pointer = _CountingFile(snap._file_pointer)
+    monkeypatch.setattr(plonk.Snap, '_file_pointer', property(lambda _: file_pointer))
+
+    # Small subsets read from file once
+    subsnap = snap[:10]
+    for _ in range(3):
+        subsnap['density']
+    assert file_pointer.count['particles/h'] == 1
+    assert subsnap.loaded_arrays() == ['density']
+    assert snap.loaded_arrays() == []
+
+    # The cached arrays follow the transformations of the base Snap
+    position = subsnap['position'].copy()
+    snap.rotate(axis=(1, 0, 0), angle=np.pi)
+    np.testing.assert_allclose(subsnap['position'][:, 1].m, -position[:, 1].m)
+    snap.reset()
+    np.testing.assert_allclose(subsnap['position'].m, position.m)
+
+    del subsnap['position']
+    subsnap.bulk_unload()
+    assert subsnap.loaded_arrays() == []
+
+    # Large subsets index the arrays of the base Snap
+    subsnap = snap[: len(snap) // 2]
+    subsnap.bulk_load(['position', 'density'])
+    assert snap.loaded_arrays() == subsnap.loaded_arrays()
+    assert 'position' in snap.loaded_arrays()
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_memmap(snaptype, tmp_path):
+    """Testing memory-mapped reads of uncompressed datasets."""
+    filename = DIR / snaptype.filename
+    _filename = tmp_path / snaptype.filename
+    with h5py.File(filename, mode='r') as src, h5py.File(_filename, mode='w') as dst:
+        for group in src:
+            dst.create_group(group)
+            for key, value in src[group].items():
+                dst[group].create_dataset(key, data=value[()])
+
+    snap = plonk.load_snap(filename)
+    _snap = plonk.load_snap(_filename, memmap=True)
+    assert isinstance(read_dataset(_snap, 'xyz', 'particles'), np.memmap)
+
+    # Arrays read from file are the memory-mapped arrays, in code units
+    for array in ['position', 'smoothing_length', 'velocity']:
+        assert isinstance(_snap[array].m, np.memmap)
+        assert np.shares_memory(_snap[array].m, _snap._arrays[array].m)
+    with pytest.raises(ValueError):
+        _snap['position'][0] = 0 * _snap['position'][0]
+
+    for array in ['position', 'density', 'smoothing_length', 'type']:
+        units = snap[array].units
+        np.testing.assert_allclose(_snap[array].to(units).m, snap[array].m, rtol=RTOL)
+        np.testing.assert_allclose(
+            _snap[::3][array].to(units).m, snap[array][::3].m, rtol=RTOL
+        )
+    _snap.translate((1, 0, 0), unit='au')
+    np.testing.assert_allclose(
+        _snap['x'].to('au').m, snap['x'].to('au').m + 1, rtol=RTOL
+    )
+
+    snap.close_file()
+    _snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_dataset_memo(snaptype, monkeypatch):
+    """Testing raw datasets are read once per array evaluation."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    file_pointer = _CountingFile(snap._file_pointer)
+    monkeypatch.setattr(plonk.Snap, '_file_pointer', property(lambda _: file_pointer))
+
+    for subsnap in [snap, snap[:100]]:
+        for array in ['sound_speed', 'mass', 'type', 'sub_type']:
+            file_pointer.count.clear()
+            with snap.context(cache=False):
+                subsnap[array]
+            assert all(
+                count == 1
+                for key, count in file_pointer.count.items()
+                if not key.startswith('header')
+            )
+            assert subsnap._dataset_memo == {}
+
+    snap.reset()
+    assert snap._header_memo == {}
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_precision(snaptype):
+    """Testing single precision Snap."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    _snap = plonk.load_snap(filename, precision='float32')
+
+    for array in ['position', 'smoothing_length', 'density', 'radius_cylindrical']:
+        assert _snap[array].magnitude.dtype == np.float32
+        assert _snap[:10][array].magnitude.dtype == np.float32
+        np.testing.assert_allclose(_snap[array].m, snap[array].m, rtol=1e-5)
+
+    _snap.rotate(axis=(1, 2, 3), angle=np.pi / 3)
+    assert _snap['position'].magnitude.dtype == np.float32
+
+    # Interpolation is in double precision, unless the Snap is single
+    # precision, even though the smoothing length is float32 on file
+    extent = (-100, 100, -100, 100) * plonk.units('au')
+    for _s, dtype in [(snap, np.float64), (_snap, np.float32)]:
+        for interp in ['projection', 'slice']:
+            image = plonk.interpolate(
+                snap=_s,
+                quantity='density',
+                interp=interp,
+                extent=extent,
+                num_pixels=(16, 16),
+            )
+            assert image.magnitude.dtype == dtype
+
+    with pytest.raises(ValueError):
+        plonk.load_snap(filename, precision='float16')
+
+    snap.close_file()
+    _snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_disk_cache(snaptype, tmp_path):
+    """Testing on-disk cache of derived arrays."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename, disk_cache=tmp_path)
+    snap.set_molecular_weight(2.381)
+    radius = snap['radius_cylindrical']
+    temperature = snap['temperature']
+    snap['density']
+    assert len(list(tmp_path.glob('*/*.h5'))) == 2
+
+    def _raise(snap):
+        raise RuntimeError('array not read from disk cache')
+
+    _snap = plonk.load_snap(filename, disk_cache=tmp_path)
+    _snap.set_molecular_weight(2.381)
+    _snap._array_registry['radius_cylindrical'] = _raise
+    _snap._array_registry['temperature'] = _raise
+    np.testing.assert_allclose(_snap['radius_cylindrical'].m, radius.m, rtol=RTOL)
+    np.testing.assert_allclose(_snap['temperature'].m, temperature.m, rtol=RTOL)
+    assert _snap['temperature'].units == temperature.units
+
+    # Entries are keyed by all properties, not only declared requirements
+    del _snap['temperature']
+    adiabatic_index = _snap._properties['adiabatic_index']
+    _snap._properties['adiabatic_index'] = 1.4
+    with pytest.raises(RuntimeError):
+        _snap['temperature']
+    _snap._properties['adiabatic_index'] = adiabatic_index
+
+    _snap.set_molecular_weight(1.0)
+    with pytest.raises(RuntimeError):
+        _snap['temperature']
+    _snap.rotate(axis=(1, 2, 3), angle=np.pi / 3)
+    with pytest.raises(RuntimeError):
+        _snap['radius_cylindrical']
+
+    snap.close_file()
+    _snap.close_file()
+
+
 @pytest.mark.parametrize('snaptype', SNAPTYPES)
 def test_sinks(snaptype):
     """Testing getting sink particles."""
@@ -306,6 +577,30 @@ def test_bulk_load(snaptype):
     snap.close_file()
 
 
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_bulk_load_parallel(snaptype):
+    """Testing bulk loading arrays with parallel reads."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    _snap = plonk.load_snap(filename)
+
+    arrays = ['position', 'velocity', 'density', 'sound_speed', 'type']
+    snap.bulk_load(arrays)
+    _snap.bulk_load(arrays, num_workers=2)
+    assert _snap.loaded_arrays() == snap.loaded_arrays()
+    for array in snap.loaded_arrays():
+        np.testing.assert_array_equal(_snap[array].m, snap[array].m)
+    assert _snap._dataset_memo == {}
+    assert _snap._dataset_buffers == []
+
+    ieos = _snap._file_pointer['header/ieos'][()]
+    datasets = _snap._array_registry['pressure'].datasets
+    assert ('particles/xyz' in datasets) == (ieos == 3)
+
+    snap.close_file()
+    _snap.close_file()
+
+
 @pytest.mark.parametrize('snaptype', SNAPTYPES)
 def test_read_write_extra(snaptype):
     """Testing read write extra arrays."""
@@ -348,6 +643,79 @@ def test_plot_as_methods(snaptype):
     snap.close_file()
 
 
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_cache_limit(snaptype):
+    """Testing array cache memory budget."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+
+    with snap.context(cache=False):
+        nbytes = {
+            array: snap[array].magnitude.nbytes
+            for array in ['smoothing_length', 'density', 'mass']
+        }
+    snap.set_cache_limit(nbytes['smoothing_length'] + nbytes['density'])
+    misses = snap.cache_info()['misses']
+
+    snap['smoothing_length']
+    snap['smoothing_length']
+    snap['density']
+    info = snap.cache_info()
+    assert (info['hits'], info['misses'] - misses, info['evictions']) == (1, 2, 0)
+    assert info['nbytes'] == nbytes['smoothing_length'] + nbytes['density']
+
+    snap['smoothing_length']
+    snap['mass']
+    assert snap.loaded_arrays() == ['mass', 'smoothing_length']
+    assert snap.cache_info()['evictions'] == 1
+
+    snap['position']
+    assert snap.loaded_arrays() == ['mass', 'smoothing_length']
+
+    snap['array'] = np.arange(len(snap)) * plonk.units('dimensionless')
+    snap.set_cache_limit(0)
+    assert snap.loaded_arrays() == ['array']
+
+    # User-set arrays are stored even if larger than the budget
+    snap.set_cache_limit(100)
+    snap['position']
+    snap['ones'] = np.ones(len(snap)) * plonk.units('dimensionless')
+    assert snap.loaded_arrays() == ['array', 'ones']
+    np.testing.assert_array_equal(snap['ones'].magnitude, 1.0)
+
+    snap.set_cache_limit(None)
+    snap['position']
+    assert snap.loaded_arrays() == ['array', 'ones', 'position']
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_cached_array_units(snaptype):
+    """Testing cached arrays are kept in their default units."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+
+    # Cached arrays are returned as read-only views, without a copy
+    density = snap['density']
+    assert np.shares_memory(snap['density'].m, density.m)
+    assert not density.m.flags.writeable
+    with pytest.raises(ValueError):
+        density *= 2
+
+    snap.set_units(density='g/cm^3')
+    _density = snap['density']
+    assert str(_density.units) == 'gram / centimeter ** 3'
+    np.testing.assert_allclose(_density.m, density.to('g/cm^3').m, rtol=RTOL)
+    assert np.shares_memory(snap['density'].m, _density.m)
+
+    np.testing.assert_allclose(
+        snap[:10]['density'].m, density[:10].to('g/cm^3').m, rtol=RTOL
+    )
+
+    snap.close_file()
+
+
 @pytest.mark.parametrize('snaptype', SNAPTYPES)
 def test_context(snaptype):
     """Testing cache context manager."""
@@ -385,3 +753,16 @@ def _check_arrays(snap, array_name_map, mean_array_values, std_array_values):
             std_array_values[array],
             rtol=RTOL,
         )
+
+
+class _CountingFile:
+    def __init__(self, file_pointer):
+        self.file_pointer = file_pointer
+        self.count = Counter()
+
+    def __getitem__(self, key):
+        self.count[key] += 1
+        return self.file_pointer[key]
+
+    def close(self):
+        self.file_pointer.close()
@@ -3,6 +3,7 @@
 from pathlib import Path
 
 import numpy as np
+import pandas as pd
 import pytest
 
 import plonk
@@ -35,3 +36,44 @@ def test_read_time_series_data():
 
     for key in ts.columns:
         np.testing.assert_allclose(ts[key].mean(), dustseparate.mean_ts_values[key])
+
+
+def test_read_time_series_restart(tmp_path):
+    """Test reading time series files with a restart overlap."""
+    with open(DIR / dustseparate.ts_file) as fp:
+        header = fp.readline()
+    num_columns = header.count('[')
+
+    def write(filename, time):
+        data = np.ones((len(time), num_columns))
+        data[:, 0] = time
+        with open(tmp_path / filename, mode='w') as fp:
+            fp.write(header)
+            np.savetxt(fp, data, fmt='%18.10E')
+
+    # Second file restarts from t = 1.5 before the first file ends
+    write('sim01.ev', np.linspace(0.0, 2.0, 5))
+    write('sim02.ev', np.linspace(1.5, 3.5, 5))
+    filenames = [tmp_path / 'sim01.ev', tmp_path / 'sim02.ev']
+
+    ts = plonk.load_time_series(filenames)
+    np.testing.assert_allclose(
+        ts['time'], [0.0, 0.5, 1.0, 1.5, 2.0, 2.0, 2.5, 3.0, 3.5]
+    )
+    cache_file = tmp_path / '.plonk_cache' / 'sim02.ev.npz'
+    assert cache_file.is_file()
+
+    # Read from cache
+    ts_cached = plonk.load_time_series(filenames)
+    pd.testing.assert_frame_equal(ts, ts_cached)
+
+    # Cache is not used if the file changes
+    write('sim02.ev', np.linspace(2.5, 5.0, 6))
+    ts = plonk.load_time_series(filenames)
+    np.testing.assert_allclose(ts['time'][5:], [2.5, 3.0, 3.5, 4.0, 4.5, 5.0])
+
+    # Without the cache
+    cache_file.unlink()
+    ts_uncached = plonk.load_time_series(filenames, cache=False)
+    pd.testing.assert_frame_equal(ts, ts_uncached)
+    assert not cache_file.exists()
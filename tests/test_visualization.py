@@ -1,11 +1,14 @@
 """Testing visualization."""
 
+import gc
 from pathlib import Path
 
+import numpy as np
 import pytest
 
 import plonk
 from plonk.utils import visualize
+from plonk.visualize import interpolation
 
 from .data.phantom import adiabatic, dustmixture, dustseparate, mhd
 
@@ -111,6 +114,245 @@ def test_image_slice_with_kwargs(snaptype):
     snap.close_file()
 
 
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_interpolate_multiple(snaptype):
+    """Test interpolating multiple quantities together."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    extent = (-150, 150, -150, 150) * AU
+    quantities = ['density', 'velocity', 'pressure']
+
+    for interp, weighted in [('projection', False), ('slice', True)]:
+        images = plonk.interpolate(
+            snap=snap,
+            quantity=quantities,
+            interp=interp,
+            weighted=weighted,
+            extent=extent,
+            num_pixels=(32, 32),
+        )
+        assert len(images) == len(quantities)
+        assert images[1].shape == (2, 32, 32)
+        for quantity, image in zip(quantities, images):
+            expected = plonk.interpolate(
+                snap=snap,
+                quantity=quantity,
+                interp=interp,
+                weighted=weighted,
+                extent=extent,
+                num_pixels=(32, 32),
+            )
+            assert image.units == expected.units
+            np.testing.assert_allclose(image.magnitude, expected.magnitude)
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_interpolate_footprint(snaptype):
+    """Test interpolating with footprints cached on the Snap."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    extent = (-150, 150, -150, 150) * AU
+
+    for interp, weighted in [('projection', False), ('slice', True)]:
+        kwargs = dict(
+            snap=snap,
+            interp=interp,
+            weighted=weighted,
+            extent=extent,
+            num_pixels=(32, 24),
+        )
+        for quantity in ['density', 'velocity', ['density', 'velocity']]:
+            expected = plonk.interpolate(quantity=quantity, **kwargs)
+            image = plonk.interpolate(quantity=quantity, footprint=True, **kwargs)
+            if isinstance(quantity, str):
+                expected, image = [expected], [image]
+            for _image, _expected in zip(image, expected):
+                assert _image.units == _expected.units
+                assert _image.shape == _expected.shape
+                assert _image.magnitude.dtype == _expected.magnitude.dtype
+                np.testing.assert_allclose(
+                    _image.magnitude, _expected.magnitude, rtol=1e-12
+                )
+    assert len(snap._footprints) == 2
+
+    snap.rotate(axis=(1, 0, 0), angle=np.pi / 3)
+    assert len(snap._footprints) == 0
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_interpolate_in_view(snaptype, monkeypatch):
+    """Test interpolating only the particles in view."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    x, y = snap['x'], snap['y']
+    # Zoom in on a corner with less than half of the particles in view
+    dx, dy = (x.max() - x.min()) / 4, (y.max() - y.min()) / 4
+    extent = (x.min(), x.min() + dx, y.min(), y.min() + dy)
+
+    for interp, weighted in [('projection', False), ('slice', True)]:
+        kwargs = dict(
+            snap=snap,
+            quantity=['density', 'velocity'],
+            interp=interp,
+            weighted=weighted,
+            extent=extent,
+            num_pixels=(32, 24),
+        )
+        images = plonk.interpolate(footprint=True, **kwargs)
+        footprint = list(snap._footprints.values())[-1]
+        assert 0 < len(footprint.indices) < len(snap) // 2
+        images = plonk.interpolate(**kwargs)
+        with monkeypatch.context() as m:
+            m.setattr(interpolation, '_particles_in_view', lambda **_: None)
+            expected = plonk.interpolate(**kwargs)
+        for image, _expected in zip(images, expected):
+            np.testing.assert_array_equal(image.magnitude, _expected.magnitude)
+
+    # Loaded arrays are indexed instead of read for a SubSnap
+    snap.bulk_load(['density', 'velocity', 'mass'])
+    with monkeypatch.context() as m:
+        m.setattr(plonk.snap.snap, 'SubSnap', None)
+        _images = plonk.interpolate(**kwargs)
+    for image, _image in zip(images, _images):
+        np.testing.assert_array_equal(image.magnitude, _image.magnitude)
+
+    # No particles in view
+    extent = (x.max() + dx, x.max() + 2 * dx, y.min(), y.min() + dy)
+    warnings = []
+    with monkeypatch.context() as m:
+        m.setattr(plonk.snap.snap.logger, 'warning', warnings.append)
+        empty = plonk.interpolate(**{**kwargs, 'extent': extent})
+    assert warnings == []
+    for image, _empty in zip(images, empty):
+        assert _empty.shape == image.shape and _empty.units == image.units
+        assert np.all(_empty.magnitude == 0)
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_render_cache(snaptype):
+    """Test interpolated data cached by image and vector."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename)
+    visualize_module = plonk.visualize.visualization
+    kwargs = dict(
+        x='x',
+        y='y',
+        interp='projection',
+        weighted=False,
+        slice_normal=None,
+        slice_offset=None,
+        extent=(-150, 150, -150, 150) * AU,
+        units=None,
+        num_pixels=(32, 32),
+    )
+
+    plonk.visualize.clear_render_cache()
+    hits = plonk.visualize.render_cache_info()['hits']
+    data, extent, units = visualize_module._interpolated_data(
+        snap=snap, quantity='density', **kwargs
+    )
+    _data, _extent, _units = visualize_module._interpolated_data(
+        snap=snap, quantity='density', **kwargs
+    )
+    assert _data is data
+    assert not _data.flags.writeable
+    assert plonk.visualize.render_cache_info()['hits'] == hits + 1
+
+    snap.image(quantity='density', num_pixels=(32, 32))
+    snap.vector(quantity='velocity', num_pixels=(32, 32), normalize_vectors=True)
+    snap.vector(quantity='velocity', num_pixels=(32, 32), normalize_vectors=True)
+    assert plonk.visualize.render_cache_info()['hits'] == hits + 2
+
+    # Rotating the Snap changes the key
+    snap.rotate(axis=(1, 0, 0), angle=np.pi / 3)
+    _data, _, _ = visualize_module._interpolated_data(
+        snap=snap, quantity='density', **kwargs
+    )
+    assert not np.array_equal(_data, data)
+
+    # Arrays set by the user are not cached
+    snap['my_density'] = snap['density']
+    cached = plonk.visualize.render_cache_info()['arrays']
+    visualize_module._interpolated_data(snap=snap, quantity='my_density', **kwargs)
+    assert plonk.visualize.render_cache_info()['arrays'] == cached
+
+    # Data of SubSnaps is removed when they are garbage collected
+    subsnap = snap['gas']
+    visualize_module._interpolated_data(snap=subsnap, quantity='density', **kwargs)
+    assert plonk.visualize.render_cache_info()['arrays'] == cached + 1
+    del subsnap
+    gc.collect()
+    assert plonk.visualize.render_cache_info()['arrays'] == cached
+
+    plonk.visualize.set_render_cache_limit(0)
+    assert plonk.visualize.render_cache_info()['arrays'] == 0
+    plonk.visualize.set_render_cache_limit(
+        plonk.visualize.visualization.RENDER_CACHE_LIMIT
+    )
+
+    snap.close_file()
+
+
+@pytest.mark.parametrize('snaptype', SNAPTYPES)
+def test_tile_pyramid(snaptype, tmp_path, monkeypatch):
+    """Test images from a tile pyramid."""
+    filename = DIR / snaptype.filename
+    snap = plonk.load_snap(filename, disk_cache=tmp_path)
+    pyramid = plonk.visualize.TilePyramid(snap, 'density', tile_pixels=16)
+
+    # Two tiles at level 2 join into the image of their extent
+    extent = pyramid.tile_extent(2, 1, 1)[:1] + pyramid.tile_extent(2, 2, 1)[1:]
+    data, tile_extent = pyramid.data(extent=extent, num_pixels=(32, 16))
+    assert pyramid.level(extent, (32, 16)) == 2
+    assert data.shape == (16, 32)
+    np.testing.assert_allclose(tile_extent, extent)
+    expected = plonk.interpolate(
+        snap=snap,
+        quantity='density',
+        interp='projection',
+        extent=tile_extent * pyramid.units['extent'],
+        num_pixels=(32, 16),
+    )
+    expected = expected.to(pyramid.units['quantity'] * pyramid.units['projection'])
+    np.testing.assert_array_equal(data, expected.magnitude)
+
+    # A new pyramid reads the tiles from disk
+    pyramid = plonk.visualize.TilePyramid(snap, 'density', tile_pixels=16)
+    with monkeypatch.context() as m:
+        m.setattr(pyramid, '_interpolate', None)
+        _data, _ = pyramid.data(extent=extent, num_pixels=(32, 16))
+    np.testing.assert_array_equal(_data, data)
+    pyramid.image(extent=extent, num_pixels=(32, 16))
+
+    # Rotating the Snap makes new tiles
+    snap.rotate(axis=(1, 0, 0), angle=np.pi / 3)
+    _data, _ = pyramid.data(extent=extent, num_pixels=(32, 16))
+    assert not np.array_equal(_data, data)
+    assert len(list(tmp_path.rglob('*.npy'))) == 4
+    pyramid.clear()
+    assert len(list(tmp_path.rglob('*.npy'))) == 2
+
+    # Changing properties makes new tiles
+    snap.set_molecular_weight(2.0)
+    pyramid.data(extent=extent, num_pixels=(32, 16))
+    assert len(list(tmp_path.rglob('*.npy'))) == 4
+
+    # Tiles of arrays set by the user are not stored on disk
+    snap['my_density'] = snap['density']
+    pyramid = plonk.visualize.TilePyramid(snap, 'my_density', tile_pixels=16)
+    pyramid.data(extent=extent, num_pixels=(32, 16))
+    assert len(pyramid._tiles) > 0
+    assert len(list(tmp_path.rglob('*.npy'))) == 4
+
+    snap.close_file()
+
+
 @pytest.mark.parametrize('snaptype', SNAPTYPES)
 def test_plot_smoothing_length(snaptype):
     """Test plot smoothing length as circle."""